@@ -8,6 +8,8 @@ from typing import Optional
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
 
+from game_counters import bump_counters
+
 # --- КОНФИГУРАЦИЯ ---
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "ton-city-builder-secret-key-2025")
 ALGORITHM = "HS256"
@@ -170,6 +172,7 @@ async def register_initiate(data: EmailRegisterInitiate):
         }
         
         await db.users.insert_one(user)
+        await bump_counters(db, total_players=1)
         token = create_token({"sub": data.email})
         
         return {
@@ -245,6 +248,7 @@ async def register_verify(data: EmailVerifyCode):
     }
     
     await db.users.insert_one(user)
+    await bump_counters(db, total_players=1)
     token = create_token({"sub": data.email})
     
     return {
@@ -308,6 +312,7 @@ async def register(data: EmailRegister):
     }
     
     await db.users.insert_one(user)
+    await bump_counters(db, total_players=1)
     token = create_token({"sub": data.email})
     
     return {
@@ -542,6 +547,7 @@ async def google_auth(data: GoogleAuth):
             }
             
             await db.users.insert_one(user)
+            await bump_counters(db, total_players=1)
         
         # Создаем токен
         token = create_token({"sub": email})
@@ -581,6 +587,7 @@ async def wallet_check(data: WalletAuth):
             "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(new_user)
+        await bump_counters(db, total_players=1)
         token = create_token({"sub": data.address})
         return {"status": "need_username", "token": token}
     
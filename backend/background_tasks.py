@@ -25,12 +25,19 @@ DURABILITY RULES:
 """
 import asyncio
 import logging
+import math
 import random
+import uuid
 from datetime import datetime, timezone, timedelta
+from typing import Optional
+from apscheduler.events import (
+    EVENT_JOB_SUBMITTED, EVENT_JOB_MISSED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_EXECUTED,
+)
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
 import os
 
 from business_config import (
@@ -45,27 +52,75 @@ from game_systems import (
     InflationSystem, BankruptcySystem, EventsSystem, EconomicTickEngine,
     IncomeCollector,
 )
+from job_context import (
+    scheduled_job, get_job_db, close_job_db, current_rss_mb,
+    StepTimer, record_scheduler_event, get_job_metric,
+)
+from db_indexes import ensure_indexes
+from economy_snapshots import ensure_snapshot_indexes, raw_expiry, record_rollups
+from island_map import island_cells, touch_island_cells
+from game_counters import reconcile_counters
+from leaderboard import rebuild_leaderboard
+from notification_outbox import durability_alerts, process_outbox
+from owner_keys import backfill_owner_keys
+from telegram_dispatcher import dispatch_pending_notifications
+from scheduler_lock import (
+    SchedulerLease, LeadershipLost, leader_only, check_fence, LEADER_ELECTION_ENABLED, LEASE_RENEW_SECONDS,
+)
+from tick_engine import (
+    BusinessColumns, VectorTickEngine, owner_resource_matrix, durability_transitions,
+    HOURS_FLOOR, EXACT_DECIMALS, CARRY_DECIMALS, CARRY_EPSILON,
+)
 
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-db_name = os.environ.get('DB_NAME', 'ton_city')
+# Bulk write settings for the economic tick
+TICK_BULK_WRITES = os.environ.get('TICK_BULK_WRITES', '1').lower() not in ('0', 'false', 'no')
+TICK_BULK_CHUNK_SIZE = int(os.environ.get('TICK_BULK_CHUNK_SIZE', '1000'))
+
+# Steps 1-6 implementation: "vector" (NumPy engine) or "loop" (per-business reference)
+TICK_ENGINE = os.environ.get('TICK_ENGINE', 'vector').lower()
+
+# Production model: "tick" rewrites every business each minute, "accrual" stores
+# rates + anchor and materializes on user reads/writes and at state changes only
+PRODUCTION_MODE = os.environ.get('PRODUCTION_MODE', 'tick').lower()
+ACCRUAL_MAX_SPAN_HOURS = float(os.environ.get('ACCRUAL_MAX_SPAN_HOURS', '24'))
+ACCRUAL_CLAIM_SECONDS = int(os.environ.get('ACCRUAL_CLAIM_SECONDS', '60'))
+
+# Tick input streaming: cursor batch size and max businesses held per step 1-6 pass
+TICK_CURSOR_BATCH_SIZE = int(os.environ.get('TICK_CURSOR_BATCH_SIZE', '2000'))
+TICK_WORKING_SET = int(os.environ.get('TICK_WORKING_SET', '5000'))
+
+# Fields steps 1-6 read; everything else stays on the server
+BUSINESS_TICK_PROJECTION = {
+    "_id": 0, "id": 1, "owner": 1, "business_type": 1, "level": 1, "durability": 1,
+    "last_tick": 1, "last_collection": 1, "patron_id": 1, "on_sale": 1, "status": 1,
+    "consumption_carry": 1,
+}
+USER_TICK_PROJECTION = {"_id": 0, "id": 1, "wallet_address": 1, "resources": 1}
+
+# Economic tick interval; stretched up to the max while runs exceed their budget
+TICK_INTERVAL_SECONDS = int(os.environ.get('TICK_INTERVAL_SECONDS', '60'))
+TICK_MAX_INTERVAL_SECONDS = int(os.environ.get('TICK_MAX_INTERVAL_SECONDS', '600'))
+TICK_BUDGET_FRACTION = float(os.environ.get('TICK_BUDGET_FRACTION', '0.8'))
+tick_interval_seconds = TICK_INTERVAL_SECONDS
+
+# How often durability alerts queued by the tick are delivered
+OUTBOX_INTERVAL_SECONDS = int(os.environ.get('OUTBOX_INTERVAL_SECONDS', '15'))
+
+# How often the materialized leaderboard is rebuilt
+LEADERBOARD_REBUILD_MINUTES = int(os.environ.get('LEADERBOARD_REBUILD_MINUTES', '5'))
+
+# How often /stats counters are recounted from the real collections
+COUNTERS_RECONCILE_MINUTES = int(os.environ.get('COUNTERS_RECONCILE_MINUTES', '10'))
+OWNER_KEY_BACKFILL_MINUTES = int(os.environ.get('OWNER_KEY_BACKFILL_MINUTES', '5'))
 
 # Global scheduler
 scheduler: AsyncIOScheduler = None
 
-# Import telegram notifications
-try:
-    from telegram_notifications import (
-        notify_low_durability, notify_critical_durability, notify_business_stopped,
-        notify_resources_full, get_user_telegram_chat_id, should_notify, clear_notification_state,
-        RESOURCE_NOTIFICATION_THRESHOLD
-    )
-    TELEGRAM_ENABLED = True
-except ImportError:
-    TELEGRAM_ENABLED = False
-    logger.warning("Telegram notifications not available")
+# Leader lease shared by all jobs of this process (None when election is disabled)
+scheduler_lease: SchedulerLease = None
+
 
 
 def get_durability_multiplier(durability: float) -> float:
@@ -83,8 +138,650 @@ def get_durability_multiplier(durability: float) -> float:
         return 1.0
 
 
+# ==================== TICK WRITE BATCH ====================
+
+class TickWriteBatch:
+    """
+    Collects the writes of one economic tick.
+    Business $set updates are sent as unordered bulk_write chunks,
+    resource $inc updates are merged per owner so every user gets
+    a single update per tick instead of one per business.
+    With bulk=False every queued write is sent as its own update_one.
+    on_business_set(business_id, fields) may adjust the fields before queuing.
+    Durability alerts are appended to the notification outbox with the flush.
+    """
+    
+    def __init__(self, db, bulk: bool = True, chunk_size: int = 1000, on_business_set=None):
+        self.db = db
+        self.bulk = bulk
+        self.chunk_size = max(1, chunk_size)
+        self.on_business_set = on_business_set
+        self.business_ops = []
+        self.user_incs = {}
+        self.alerts = []
+        self.round_trips = 0
+        self.write_errors = 0
+    
+    async def set_business(self, business_id: str, fields: dict):
+        """Queue a $set for one business, flushing when the chunk is full"""
+        if self.on_business_set:
+            self.on_business_set(business_id, fields)
+        if not self.bulk:
+            check_fence()
+            await self.db.businesses.update_one({"id": business_id}, {"$set": fields})
+            self.round_trips += 1
+            return
+        self.business_ops.append(UpdateOne({"id": business_id}, {"$set": fields}))
+        if len(self.business_ops) >= self.chunk_size:
+            await self._flush_businesses()
+    
+    async def inc_user(self, owner: str, inc: dict):
+        """Merge resource increments for one owner"""
+        if not self.bulk:
+            check_fence()
+            await self.db.users.update_one(
+                {"$or": [{"wallet_address": owner}, {"id": owner}]},
+                {"$inc": inc}
+            )
+            self.round_trips += 1
+            return
+        merged = self.user_incs.setdefault(owner, {})
+        for field, amount in inc.items():
+            merged[field] = merged.get(field, 0) + amount
+    
+    def add_alerts(self, events: list):
+        self.alerts.extend(events)
+    
+    async def flush(self):
+        """Send all queued business and user writes and outbox events"""
+        await self._flush_businesses()
+        
+        user_ops = [
+            UpdateOne({"$or": [{"wallet_address": owner}, {"id": owner}]}, {"$inc": inc})
+            for owner, inc in self.user_incs.items() if inc
+        ]
+        self.user_incs = {}
+        for i in range(0, len(user_ops), self.chunk_size):
+            await self._bulk_write(self.db.users, user_ops[i:i + self.chunk_size])
+        
+        alerts, self.alerts = self.alerts, []
+        if alerts:
+            check_fence()
+            try:
+                await self.db.notification_outbox.insert_many(alerts, ordered=False)
+            except BulkWriteError as e:
+                self.write_errors += len(e.details.get("writeErrors", []))
+                logger.error(f"❌ Tick outbox insert failed: {e}")
+            finally:
+                self.round_trips += 1
+    
+    async def _flush_businesses(self):
+        ops, self.business_ops = self.business_ops, []
+        if ops:
+            await self._bulk_write(self.db.businesses, ops)
+    
+    async def _bulk_write(self, collection, ops: list):
+        check_fence()
+        try:
+            await collection.bulk_write(ops, ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            self.write_errors += len(errors)
+            logger.error(f"❌ Tick bulk write to {collection.name}: {len(errors)} of {len(ops)} failed")
+        finally:
+            self.round_trips += 1
+
+
+# ==================== BUSINESS STEPS (1-6) ====================
+
+async def process_businesses_loop(db, businesses: list, users: dict, market_prices: dict,
+                                  now: datetime, writes: TickWriteBatch, exact: bool = False) -> dict:
+    """
+    Steps 1-6 for each business, one at a time.
+    Reference implementation for the vectorized engine (TICK_ENGINE=loop).
+    exact=True (accrual mode) takes the elapsed span as is and carries
+    fractional consumption, see tick_engine.
+    """
+    hours_floor = 0.0 if exact else HOURS_FLOOR
+    decimals = EXACT_DECIMALS if exact else 2
+    total_tax_collected = 0
+    total_maintenance_collected = 0
+    total_production = {}
+    total_consumption = {}
+    tick_results = []
+    businesses_processed = 0
+    
+    for business in businesses:
+        try:
+            business_id = business.get("id")
+            owner = business.get("owner")
+            business_type = business.get("business_type")
+            level = business.get("level", 1)
+            durability = business.get("durability", 100)
+            
+            if not business_type or business_type not in BUSINESSES:
+                continue
+            
+            config = BUSINESSES.get(business_type, {})
+            tier = config.get("tier", 1)
+            
+            # Calculate time since last tick
+            last_tick = business.get("last_tick") or business.get("last_collection")
+            hours_passed = 1.0  # Default to 1 hour
+            if last_tick:
+                try:
+                    last_dt = datetime.fromisoformat(str(last_tick).replace('Z', '+00:00'))
+                    hours_passed = max(hours_floor, (now - last_dt).total_seconds() / 3600)
+                except (ValueError, TypeError):
+                    hours_passed = 1.0
+            
+            # Skip if less than 30 seconds since last tick
+            if hours_passed < 0.008:  # ~30 seconds
+                continue
+            
+            # Skip if business is on sale - no production, no wear
+            if business.get("on_sale") or business.get("status") == "on_sale":
+                continue
+            
+            # --- Step 1: Apply durability wear ---
+            wear_result = BusinessEconomics.apply_wear(business, hours_passed, decimals)
+            new_durability = wear_result["durability"]
+            old_durability = business.get("durability", 100)
+            
+            # --- DURABILITY-BASED NOTIFICATIONS (delivered later from the outbox) ---
+            writes.add_alerts(durability_alerts(owner, business_id, business_type, old_durability, new_durability, now))
+            
+            # --- Get durability multiplier ---
+            durability_mult = get_durability_multiplier(new_durability)
+            
+            # If business is stopped (0% durability), skip production
+            if durability_mult == 0:
+                # Update only durability, no production
+                await writes.set_business(
+                    business_id,
+                    {"durability": 0, "status": "stopped", "last_tick": now.isoformat()}
+                )
+                continue
+            
+            # --- Step 1b: Production ---
+            business_copy = {**business, "durability": new_durability}
+            patron_bonus = 1.0
+            if business.get("patron_id"):
+                patron_bonus = 1.1  # Simplified patron bonus
+            
+            # Exact spans produce at the span's mean durability (wear is linear),
+            # so splitting a span does not change the output
+            production_durability = (durability + new_durability) / 2 if exact else new_durability
+            effective_prod = calculate_effective_production(
+                business_type, level, production_durability, patron_bonus
+            )
+            produces = config.get("produces")
+            
+            # Apply durability multiplier (100% or 70%)
+            effective_prod = effective_prod * durability_mult
+            
+            # Scale production by hours passed (production values are per-tick/day)
+            hourly_fraction = hours_passed / 24.0
+            actual_production = effective_prod * hourly_fraction
+            
+            # --- Step 2: Consumption ---
+            consumption_breakdown = get_consumption_breakdown(business_type, level)
+            # Scale consumption by hours
+            if exact:
+                carry = business.get("consumption_carry") or {}
+                owed = {r: a * hourly_fraction + carry.get(r, 0) for r, a in consumption_breakdown.items()}
+                scaled_consumption = {r: int(o + CARRY_EPSILON) for r, o in owed.items()}
+            else:
+                scaled_consumption = {r: int(a * hourly_fraction) for r, a in consumption_breakdown.items()}
+            
+            # Check user's resource inventory
+            user = users.get(owner, {})
+            user_resources = user.get("resources", {})
+            
+            can_operate = True
+            for resource, required in scaled_consumption.items():
+                if user_resources.get(resource, 0) < required:
+                    can_operate = False
+                    break
+            
+            if not can_operate:
+                actual_production = 0
+            
+            # --- Step 3: Maintenance ---
+            maintenance = MAINTENANCE_COSTS.get(tier, {}).get(level, 0.05)
+            maintenance_cost = maintenance * hourly_fraction
+            
+            # --- Step 4: Profit ---
+            if produces in ("ton", "profit_ton"):
+                gross_profit = actual_production * 0.01
+            elif produces and produces in market_prices:
+                gross_profit = actual_production * max(0.01, market_prices.get(produces, 0.01))
+            else:
+                gross_profit = 0
+            
+            # --- Step 5: Income tax ---
+            tax_rate = TIER_TAXES.get(tier, 0.15)
+            income_tax = gross_profit * tax_rate
+            
+            # --- Step 6: Patron tax ---
+            has_patron = business.get("patron_id") is not None
+            patron_tax = (gross_profit - income_tax) * 0.01 if has_patron else 0
+            
+            # Net income to player
+            net_income = gross_profit - income_tax - patron_tax - maintenance_cost
+            
+            # --- Update business in DB ---
+            business_fields = {
+                "durability": new_durability,
+                "last_tick": now.isoformat(),
+                "last_collection": now.isoformat(),
+                "last_wear_update": now.isoformat(),
+            }
+            if exact:
+                # Unconsumed fractions move to the next span; an idle business keeps its own
+                business_fields["consumption_carry"] = {
+                    r: round(owed[r] - scaled_consumption[r] if can_operate else carry.get(r, 0), CARRY_DECIMALS)
+                    for r in consumption_breakdown
+                }
+            await writes.set_business(business_id, business_fields)
+            
+            # --- Update user ---
+            user_update = {"$inc": {}}
+            
+            # НЕ добавляем деньги автоматически - только ресурсы!
+            # Деньги получаются только при продаже ресурсов на маркетплейсе
+            
+            # Add produced resources to inventory
+            if can_operate and actual_production > 0 and produces and produces not in ("ton", "profit_ton"):
+                user_update["$inc"][f"resources.{produces}"] = round(actual_production, decimals)
+                logger.debug(f"📦 Business {business_id} produced {round(actual_production, decimals)} {produces} for {owner}")
+            
+            # Deduct consumed resources
+            if can_operate:
+                for resource, amount in scaled_consumption.items():
+                    if amount > 0:
+                        user_update["$inc"][f"resources.{resource}"] = -amount
+            
+            if user_update["$inc"]:
+                await writes.inc_user(owner, user_update["$inc"])
+            
+            # Track totals
+            total_tax_collected += income_tax + patron_tax
+            total_maintenance_collected += maintenance_cost
+            
+            if produces and actual_production > 0:
+                total_production[produces] = total_production.get(produces, 0) + actual_production
+            for r, a in scaled_consumption.items():
+                if can_operate:
+                    total_consumption[r] = total_consumption.get(r, 0) + a
+            
+            tick_results.append({
+                "business_id": business_id,
+                "type": business_type,
+                "owner": owner,
+                "net_income": round(net_income, 6),
+                "production": round(actual_production, 2),
+                "produces": produces,
+                "maintenance": round(maintenance_cost, 6),
+                "tax": round(income_tax, 6),
+                "durability": new_durability,
+            })
+            
+            businesses_processed += 1
+            
+        except Exception as e:
+            logger.error(f"❌ Tick error for business {business.get('id')}: {e}")
+            continue
+    
+    return {
+        "businesses_processed": businesses_processed,
+        "total_tax_collected": total_tax_collected,
+        "total_maintenance_collected": total_maintenance_collected,
+        "total_production": total_production,
+        "total_consumption": total_consumption,
+        "total_ton_produced": sum(r.get("net_income", 0) for r in tick_results if r.get("net_income", 0) > 0),
+    }
+
+
+async def process_businesses_vector(db, businesses: list, users: dict, market_prices: dict,
+                                    now: datetime, writes: TickWriteBatch, exact: bool = False) -> dict:
+    """Steps 1-6 over columnar business state with the NumPy tick engine"""
+    columns = BusinessColumns.from_documents(businesses, now, exact)
+    if not len(columns):
+        return {
+            "businesses_processed": 0,
+            "total_tax_collected": 0,
+            "total_maintenance_collected": 0,
+            "total_production": {},
+            "total_consumption": {},
+            "total_ton_produced": 0,
+        }
+    
+    owner_resources = owner_resource_matrix(columns.owner_keys, users)
+    result = VectorTickEngine.compute(columns, owner_resources, market_prices)
+    new_durability = result["new_durability"]
+    
+    # --- DURABILITY-BASED NOTIFICATIONS (only businesses crossing a threshold) ---
+    for i in durability_transitions(columns.durability, new_durability):
+        writes.add_alerts(durability_alerts(
+            columns.owners[i], columns.ids[i], columns.business_types[i],
+            float(columns.durability[i]), float(new_durability[i]), now
+        ))
+    
+    # --- Update businesses ---
+    stamp = now.isoformat()
+    durability_values = new_durability.tolist()
+    stopped = result["stopped"].tolist()
+    carry = VectorTickEngine.carry_documents(columns, result) if exact else None
+    for i, business_id in enumerate(columns.ids):
+        if stopped[i]:
+            await writes.set_business(business_id, {"durability": 0, "status": "stopped", "last_tick": stamp})
+        else:
+            business_fields = {
+                "durability": durability_values[i],
+                "last_tick": stamp,
+                "last_collection": stamp,
+                "last_wear_update": stamp,
+            }
+            if exact:
+                business_fields["consumption_carry"] = carry[i]
+            await writes.set_business(business_id, business_fields)
+    
+    # --- Update users (resource increments already merged per owner) ---
+    for owner, inc in VectorTickEngine.owner_increments(columns, result).items():
+        await writes.inc_user(owner, inc)
+    
+    return result["totals"]
+
+
+async def run_business_steps(db, businesses: list, users: dict, market_prices: dict,
+                             now: datetime, writes: TickWriteBatch, exact: bool = False) -> dict:
+    """Steps 1-6 with the configured engine"""
+    if TICK_ENGINE == "loop":
+        return await process_businesses_loop(db, businesses, users, market_prices, now, writes, exact)
+    return await process_businesses_vector(db, businesses, users, market_prices, now, writes, exact)
+
+
+async def load_market_prices(db, now: datetime) -> dict:
+    """Current market prices, initialized with base prices on first use"""
+    market_prices_doc = await db.market_prices.find_one({"type": "current"})
+    if market_prices_doc:
+        return market_prices_doc.get("prices", {})
+    
+    market_prices = {r: d["base_price"] for r, d in RESOURCE_TYPES.items()}
+    await db.market_prices.update_one(
+        {"type": "current"},
+        {"$set": {"prices": market_prices, "updated_at": now.isoformat()}},
+        upsert=True
+    )
+    return market_prices
+
+
+# Per-resource totals over all user inventories, summed by the server
+TOTAL_SUPPLY_PIPELINE = [
+    {"$match": {"resources": {"$type": "object"}}},
+    {"$project": {"_id": 0, "resources": {"$objectToArray": "$resources"}}},
+    {"$unwind": "$resources"},
+    {"$group": {"_id": "$resources.k", "total": {"$sum": "$resources.v"}}},
+]
+
+
+async def aggregate_total_supply(db) -> dict:
+    """Total supply per resource for NPC consumption, in one small round trip"""
+    total_supply = {}
+    async for row in db.users.aggregate(TOTAL_SUPPLY_PIPELINE):
+        total_supply[row["_id"]] = row["total"]
+    return total_supply
+
+
+# ==================== ACCRUAL MODE ====================
+
+# Include businesses without is_active field for backward compat
+ACTIVE_BUSINESSES = {"$or": [{"is_active": True}, {"is_active": {"$exists": False}}]}
+
+# Durability levels where production or notifications change (see durability_alerts)
+DURABILITY_THRESHOLDS = (50, 10, 0)
+
+class AccrualSchedule:
+    """
+    on_business_set hook for accrual mode.
+    Stores the business production/wear rates and the next time its state
+    changes on its own: a durability threshold or the owner running out of inputs.
+    last_collection stays with the collect endpoints, so
+    IncomeCollector.calculate_pending_income keeps accruing from it.
+    """
+    
+    def __init__(self, businesses: list, users: dict, now: datetime):
+        self.businesses = {b.get("id"): b for b in businesses}
+        self.users = users
+        self.now = now
+        
+        # Hourly input consumption per owner, for starvation estimates
+        self.owner_consumption = {}
+        for business in businesses:
+            rates = self.owner_consumption.setdefault(business.get("owner"), {})
+            breakdown = get_consumption_breakdown(business.get("business_type"), business.get("level", 1))
+            for resource, amount in breakdown.items():
+                rates[resource] = rates.get(resource, 0) + amount / 24.0
+    
+    def __call__(self, business_id: str, fields: dict):
+        business = self.businesses.get(business_id, {})
+        business_type = business.get("business_type")
+        level = business.get("level", 1)
+        durability = fields.get("durability", 0)
+        
+        fields.pop("last_collection", None)
+        
+        wear_rate = get_daily_wear(business_type, level) * 100 / 24.0
+        patron_bonus = 1.1 if business.get("patron_id") else 1.0
+        production_rate = calculate_effective_production(
+            business_type, level, durability, patron_bonus
+        ) * get_durability_multiplier(durability) / 24.0
+        
+        fields["production_rate"] = round(production_rate, 6)
+        fields["wear_rate"] = round(wear_rate, 6)
+        fields["next_state_change_at"] = self.next_state_change(business, durability, wear_rate)
+    
+    def next_state_change(self, business: dict, durability: float, wear_rate: float) -> Optional[str]:
+        if durability <= 0:
+            return None  # Stopped until repaired; the repair materializes it
+        
+        hours = ACCRUAL_MAX_SPAN_HOURS
+        
+        # Next durability threshold (one minute past, so the tick sees it crossed)
+        if wear_rate > 0:
+            threshold = next(t for t in DURABILITY_THRESHOLDS if durability >= t)
+            hours = min(hours, (durability - threshold) / wear_rate + 1 / 60)
+        
+        # Owner inventory running out of an input
+        owner = business.get("owner")
+        resources = self.users.get(owner, {}).get("resources", {})
+        owner_rates = self.owner_consumption.get(owner, {})
+        for resource in get_consumption_breakdown(business.get("business_type"), business.get("level", 1)):
+            rate = owner_rates.get(resource, 0)
+            stock = resources.get(resource, 0)
+            if rate > 0 and stock > 0:
+                hours = min(hours, max(stock / rate, 1 / 60))
+        
+        return (self.now + timedelta(hours=hours)).isoformat()
+
+
+async def ensure_tick_indexes(db):
+    await ensure_indexes(db, "businesses", "users", "accrual_claims")
+    await ensure_snapshot_indexes(db)
+
+
+async def claim_owners(db, owners: list, now: datetime) -> list:
+    """
+    Short per-owner claims, so a user read and the periodic job
+    never materialize the same span twice.
+    """
+    if not owners:
+        return []
+    await db.accrual_claims.delete_many({"_id": {"$in": owners}, "expires_at": {"$lte": now}})
+    expires_at = now + timedelta(seconds=ACCRUAL_CLAIM_SECONDS)
+    try:
+        await db.accrual_claims.insert_many(
+            [{"_id": owner, "expires_at": expires_at} for owner in owners], ordered=False
+        )
+        return owners
+    except BulkWriteError as e:
+        taken = {err["index"] for err in e.details.get("writeErrors", [])}
+        return [owner for i, owner in enumerate(owners) if i not in taken]
+
+
+async def release_owners(db, owners: list):
+    if owners:
+        await db.accrual_claims.delete_many({"_id": {"$in": owners}})
+
+
+async def load_owner_users(db, owners: list) -> dict:
+    """User documents keyed like the tick: wallet_address or id"""
+    users = {}
+    cursor = db.users.find(
+        {"$or": [{"wallet_address": {"$in": owners}}, {"id": {"$in": owners}}]},
+        USER_TICK_PROJECTION,
+    ).batch_size(TICK_CURSOR_BATCH_SIZE)
+    async for user in cursor:
+        wallet = user.get("wallet_address") or user.get("id")
+        if wallet:
+            users[wallet] = user
+    return users
+
+
+async def stream_owner_chunks(db, query: dict):
+    """
+    Owner-sorted business cursor cut into chunks of about TICK_WORKING_SET,
+    never splitting one owner's businesses across chunks.
+    """
+    cursor = db.businesses.find(query, BUSINESS_TICK_PROJECTION).sort("owner", 1).batch_size(TICK_CURSOR_BATCH_SIZE)
+    chunk = []
+    async for business in cursor:
+        if len(chunk) >= TICK_WORKING_SET and business.get("owner") != chunk[-1].get("owner"):
+            yield chunk
+            chunk = []
+        chunk.append(business)
+    if chunk:
+        yield chunk
+
+
+async def accrue_for_owners(db, owners: list, query: dict, market_prices: dict,
+                            now: datetime, writes: TickWriteBatch, totals: dict):
+    """Materialize the matching businesses of the given owners up to now"""
+    claimed = await claim_owners(db, owners, now)
+    if not claimed:
+        return
+    try:
+        businesses = await db.businesses.find(
+            {**query, "owner": {"$in": claimed}}, BUSINESS_TICK_PROJECTION
+        ).to_list(length=None)
+        if not businesses:
+            return
+        users = await load_owner_users(db, claimed)
+        writes.on_business_set = AccrualSchedule(businesses, users, now)
+        # Exact spans: reads may materialize every few seconds
+        result = await run_business_steps(db, businesses, users, market_prices, now, writes, exact=True)
+        await writes.flush()
+    finally:
+        await release_owners(db, claimed)
+    
+    merge_totals(totals, result)
+
+
+def merge_totals(totals: dict, result: dict):
+    """Add one pass of steps 1-6 totals into the running tick totals"""
+    for key, value in result.items():
+        if isinstance(value, dict):
+            merged = totals.setdefault(key, {})
+            for k, v in value.items():
+                merged[k] = merged.get(k, 0) + v
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def empty_totals() -> dict:
+    return {
+        "businesses_processed": 0,
+        "total_tax_collected": 0,
+        "total_maintenance_collected": 0,
+        "total_production": {},
+        "total_consumption": {},
+        "total_ton_produced": 0,
+    }
+
+
+async def accrue_due_businesses(db, market_prices: dict, now: datetime) -> tuple:
+    """
+    Steps 1-6 in accrual mode: only businesses whose next state change is due,
+    plus businesses never scheduled yet (switched over from tick mode).
+    """
+    await ensure_tick_indexes(db)
+    due = {
+        "$and": [ACTIVE_BUSINESSES, {"$or": [
+            {"next_state_change_at": {"$lte": now.isoformat()}},
+            {"next_state_change_at": {"$exists": False}},
+        ]}],
+        # On-sale businesses neither produce nor wear
+        "on_sale": {"$ne": True},
+        "status": {"$ne": "on_sale"},
+    }
+    
+    owners = await db.businesses.distinct("owner", due)
+    owners = [o for o in owners if o]
+    
+    writes = TickWriteBatch(db, bulk=TICK_BULK_WRITES, chunk_size=TICK_BULK_CHUNK_SIZE)
+    totals = empty_totals()
+    for i in range(0, len(owners), TICK_BULK_CHUNK_SIZE):
+        await accrue_for_owners(db, owners[i:i + TICK_BULK_CHUNK_SIZE], due, market_prices, now, writes, totals)
+    
+    return totals, writes
+
+
+async def materialize_production(db, owner_ids, now: datetime = None) -> dict:
+    """
+    Bring an owner's businesses and inventory up to now before a read or write.
+    No-op unless PRODUCTION_MODE=accrual.
+    """
+    if PRODUCTION_MODE != "accrual":
+        return {"businesses_processed": 0}
+    
+    owners = sorted(o for o in owner_ids if o)
+    now = now or datetime.now(timezone.utc)
+    try:
+        await ensure_tick_indexes(db)
+        market_prices = await load_market_prices(db, now)
+        writes = TickWriteBatch(db, bulk=TICK_BULK_WRITES, chunk_size=TICK_BULK_CHUNK_SIZE)
+        totals = empty_totals()
+        await accrue_for_owners(db, owners, ACTIVE_BUSINESSES, market_prices, now, writes, totals)
+        
+        # The tick books these in step 13; reads book their own share
+        if totals["total_tax_collected"] or totals["total_maintenance_collected"]:
+            await db.admin_stats.update_one(
+                {"type": "treasury"},
+                {"$inc": {
+                    "total_tax": totals["total_tax_collected"],
+                    "total_maintenance": totals["total_maintenance_collected"],
+                }},
+                upsert=True
+            )
+        return totals
+    except Exception as e:
+        logger.error(f"❌ Production materialization failed for {owners}: {e}")
+        return {"businesses_processed": 0}
+
+
+async def reschedule_business(db, business_id: str):
+    """Make the next tick recompute rates after a level or durability change"""
+    if PRODUCTION_MODE == "accrual":
+        await db.businesses.update_one(
+            {"id": business_id},
+            {"$set": {"next_state_change_at": datetime.now(timezone.utc).isoformat()}}
+        )
+
+
 # ==================== MAIN ECONOMIC TICK ====================
 
+@scheduled_job("economic_tick")
 async def economic_tick():
     """
     Main economic tick - runs every hour.
@@ -93,350 +790,167 @@ async def economic_tick():
     try:
         logger.info("⚙️ === ECONOMIC TICK STARTED ===")
         
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        db = get_job_db()
         
         now = datetime.now(timezone.utc)
+        timer = StepTimer()
         
-        # Get all active businesses (include businesses without is_active field for backward compat)
-        businesses = await db.businesses.find({"$or": [{"is_active": True}, {"is_active": {"$exists": False}}]}).to_list(length=None)
-        
-        if not businesses:
-            logger.info("📊 No active businesses - tick skipped")
-            client.close()
-            return
+        with timer.span("load"):
+            market_prices = await load_market_prices(db, now)
+        working_set_max = 0
+        peak_rss_mb = current_rss_mb()
         
-        # Get current market prices
-        market_prices_doc = await db.market_prices.find_one({"type": "current"})
-        market_prices = {}
-        if market_prices_doc:
-            market_prices = market_prices_doc.get("prices", {})
+        if PRODUCTION_MODE == "accrual":
+            # Only businesses whose state changes on its own are touched
+            with timer.span("business_steps"):
+                totals, writes = await accrue_due_businesses(db, market_prices, now)
         else:
-            # Initialize with base prices
-            market_prices = {r: d["base_price"] for r, d in RESOURCE_TYPES.items()}
-            await db.market_prices.update_one(
-                {"type": "current"},
-                {"$set": {"prices": market_prices, "updated_at": now.isoformat()}},
-                upsert=True
-            )
-        
-        # Get all users
-        users = {}
-        users_cursor = db.users.find({})
-        async for user in users_cursor:
-            wallet = user.get("wallet_address") or user.get("id")
-            if wallet:
-                users[wallet] = user
+            await ensure_tick_indexes(db)
+            writes = TickWriteBatch(db, bulk=TICK_BULK_WRITES, chunk_size=TICK_BULK_CHUNK_SIZE)
+            totals = empty_totals()
+            
+            # === PROCESS EACH BUSINESS (Steps 1-6), streamed owner by owner ===
+            chunks = stream_owner_chunks(db, ACTIVE_BUSINESSES)
+            while True:
+                with timer.span("load"):
+                    businesses = await anext(chunks, None)
+                    if businesses is not None:
+                        owners = sorted({b.get("owner") for b in businesses if b.get("owner")})
+                        users = await load_owner_users(db, owners)
+                if businesses is None:
+                    break
+                with timer.span("business_steps"):
+                    merge_totals(totals, await run_business_steps(db, businesses, users, market_prices, now, writes))
+                with timer.span("business_writes"):
+                    await writes.flush()
+                working_set_max = max(working_set_max, len(businesses))
+                peak_rss_mb = max(peak_rss_mb, current_rss_mb())
+            
+            if not working_set_max:
+                logger.info("📊 No active businesses - tick skipped")
+                return
         
-        # Track totals
-        total_tax_collected = 0
-        total_maintenance_collected = 0
-        total_production = {}
-        total_consumption = {}
-        tick_results = []
-        businesses_processed = 0
-        
-        # === PROCESS EACH BUSINESS (Steps 1-6) ===
-        for business in businesses:
-            try:
-                business_id = business.get("id")
-                owner = business.get("owner")
-                business_type = business.get("business_type")
-                level = business.get("level", 1)
-                durability = business.get("durability", 100)
-                
-                if not business_type or business_type not in BUSINESSES:
-                    continue
-                
-                config = BUSINESSES.get(business_type, {})
-                tier = config.get("tier", 1)
-                
-                # Calculate time since last tick
-                last_tick = business.get("last_tick") or business.get("last_collection")
-                hours_passed = 1.0  # Default to 1 hour
-                if last_tick:
-                    try:
-                        last_dt = datetime.fromisoformat(str(last_tick).replace('Z', '+00:00'))
-                        hours_passed = max(0.1, (now - last_dt).total_seconds() / 3600)
-                    except (ValueError, TypeError):
-                        hours_passed = 1.0
-                
-                # Skip if less than 30 seconds since last tick
-                if hours_passed < 0.008:  # ~30 seconds
-                    continue
-                
-                # Skip if business is on sale - no production, no wear
-                if business.get("on_sale") or business.get("status") == "on_sale":
-                    continue
-                
-                # --- Step 1: Apply durability wear ---
-                wear_result = BusinessEconomics.apply_wear(business, hours_passed)
-                new_durability = wear_result["durability"]
-                old_durability = business.get("durability", 100)
-                
-                # --- DURABILITY-BASED NOTIFICATIONS ---
-                if TELEGRAM_ENABLED:
-                    biz_name = config.get("name", {}).get("ru", business_type)
-                    chat_id = await get_user_telegram_chat_id(db, owner)
-                    
-                    if chat_id:
-                        # Business stopped (0% durability)
-                        if new_durability <= 0 and old_durability > 0:
-                            if should_notify(owner, "stopped", business_id):
-                                await notify_business_stopped(chat_id, biz_name)
-                        # Critical durability (<10%)
-                        elif new_durability < 10 and old_durability >= 10:
-                            if should_notify(owner, "critical", business_id):
-                                await notify_critical_durability(chat_id, biz_name, new_durability)
-                        # Low durability (<50%)
-                        elif new_durability < 50 and old_durability >= 50:
-                            if should_notify(owner, "low", business_id):
-                                await notify_low_durability(chat_id, biz_name, new_durability)
-                        
-                        # Clear notifications when repaired
-                        if new_durability >= 50 and old_durability < 50:
-                            clear_notification_state(owner, "low", business_id)
-                            clear_notification_state(owner, "critical", business_id)
-                        if new_durability > 0 and old_durability <= 0:
-                            clear_notification_state(owner, "stopped", business_id)
-                
-                # --- Get durability multiplier ---
-                durability_mult = get_durability_multiplier(new_durability)
-                
-                # If business is stopped (0% durability), skip production
-                if durability_mult == 0:
-                    # Update only durability, no production
-                    await db.businesses.update_one(
-                        {"id": business_id},
-                        {"$set": {"durability": 0, "status": "stopped", "last_tick": now.isoformat()}}
-                    )
-                    continue
-                
-                # --- Step 1b: Production ---
-                business_copy = {**business, "durability": new_durability}
-                patron_bonus = 1.0
-                if business.get("patron_id"):
-                    patron_bonus = 1.1  # Simplified patron bonus
-                
-                effective_prod = calculate_effective_production(
-                    business_type, level, new_durability, patron_bonus
-                )
-                produces = config.get("produces")
-                
-                # Apply durability multiplier (100% or 70%)
-                effective_prod = effective_prod * durability_mult
-                
-                # Scale production by hours passed (production values are per-tick/day)
-                hourly_fraction = hours_passed / 24.0
-                actual_production = effective_prod * hourly_fraction
-                
-                # --- Step 2: Consumption ---
-                consumption_breakdown = get_consumption_breakdown(business_type, level)
-                # Scale consumption by hours
-                scaled_consumption = {r: int(a * hourly_fraction) for r, a in consumption_breakdown.items()}
-                
-                # Check user's resource inventory
-                user = users.get(owner, {})
-                user_resources = user.get("resources", {})
-                
-                can_operate = True
-                for resource, required in scaled_consumption.items():
-                    if user_resources.get(resource, 0) < required:
-                        can_operate = False
-                        break
-                
-                if not can_operate:
-                    actual_production = 0
-                
-                # --- Step 3: Maintenance ---
-                maintenance = MAINTENANCE_COSTS.get(tier, {}).get(level, 0.05)
-                maintenance_cost = maintenance * hourly_fraction
-                
-                # --- Step 4: Profit ---
-                if produces in ("ton", "profit_ton"):
-                    gross_profit = actual_production * 0.01
-                elif produces and produces in market_prices:
-                    gross_profit = actual_production * max(0.01, market_prices.get(produces, 0.01))
-                else:
-                    gross_profit = 0
-                
-                # --- Step 5: Income tax ---
-                tax_rate = TIER_TAXES.get(tier, 0.15)
-                income_tax = gross_profit * tax_rate
-                
-                # --- Step 6: Patron tax ---
-                has_patron = business.get("patron_id") is not None
-                patron_tax = (gross_profit - income_tax) * 0.01 if has_patron else 0
-                
-                # Net income to player
-                net_income = gross_profit - income_tax - patron_tax - maintenance_cost
-                
-                # --- Update business in DB ---
-                update_ops = {
-                    "$set": {
-                        "durability": new_durability,
-                        "last_tick": now.isoformat(),
-                        "last_collection": now.isoformat(),
-                        "last_wear_update": now.isoformat(),
-                    }
-                }
-                
-                if actual_production > 0 and produces:
-                    if produces not in ("ton", "profit_ton"):
-                        # Add produced resource to user inventory
-                        update_ops.setdefault("$inc", {})
-                        # We'll update user resources separately
-                    
-                await db.businesses.update_one({"id": business_id}, update_ops)
-                
-                # --- Update user ---
-                user_update = {"$inc": {}}
-                
-                # НЕ добавляем деньги автоматически - только ресурсы!
-                # Деньги получаются только при продаже ресурсов на маркетплейсе
-                
-                # Add produced resources to inventory
-                if can_operate and actual_production > 0 and produces and produces not in ("ton", "profit_ton"):
-                    user_update["$inc"][f"resources.{produces}"] = round(actual_production, 2)
-                    logger.info(f"📦 Business {business_id} produced {round(actual_production, 2)} {produces} for {owner}")
-                
-                # Deduct consumed resources
-                if can_operate:
-                    for resource, amount in scaled_consumption.items():
-                        if amount > 0:
-                            user_update["$inc"][f"resources.{resource}"] = -amount
-                
-                if user_update["$inc"]:
-                    await db.users.update_one(
-                        {"$or": [{"wallet_address": owner}, {"id": owner}]},
-                        user_update
-                    )
-                
-                # Track totals
-                total_tax_collected += income_tax + patron_tax
-                total_maintenance_collected += maintenance_cost
-                
-                if produces and actual_production > 0:
-                    total_production[produces] = total_production.get(produces, 0) + actual_production
-                for r, a in scaled_consumption.items():
-                    if can_operate:
-                        total_consumption[r] = total_consumption.get(r, 0) + a
-                
-                tick_results.append({
-                    "business_id": business_id,
-                    "type": business_type,
-                    "owner": owner,
-                    "net_income": round(net_income, 6),
-                    "production": round(actual_production, 2),
-                    "produces": produces,
-                    "maintenance": round(maintenance_cost, 6),
-                    "tax": round(income_tax, 6),
-                    "durability": new_durability,
-                })
-                
-                businesses_processed += 1
-                
-            except Exception as e:
-                logger.error(f"❌ Tick error for business {business.get('id')}: {e}")
-                continue
+        total_tax_collected = totals["total_tax_collected"]
+        total_maintenance_collected = totals["total_maintenance_collected"]
+        total_production = totals["total_production"]
+        total_consumption = totals["total_consumption"]
+        businesses_processed = totals["businesses_processed"]
         
         # === GLOBAL STEPS (7-13) ===
+        check_fence()
         
         # Step 7: NPC consumption
-        total_supply = {}
-        supply_cursor = db.users.aggregate([
-            {"$project": {"resources": 1}},
-        ])
-        async for doc in supply_cursor:
-            for r, a in doc.get("resources", {}).items():
-                total_supply[r] = total_supply.get(r, 0) + a
-        
-        npc_consumed = NPCMarketSystem.calculate_npc_consumption(total_supply)
+        with timer.span("npc_supply"):
+            total_supply = await aggregate_total_supply(db)
+            npc_consumed = NPCMarketSystem.calculate_npc_consumption(total_supply)
         
         # Step 8: Price updates / NPC interventions
-        interventions = []
-        for resource, price in market_prices.items():
-            intervention = NPCMarketSystem.check_price_intervention(resource, price)
-            if intervention:
-                interventions.append(intervention)
-                # Adjust price towards base
-                base_price = RESOURCE_TYPES.get(resource, {}).get("base_price", price)
-                if intervention["action"] == "buy":
-                    market_prices[resource] = price * 1.05  # Push price up 5%
-                else:
-                    market_prices[resource] = price * 0.95  # Push price down 5%
-        
-        # Step 10: Inflation
-        total_ton_produced = sum(r.get("net_income", 0) for r in tick_results if r.get("net_income", 0) > 0)
-        total_ton_sunk = total_tax_collected + total_maintenance_collected
-        inflation_factor = InflationSystem.calculate_inflation_factor(total_ton_produced, total_ton_sunk)
-        market_prices = InflationSystem.apply_price_inflation(market_prices, inflation_factor)
-        
-        # Save updated prices
-        await db.market_prices.update_one(
-            {"type": "current"},
-            {"$set": {"prices": market_prices, "updated_at": now.isoformat()}},
-            upsert=True
-        )
+        with timer.span("price_interventions"):
+            interventions = []
+            for resource, price in market_prices.items():
+                intervention = NPCMarketSystem.check_price_intervention(resource, price)
+                if intervention:
+                    interventions.append(intervention)
+                    # Adjust price towards base
+                    base_price = RESOURCE_TYPES.get(resource, {}).get("base_price", price)
+                    if intervention["action"] == "buy":
+                        market_prices[resource] = price * 1.05  # Push price up 5%
+                    else:
+                        market_prices[resource] = price * 0.95  # Push price down 5%
+            
+            # Step 10: Inflation
+            total_ton_produced = totals["total_ton_produced"]
+            total_ton_sunk = total_tax_collected + total_maintenance_collected
+            inflation_factor = InflationSystem.calculate_inflation_factor(total_ton_produced, total_ton_sunk)
+            market_prices = InflationSystem.apply_price_inflation(market_prices, inflation_factor)
+            
+            # Save updated prices
+            await db.market_prices.update_one(
+                {"type": "current"},
+                {"$set": {"prices": market_prices, "updated_at": now.isoformat()}},
+                upsert=True
+            )
         
         # Step 11: Bankruptcy checks
-        bankruptcies = []
-        async for user in db.users.find({"balance_ton": {"$lt": -10}}):
-            bankruptcy = BankruptcySystem.check_bankruptcy(user)
-            if bankruptcy["is_bankrupt"]:
-                bankruptcies.append({
-                    "user": user.get("wallet_address") or user.get("id"),
-                    "balance": user.get("balance_ton"),
-                    "reason": bankruptcy["reason"],
-                })
-                # Pause all their businesses
-                await db.businesses.update_many(
-                    {"owner": user.get("wallet_address") or user.get("id")},
-                    {"$set": {"is_active": False, "paused_reason": "bankruptcy"}}
-                )
+        with timer.span("bankruptcy_scan"):
+            bankruptcies = []
+            async for user in db.users.find({"balance_ton": {"$lt": -10}}):
+                bankruptcy = BankruptcySystem.check_bankruptcy(user)
+                if bankruptcy["is_bankrupt"]:
+                    bankruptcies.append({
+                        "user": user.get("wallet_address") or user.get("id"),
+                        "balance": user.get("balance_ton"),
+                        "reason": bankruptcy["reason"],
+                    })
+                    # Pause all their businesses
+                    await db.businesses.update_many(
+                        {"owner": user.get("wallet_address") or user.get("id")},
+                        {"$set": {"is_active": False, "paused_reason": "bankruptcy"}}
+                    )
         
         # Step 12: Events
         events = EventsSystem.roll_events()
         
         # Step 13: Save snapshot
-        await db.admin_stats.update_one(
-            {"type": "treasury"},
-            {"$inc": {
-                "total_tax": total_tax_collected,
-                "total_maintenance": total_maintenance_collected,
-            }},
-            upsert=True
-        )
-        
-        snapshot = {
-            "type": "tick_snapshot",
-            "timestamp": now.isoformat(),
-            "businesses_processed": businesses_processed,
-            "total_tax_collected": round(total_tax_collected, 4),
-            "total_maintenance_collected": round(total_maintenance_collected, 4),
-            "total_production": {k: round(v, 2) for k, v in total_production.items()},
-            "total_consumption": {k: round(v, 2) for k, v in total_consumption.items()},
-            "npc_consumed": npc_consumed,
-            "npc_interventions": len(interventions),
-            "inflation_factor": round(inflation_factor, 6),
-            "bankruptcies": len(bankruptcies),
-            "events": [e.get("id") for e in events],
-            "market_prices": market_prices,
-        }
+        check_fence()
+        with timer.span("snapshot"):
+            await db.admin_stats.update_one(
+                {"type": "treasury"},
+                {"$inc": {
+                    "total_tax": total_tax_collected,
+                    "total_maintenance": total_maintenance_collected,
+                }},
+                upsert=True
+            )
+            
+            snapshot = {
+                "type": "tick_snapshot",
+                "timestamp": now.isoformat(),
+                "businesses_processed": businesses_processed,
+                "total_tax_collected": round(total_tax_collected, 4),
+                "total_maintenance_collected": round(total_maintenance_collected, 4),
+                "total_production": {k: round(v, 2) for k, v in total_production.items()},
+                "total_consumption": {k: round(v, 2) for k, v in total_consumption.items()},
+                "npc_consumed": npc_consumed,
+                "npc_interventions": len(interventions),
+                "inflation_factor": round(inflation_factor, 6),
+                "bankruptcies": len(bankruptcies),
+                "events": [e.get("id") for e in events],
+                "market_prices": market_prices,
+                "write_round_trips": writes.round_trips,
+                "write_errors": writes.write_errors,
+                "working_set_max": working_set_max,
+                "peak_rss_mb": max(peak_rss_mb, current_rss_mb()),
+                "timings": timer.spans,
+                "tick_lag_s": get_job_metric("economic_tick", "last_lag_s"),
+                "tick_interval_s": tick_interval_seconds,
+                "expires_at": raw_expiry(now),
+            }
+            
+            result = await db.economic_snapshots.insert_one(snapshot)
+            await record_rollups(db, snapshot, now)
         
-        await db.economic_snapshots.insert_one(snapshot)
+        # The snapshot span itself is known only after the insert
+        total_ms = timer.total_ms
+        await db.economic_snapshots.update_one(
+            {"_id": result.inserted_id},
+            {"$set": {"timings.snapshot": timer.spans["snapshot"], "tick_total_ms": total_ms}}
+        )
         
         # Log summary
         logger.info(f"✅ TICK COMPLETE:")
         logger.info(f"   📊 Businesses: {businesses_processed}")
+        logger.info(f"   💾 Write round trips: {writes.round_trips}")
         logger.info(f"   💰 Tax: {total_tax_collected:.4f} TON")
         logger.info(f"   🔧 Maintenance: {total_maintenance_collected:.4f} TON")
         logger.info(f"   📈 Inflation: {inflation_factor:.4f}x")
         logger.info(f"   ⚠️ Bankruptcies: {len(bankruptcies)}")
         logger.info(f"   🎲 Events: {len(events)}")
+        spans = ", ".join(f"{name} {span['duration_ms']:.0f}" for name, span in timer.spans.items())
+        logger.info(f"   ⏱️ Total: {total_ms:.0f} ms ({spans})")
         
-        client.close()
-        
+    except LeadershipLost:
+        raise
     except Exception as e:
         logger.error(f"❌ ECONOMIC TICK FAILED: {e}")
         import traceback
@@ -445,6 +959,42 @@ async def economic_tick():
 
 # ==================== MIDNIGHT DECAY ====================
 
+# Users with a non-empty inventory
+DECAY_FILTER = {"resources": {"$type": "object", "$ne": {}}}
+
+# Positive numeric amounts lose floor(amount * rate); anything else is kept.
+# $convert keeps ints as ints, like the Python int arithmetic it replaces.
+DECAY_UPDATE_PIPELINE = [
+    {"$set": {"resources": {"$arrayToObject": {"$map": {
+        "input": {"$objectToArray": "$resources"},
+        "as": "r",
+        "in": {
+            "k": "$$r.k",
+            "v": {"$cond": [
+                {"$and": [{"$isNumber": "$$r.v"}, {"$gt": ["$$r.v", 0]}]},
+                {"$convert": {
+                    "input": {"$max": [0, {"$subtract": [
+                        "$$r.v", {"$floor": {"$multiply": ["$$r.v", MIDNIGHT_DECAY_RATE]}}
+                    ]}]},
+                    "to": {"$type": "$$r.v"},
+                }},
+                "$$r.v",
+            ]},
+        },
+    }}}}},
+]
+
+# Per-resource loss the update above is about to apply
+DECAY_LOSS_PIPELINE = [
+    {"$match": DECAY_FILTER},
+    {"$project": {"_id": 0, "r": {"$objectToArray": "$resources"}}},
+    {"$unwind": "$r"},
+    {"$match": {"$expr": {"$and": [{"$isNumber": "$r.v"}, {"$gt": ["$r.v", 0]}]}}},
+    {"$group": {"_id": "$r.k", "lost": {"$sum": {"$floor": {"$multiply": ["$r.v", MIDNIGHT_DECAY_RATE]}}}}},
+]
+
+
+@scheduled_job("midnight_decay")
 async def midnight_decay():
     """
     Apply 10% decay to all inventories at 00:00 MSK (21:00 UTC).
@@ -453,32 +1003,15 @@ async def midnight_decay():
     try:
         logger.info("🌙 === MIDNIGHT DECAY STARTED ===")
         
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        db = get_job_db()
         
-        users_cursor = db.users.find({"resources": {"$exists": True}})
-        decayed_count = 0
+        # Stats first, then one atomic pipeline update per document
         total_lost = {}
+        async for row in db.users.aggregate(DECAY_LOSS_PIPELINE):
+            total_lost[row["_id"]] = int(row["lost"])
         
-        async for user in users_cursor:
-            resources = user.get("resources", {})
-            if not resources:
-                continue
-            
-            new_resources = {}
-            for resource, amount in resources.items():
-                if isinstance(amount, (int, float)) and amount > 0:
-                    lost = int(amount * MIDNIGHT_DECAY_RATE)
-                    new_resources[resource] = max(0, amount - lost)
-                    total_lost[resource] = total_lost.get(resource, 0) + lost
-                else:
-                    new_resources[resource] = amount
-            
-            await db.users.update_one(
-                {"_id": user["_id"]},
-                {"$set": {"resources": new_resources}}
-            )
-            decayed_count += 1
+        result = await db.users.update_many(DECAY_FILTER, DECAY_UPDATE_PIPELINE)
+        decayed_count = result.matched_count
         
         # Log
         logger.info(f"🌙 Decay applied to {decayed_count} users")
@@ -494,57 +1027,96 @@ async def midnight_decay():
             "resources_lost": total_lost,
         })
         
-        client.close()
-        
     except Exception as e:
         logger.error(f"❌ MIDNIGHT DECAY FAILED: {e}")
 
 
 # ==================== DURABILITY WEAR ====================
 
+# Active businesses that still have durability (missing durability counts as 100)
+WEAR_FILTER = {
+    "is_active": True,
+    "$or": [{"durability": {"$gt": 0}}, {"durability": {"$exists": False}}],
+}
+
+# get_daily_wear inputs per type: (min_wear, max_wear)
+WEAR_RANGES = {
+    business_type: config.get("daily_wear_range", (0.03, 0.05))
+    for business_type, config in BUSINESSES.items()
+}
+
+
+def durability_wear_pipeline(now: datetime) -> list:
+    """
+    Pipeline update applying get_daily_wear over the hours since
+    last_wear_update (or last_tick), computed on the server.
+    Timestamps are the UTC ISO strings the rest of the code writes.
+    """
+    level = {"$ifNull": ["$level", 1]}
+    daily_wear = {"$switch": {
+        "branches": [
+            {
+                "case": {"$eq": ["$business_type", business_type]},
+                "then": {"$min": [0.10, {"$add": [
+                    min_wear, {"$multiply": [max_wear - min_wear, {"$divide": [{"$subtract": [level, 1]}, 9.0]}]}
+                ]}]},
+            }
+            for business_type, (min_wear, max_wear) in WEAR_RANGES.items()
+        ],
+        "default": 0.05,
+    }}
+    
+    anchor = {"$let": {
+        "vars": {"a": {"$ifNull": ["$last_wear_update", "$last_tick"]}},
+        "in": {"$switch": {
+            "branches": [
+                {"case": {"$eq": [{"$type": "$$a"}, "date"]}, "then": "$$a"},
+                {"case": {"$eq": [{"$type": "$$a"}, "string"]}, "then": {"$dateFromString": {
+                    "dateString": {"$substrCP": ["$$a", 0, 19]},
+                    "format": "%Y-%m-%dT%H:%M:%S",
+                    "timezone": "UTC",
+                    "onError": None,
+                }}},
+            ],
+            "default": None,
+        }},
+    }}
+    hours_passed = {"$let": {
+        "vars": {"anchor": anchor},
+        "in": {"$cond": [
+            {"$eq": ["$$anchor", None]},
+            1.0,
+            {"$divide": [{"$subtract": [now, "$$anchor"]}, 3600 * 1000]},
+        ]},
+    }}
+    
+    wear = {"$multiply": [{"$multiply": [daily_wear, 100]}, {"$divide": [hours_passed, 24.0]}]}
+    return [
+        {"$set": {
+            "durability": {"$round": [
+                {"$max": [0, {"$subtract": [{"$ifNull": ["$durability", 100]}, wear]}]}, 2
+            ]},
+            "last_wear_update": now.isoformat(),
+        }},
+    ]
+
+
+@scheduled_job("durability_wear")
 async def apply_global_durability_wear():
     """Apply durability wear to all businesses based on time elapsed"""
     try:
+        if PRODUCTION_MODE == "accrual":
+            logger.info("🔧 Durability wear skipped - accrued on materialization")
+            return
+        
         logger.info("🔧 Applying durability wear...")
         
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        db = get_job_db()
         
-        businesses = await db.businesses.find({"is_active": True}).to_list(length=None)
         now = datetime.now(timezone.utc)
+        result = await db.businesses.update_many(WEAR_FILTER, durability_wear_pipeline(now))
         
-        for business in businesses:
-            business_type = business.get("business_type")
-            level = business.get("level", 1)
-            current_durability = business.get("durability", 100)
-            
-            if current_durability <= 0:
-                continue
-            
-            # Calculate hours since last wear update
-            last_update = business.get("last_wear_update") or business.get("last_tick")
-            hours_passed = 1.0
-            if last_update:
-                try:
-                    last_dt = datetime.fromisoformat(str(last_update).replace('Z', '+00:00'))
-                    hours_passed = (now - last_dt).total_seconds() / 3600
-                except (ValueError, TypeError):
-                    hours_passed = 1.0
-            
-            daily_wear = get_daily_wear(business_type, level)
-            wear_amount = daily_wear * 100 * (hours_passed / 24.0)
-            new_durability = max(0, current_durability - wear_amount)
-            
-            await db.businesses.update_one(
-                {"id": business.get("id")},
-                {"$set": {
-                    "durability": round(new_durability, 2),
-                    "last_wear_update": now.isoformat(),
-                }}
-            )
-        
-        logger.info(f"🔧 Wear applied to {len(businesses)} businesses")
-        client.close()
+        logger.info(f"🔧 Wear applied to {result.modified_count} businesses")
         
     except Exception as e:
         logger.error(f"❌ Durability wear failed: {e}")
@@ -589,6 +1161,284 @@ async def auto_collect_income():
 
 # ==================== CREDIT PROCESSING ====================
 
+# Credits read, prefetched and committed per page
+CREDIT_PAGE_SIZE = int(os.environ.get('CREDIT_PAGE_SIZE', '1000'))
+
+CREDIT_USER_PROJECTION = {"_id": 1, "id": 1, "wallet_address": 1, "balance_ton": 1, "total_income": 1, "created_at": 1}
+
+
+def days_since(timestamp, now: datetime) -> int:
+    """Whole days since an ISO timestamp, 0 when missing or unparsable"""
+    try:
+        return (now - datetime.fromisoformat(str(timestamp).replace("Z", "+00:00"))).days
+    except (ValueError, TypeError):
+        return 0
+
+
+class CreditPlan:
+    """
+    Writes for one page of credits, computed in memory.
+    Balance changes are applied to the prefetched user documents as well,
+    so several credits of one borrower see each other's payments.
+    """
+    
+    def __init__(self, now: datetime):
+        self.now = now
+        self.user_incs = {}
+        self.credit_sets = {}
+        self.business_sets = {}
+        self.plot_sets = {}
+        self.map_cells = []
+        self.listings = []
+        self.notifications = []
+        self.stats = {"credits": 0, "paid_off": 0, "payments": 0, "paid_total": 0.0, "overdue": 0, "seized": 0}
+    
+    def set_credit(self, credit_id: str, fields: dict):
+        self.credit_sets.setdefault(credit_id, {}).update(fields)
+    
+    def inc_balance(self, user: dict, amount: float):
+        user["balance_ton"] = user.get("balance_ton", 0) + amount
+        self.user_incs[user["_id"]] = self.user_incs.get(user["_id"], 0) + amount
+    
+    def notify(self, user_id: str, notification_type: str, message: str):
+        self.notifications.append({
+            "user_id": user_id,
+            "type": notification_type,
+            "message": message,
+            "created_at": self.now.isoformat(),
+            "read": False,
+        })
+    
+    def add_credit(self, credit: dict, users_by_id: dict, users_by_wallet: dict,
+                   businesses: dict, plots: dict):
+        """Payment, overdue transition and seizure of one credit"""
+        now = self.now
+        self.stats["credits"] += 1
+        credit_id = credit["id"]
+        borrower_id = credit.get("borrower_id", "")
+        borrower_wallet = credit.get("borrower_wallet", "")
+        remaining = credit.get("remaining", 0)
+        deduction_pct = credit.get("salary_deduction_percent", 0.10)
+        
+        if remaining <= 0:
+            self.set_credit(credit_id, {"status": "paid", "remaining": 0})
+            self.stats["paid_off"] += 1
+            return
+        
+        borrower = users_by_id.get(borrower_id) or users_by_wallet.get(borrower_wallet)
+        if not borrower:
+            return
+        
+        lender = None
+        lender_id = credit.get("lender_id")
+        if credit.get("lender_type") == "bank" and lender_id:
+            lender = users_by_id.get(lender_id) or users_by_wallet.get(lender_id)
+        
+        # Calculate daily payment from income
+        balance = borrower.get("balance_ton", 0)
+        account_days = days_since(borrower.get("created_at") or now.isoformat(), now)
+        daily_income = borrower.get("total_income", 0) / max(1, account_days or 1)
+        
+        payment = round(daily_income * deduction_pct, 4)
+        
+        # If overdue and doubled rate active, double the payment
+        if credit.get("is_doubled_rate"):
+            payment *= 2
+        
+        # Limit payment to available balance and remaining debt
+        payment = min(payment, balance, remaining)
+        
+        if payment > 0.0001:
+            self.inc_balance(borrower, -payment)
+            
+            new_remaining = round(remaining - payment, 4)
+            update_set = {
+                "remaining": max(0, new_remaining),
+                "paid": round(credit.get("paid", 0) + payment, 4),
+                "last_payment": now.isoformat(),
+            }
+            if new_remaining <= 0:
+                update_set["status"] = "paid"
+                update_set["remaining"] = 0
+            self.set_credit(credit_id, update_set)
+            
+            # Pay to lender if bank
+            if lender:
+                self.inc_balance(lender, payment)
+            
+            self.stats["payments"] += 1
+            self.stats["paid_total"] += payment
+            logger.debug(f"  Credit {credit_id[:8]}: payment {payment:.4f} TON, remaining {new_remaining:.2f}")
+        
+        # Check overdue status
+        overdue_days = credit.get("overdue_penalty_days", 3)
+        last_payment = credit.get("last_payment")
+        since = days_since(last_payment or credit.get("created_at", now.isoformat()), now)
+        
+        # Activate doubled rate after overdue_penalty_days
+        if since >= overdue_days and not credit.get("is_doubled_rate") and payment < 0.0001:
+            self.set_credit(credit_id, {
+                "status": "overdue",
+                "is_doubled_rate": True,
+                "overdue_since": credit.get("overdue_since") or now.isoformat(),
+            })
+            self.notify(borrower_id, "credit_overdue",
+                        f"Кредит просрочен! Ставка удвоена. Погасите долг {remaining:.2f} TON.")
+            self.stats["overdue"] += 1
+            logger.warning(f"  ⚠️ Credit {credit_id[:8]}: OVERDUE - doubled rate activated")
+        
+        # Seize business after 7 days of non-payment
+        overdue_since = credit.get("overdue_since")
+        if overdue_since and credit.get("status") == "overdue" and days_since(overdue_since, now) >= 7:
+            business = businesses.get(credit.get("collateral_business_id"))
+            if business:
+                self.seize(credit, business, plots, lender)
+    
+    def seize(self, credit: dict, business: dict, plots: dict, lender: dict = None):
+        now = self.now
+        biz_id = business["id"]
+        borrower_id = credit.get("borrower_id", "")
+        lender_type = credit.get("lender_type", "government")
+        lender_id = credit.get("lender_id", "government")
+        
+        if lender_type == "government":
+            # Auto-sell at -20%
+            sale_price = round(credit.get("collateral_value", 0) * 0.80, 2)
+            self.business_sets[biz_id] = {
+                "owner": "government",
+                "owner_wallet": "government",
+                "owner_key": "government",
+                "for_sale": True,
+                "sale_price": sale_price,
+                "seized_from": borrower_id,
+                "seized_at": now.isoformat(),
+            }
+            
+            # Also list on land marketplace if plot exists
+            plot = plots.get(business.get("plot_id"))
+            if plot:
+                self.listings.append({
+                    "id": str(uuid.uuid4()),
+                    "plot_id": plot["id"],
+                    "city_id": plot.get("island_id", "ton_island"),
+                    "city_name": "TON Island",
+                    "x": plot.get("x", 0),
+                    "y": plot.get("y", 0),
+                    "seller_id": "government",
+                    "seller_wallet": "government",
+                    "owner_key": "government",
+                    "seller_username": "Государство",
+                    "price": sale_price,
+                    "business": {
+                        "id": biz_id,
+                        "type": business.get("type"),
+                        "level": business.get("level", 1),
+                        "tier": business.get("tier", 1)
+                    },
+                    "status": "active",
+                    "is_seized": True,
+                    "seized_from": borrower_id,
+                    "created_at": now.isoformat()
+                })
+                self.plot_sets[plot["id"]] = {
+                    "owner": "government",
+                    "owner_wallet": "government",
+                    "owner_key": "government",
+                    "seized_from": borrower_id
+                }
+                self.map_cells += island_cells(plot)
+                logger.warning(f"  📢 Land listing created for seized business at {sale_price} TON")
+            
+            logger.warning(f"  🏛️ Business {biz_id[:8]} SEIZED by government, listed at {sale_price} TON")
+        else:
+            # Transfer to bank owner
+            self.business_sets[biz_id] = {
+                "owner": lender_id,
+                "owner_wallet": lender_id,
+                # A lender missing from users is left to the owner key backfill
+                "owner_key": (lender.get("id") or str(lender["_id"])) if lender else None,
+                "seized_from": borrower_id,
+                "seized_at": now.isoformat(),
+            }
+            logger.warning(f"  🏦 Business {biz_id[:8]} SEIZED by bank owner {lender_id[:8]}")
+        
+        self.set_credit(credit["id"], {
+            "status": "seized",
+            "remaining": 0,
+            "seized_at": now.isoformat(),
+        })
+        self.notify(borrower_id, "business_seized", "Ваш бизнес конфискован за неуплату кредита!")
+        self.stats["seized"] += 1
+    
+    async def commit(self, db) -> int:
+        """One unordered bulk_write per touched collection; returns round trips"""
+        batches = [
+            (db.users, [UpdateOne({"_id": k}, {"$inc": {"balance_ton": v}}) for k, v in self.user_incs.items()]),
+            (db.credits, [UpdateOne({"id": k}, {"$set": v}) for k, v in self.credit_sets.items()]),
+            (db.businesses, [UpdateOne({"id": k}, {"$set": v}) for k, v in self.business_sets.items()]),
+            (db.plots, [UpdateOne({"id": k}, {"$set": v}) for k, v in self.plot_sets.items()]),
+            (db.land_listings, [InsertOne(doc) for doc in self.listings]),
+            (db.notifications, [InsertOne(doc) for doc in self.notifications]),
+        ]
+        round_trips = 0
+        for collection, ops in batches:
+            if not ops:
+                continue
+            check_fence()
+            try:
+                await collection.bulk_write(ops, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                logger.error(f"❌ Credit bulk write to {collection.name}: {len(errors)} of {len(ops)} failed")
+            round_trips += 1
+        if self.map_cells:
+            check_fence()
+            await touch_island_cells(db, self.map_cells)
+            round_trips += 1
+        return round_trips
+
+
+async def prefetch_credit_page(db, credits: list) -> tuple:
+    """Borrowers, bank lenders, collateral businesses and their plots for one page, by $in"""
+    ids, wallets = set(), set()
+    for credit in credits:
+        ids.add(credit.get("borrower_id", ""))
+        wallets.add(credit.get("borrower_wallet", ""))
+        if credit.get("lender_type") == "bank" and credit.get("lender_id"):
+            ids.add(credit["lender_id"])
+            wallets.add(credit["lender_id"])
+    ids.discard("")
+    wallets.discard("")
+    
+    users_by_id, users_by_wallet = {}, {}
+    cursor = db.users.find(
+        {"$or": [{"id": {"$in": list(ids)}}, {"wallet_address": {"$in": list(wallets)}}]},
+        CREDIT_USER_PROJECTION,
+    )
+    async for user in cursor:
+        if user.get("id"):
+            users_by_id.setdefault(user["id"], user)
+        if user.get("wallet_address"):
+            users_by_wallet.setdefault(user["wallet_address"], user)
+    
+    # Collateral only matters for credits that may be seized in this run
+    collateral_ids = [
+        c.get("collateral_business_id") for c in credits
+        if c.get("overdue_since") and c.get("status") == "overdue" and c.get("collateral_business_id")
+    ]
+    businesses, plots = {}, {}
+    if collateral_ids:
+        async for business in db.businesses.find({"id": {"$in": collateral_ids}}, {"_id": 0}):
+            businesses[business["id"]] = business
+        plot_ids = [b["plot_id"] for b in businesses.values() if b.get("plot_id")]
+        if plot_ids:
+            async for plot in db.plots.find({"id": {"$in": plot_ids}}, {"_id": 0}):
+                plots[plot["id"]] = plot
+    
+    return users_by_id, users_by_wallet, businesses, plots
+
+
+@scheduled_job("credit_processing")
 async def process_credits():
     """
     Daily credit processing:
@@ -596,387 +1446,272 @@ async def process_credits():
     2. Detect overdue credits (no payment in specified days)
     3. Double rate for overdue credits
     4. Seize businesses after 7 days of non-payment
+    Credits are paged by _id; each page is prefetched with $in and
+    committed with one bulk_write per collection.
     """
     try:
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        db = get_job_db()
         
         now = datetime.now(timezone.utc)
-        active_credits = await db.credits.find(
-            {"status": {"$in": ["active", "overdue"]}},
-            {"_id": 0}
-        ).to_list(500)
+        totals = {}
+        pages = 0
+        round_trips = 0
+        last_id = None
         
-        logger.info(f"💰 Processing {len(active_credits)} active credits...")
+        logger.info("💰 Processing active credits...")
         
-        for credit in active_credits:
-            credit_id = credit["id"]
-            borrower_id = credit.get("borrower_id", "")
-            borrower_wallet = credit.get("borrower_wallet", "")
-            remaining = credit.get("remaining", 0)
-            deduction_pct = credit.get("salary_deduction_percent", 0.10)
-            
-            if remaining <= 0:
-                await db.credits.update_one({"id": credit_id}, {"$set": {"status": "paid", "remaining": 0}})
-                continue
-            
-            # Find borrower
-            borrower = await db.users.find_one(
-                {"$or": [{"id": borrower_id}, {"wallet_address": borrower_wallet}]},
-                {"_id": 0}
-            )
-            if not borrower:
-                continue
+        while True:
+            query = {"status": {"$in": ["active", "overdue"]}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            credits = await db.credits.find(query).sort("_id", 1).limit(CREDIT_PAGE_SIZE).to_list(CREDIT_PAGE_SIZE)
+            if not credits:
+                break
+            last_id = credits[-1]["_id"]
             
-            # Calculate daily payment from income
-            balance = borrower.get("balance_ton", 0)
-            daily_income = borrower.get("total_income", 0) / max(1, (now - datetime.fromisoformat(borrower.get("created_at", now.isoformat()).replace("Z", "+00:00"))).days or 1)
+            users_by_id, users_by_wallet, businesses, plots = await prefetch_credit_page(db, credits)
+            plan = CreditPlan(now)
+            for credit in credits:
+                plan.add_credit(credit, users_by_id, users_by_wallet, businesses, plots)
+            round_trips += await plan.commit(db)
             
-            # Calculate payment amount
-            payment = round(daily_income * deduction_pct, 4)
-            
-            # If overdue and doubled rate active, double the payment
-            if credit.get("is_doubled_rate"):
-                payment *= 2
-            
-            # Limit payment to available balance and remaining debt
-            payment = min(payment, balance, remaining)
-            
-            if payment > 0.0001:
-                # Deduct from borrower
-                user_filter = {"id": borrower_id} if borrower_id else {"wallet_address": borrower_wallet}
-                await db.users.update_one(user_filter, {"$inc": {"balance_ton": -payment}})
-                
-                new_remaining = round(remaining - payment, 4)
-                new_paid = round(credit.get("paid", 0) + payment, 4)
-                
-                update_set = {
-                    "remaining": max(0, new_remaining),
-                    "paid": new_paid,
-                    "last_payment": now.isoformat(),
-                }
-                
-                if new_remaining <= 0:
-                    update_set["status"] = "paid"
-                    update_set["remaining"] = 0
-                
-                await db.credits.update_one({"id": credit_id}, {"$set": update_set})
-                
-                # Pay to lender if bank
-                if credit.get("lender_type") == "bank" and credit.get("lender_id"):
-                    await db.users.update_one(
-                        {"$or": [{"id": credit["lender_id"]}, {"wallet_address": credit["lender_id"]}]},
-                        {"$inc": {"balance_ton": payment}}
-                    )
-                
-                logger.info(f"  Credit {credit_id[:8]}: payment {payment:.4f} TON, remaining {new_remaining:.2f}")
-            
-            # Check overdue status
-            last_payment = credit.get("last_payment")
-            overdue_days = credit.get("overdue_penalty_days", 3)
-            
-            if last_payment:
-                try:
-                    lp = datetime.fromisoformat(last_payment.replace("Z", "+00:00"))
-                    days_since = (now - lp).days
-                except Exception:
-                    days_since = 0
-            else:
-                created = credit.get("created_at", now.isoformat())
-                try:
-                    cr = datetime.fromisoformat(created.replace("Z", "+00:00"))
-                    days_since = (now - cr).days
-                except Exception:
-                    days_since = 0
-            
-            # Activate doubled rate after overdue_penalty_days
-            if days_since >= overdue_days and not credit.get("is_doubled_rate") and payment < 0.0001:
-                await db.credits.update_one({"id": credit_id}, {"$set": {
-                    "status": "overdue",
-                    "is_doubled_rate": True,
-                    "overdue_since": credit.get("overdue_since") or now.isoformat(),
-                }})
-                logger.warning(f"  ⚠️ Credit {credit_id[:8]}: OVERDUE - doubled rate activated")
-                
-                # Send notification
-                await db.notifications.insert_one({
-                    "user_id": borrower_id,
-                    "type": "credit_overdue",
-                    "message": f"Кредит просрочен! Ставка удвоена. Погасите долг {remaining:.2f} TON.",
-                    "created_at": now.isoformat(),
-                    "read": False,
-                })
-            
-            # Seize business after 7 days of non-payment
-            overdue_since = credit.get("overdue_since")
-            if overdue_since:
-                try:
-                    os_dt = datetime.fromisoformat(overdue_since.replace("Z", "+00:00"))
-                    overdue_total_days = (now - os_dt).days
-                except Exception:
-                    overdue_total_days = 0
-                
-                if overdue_total_days >= 7 and credit.get("status") == "overdue":
-                    # SEIZE BUSINESS
-                    biz_id = credit.get("collateral_business_id")
-                    business = await db.businesses.find_one({"id": biz_id}, {"_id": 0})
-                    
-                    if business:
-                        lender_type = credit.get("lender_type", "government")
-                        lender_id = credit.get("lender_id", "government")
-                        
-                        if lender_type == "government":
-                            # Auto-sell at -20%
-                            collateral_value = credit.get("collateral_value", 0)
-                            sale_price = round(collateral_value * 0.80, 2)
-                            
-                            await db.businesses.update_one({"id": biz_id}, {"$set": {
-                                "owner": "government",
-                                "owner_wallet": "government",
-                                "for_sale": True,
-                                "sale_price": sale_price,
-                                "seized_from": borrower_id,
-                                "seized_at": now.isoformat(),
-                            }})
-                            
-                            # Also list on land marketplace if plot exists
-                            plot_id = business.get("plot_id")
-                            if plot_id:
-                                plot = await db.plots.find_one({"id": plot_id}, {"_id": 0})
-                                if plot:
-                                    listing_id = str(uuid.uuid4())
-                                    listing = {
-                                        "id": listing_id,
-                                        "plot_id": plot_id,
-                                        "city_id": plot.get("island_id", "ton_island"),
-                                        "city_name": "TON Island",
-                                        "x": plot.get("x", 0),
-                                        "y": plot.get("y", 0),
-                                        "seller_id": "government",
-                                        "seller_wallet": "government",
-                                        "seller_username": "Государство",
-                                        "price": sale_price,
-                                        "business": {
-                                            "id": biz_id,
-                                            "type": business.get("type"),
-                                            "level": business.get("level", 1),
-                                            "tier": business.get("tier", 1)
-                                        },
-                                        "status": "active",
-                                        "is_seized": True,
-                                        "seized_from": borrower_id,
-                                        "created_at": now.isoformat()
-                                    }
-                                    await db.land_listings.insert_one(listing)
-                                    
-                                    # Update plot owner to government
-                                    await db.plots.update_one({"id": plot_id}, {"$set": {
-                                        "owner": "government",
-                                        "owner_wallet": "government",
-                                        "seized_from": borrower_id
-                                    }})
-                                    
-                                    logger.warning(f"  📢 Land listing created for seized business at {sale_price} TON")
-                            
-                            logger.warning(f"  🏛️ Business {biz_id[:8]} SEIZED by government, listed at {sale_price} TON")
-                        else:
-                            # Transfer to bank owner
-                            await db.businesses.update_one({"id": biz_id}, {"$set": {
-                                "owner": lender_id,
-                                "owner_wallet": lender_id,
-                                "seized_from": borrower_id,
-                                "seized_at": now.isoformat(),
-                            }})
-                            
-                            logger.warning(f"  🏦 Business {biz_id[:8]} SEIZED by bank owner {lender_id[:8]}")
-                        
-                        # Mark credit as seized
-                        await db.credits.update_one({"id": credit_id}, {"$set": {
-                            "status": "seized",
-                            "remaining": 0,
-                            "seized_at": now.isoformat(),
-                        }})
-                        
-                        # Notify borrower
-                        await db.notifications.insert_one({
-                            "user_id": borrower_id,
-                            "type": "business_seized",
-                            "message": f"Ваш бизнес конфискован за неуплату кредита!",
-                            "created_at": now.isoformat(),
-                            "read": False,
-                        })
+            pages += 1
+            for key, value in plan.stats.items():
+                totals[key] = totals.get(key, 0) + value
         
-        logger.info(f"✅ Credit processing complete")
-        client.close()
+        totals["paid_total"] = round(totals.get("paid_total", 0), 4)
+        totals["pages"] = pages
+        totals["write_round_trips"] = round_trips
+        logger.info(f"✅ Credit processing complete: {totals}")
+        return totals
         
+    except LeadershipLost:
+        raise
     except Exception as e:
         logger.error(f"❌ Credit processing error: {e}")
 
 
 # ==================== WAREHOUSE SPOILAGE ====================
 
+# Share of the overflow destroyed each day
+SPOILAGE_RATE = 0.5
+
+# Capacity and usage per user, summed on the server.
+# Businesses are grouped by owner key, resolved to their user by id or wallet
+# (a user may own businesses under both), and only overflowing users are returned.
+WAREHOUSE_OVERFLOW_PIPELINE = [
+    {"$match": {"storage": {"$type": "object"}}},
+    {"$project": {
+        "owner": 1,
+        "capacity": {"$ifNull": ["$storage.capacity", 0]},
+        "used": {"$sum": {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$storage.items", {}]}},
+            "as": "item",
+            "in": {"$max": [0, {"$convert": {"input": "$$item.v", "to": "long", "onError": 0, "onNull": 0}}]},
+        }}},
+    }},
+    {"$group": {"_id": "$owner", "capacity": {"$sum": "$capacity"}, "used": {"$sum": "$used"}}},
+    {"$lookup": {"from": "users", "localField": "_id", "foreignField": "id", "as": "by_id",
+                 "pipeline": [{"$project": {"id": 1, "username": 1}}]}},
+    {"$lookup": {"from": "users", "localField": "_id", "foreignField": "wallet_address", "as": "by_wallet",
+                 "pipeline": [{"$project": {"id": 1, "username": 1}}]}},
+    {"$set": {"user": {"$first": {"$concatArrays": ["$by_id", "$by_wallet"]}}}},
+    {"$match": {"user": {"$ne": None}}},
+    {"$group": {
+        "_id": "$user._id",
+        "user_id": {"$first": "$user.id"},
+        "username": {"$first": "$user.username"},
+        "owners": {"$addToSet": "$_id"},
+        "capacity": {"$sum": "$capacity"},
+        "used": {"$sum": "$used"},
+    }},
+    {"$match": {"$expr": {"$gt": ["$used", "$capacity"]}}},
+]
+
+
+def plan_spoilage(businesses: list, spoilage: int) -> dict:
+    """
+    Destroy `spoilage` units, largest stacks first.
+    Returns {business_id: {"storage.items.<resource>": -amount}}.
+    """
+    biz_items = []  # [(biz_id, resource, amount)]
+    for biz in businesses:
+        for resource, amount in biz.get("storage", {}).get("items", {}).items():
+            try:
+                amt = int(amount)
+            except (TypeError, ValueError):
+                continue
+            if amt > 0:
+                biz_items.append((biz["id"], resource, amt))
+    
+    decrements = {}
+    remaining_spoil = spoilage
+    for biz_id, resource, amount in sorted(biz_items, key=lambda x: -x[2]):
+        if remaining_spoil <= 0:
+            break
+        destroy = min(remaining_spoil, amount)
+        decrements.setdefault(biz_id, {})[f"storage.items.{resource}"] = -destroy
+        remaining_spoil -= destroy
+    return decrements
+
+
+@scheduled_job("warehouse_spoilage")
 async def process_warehouse_spoilage():
     """
     Daily warehouse spoilage:
     If user's total warehouse usage exceeds capacity,
     50% of the overflow is destroyed each day.
+    Capacity and usage come from one aggregation; only overflowing
+    users are loaded and their decrements are written in bulk.
     """
     try:
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
+        db = get_job_db()
+        await ensure_tick_indexes(db)
         
         now = datetime.now(timezone.utc)
         
-        # Get all users with businesses
-        users = await db.users.find({}, {"_id": 0, "id": 1, "wallet_address": 1, "username": 1}).to_list(1000)
+        overflowing = await db.businesses.aggregate(WAREHOUSE_OVERFLOW_PIPELINE, allowDiskUse=True).to_list(None)
         
-        spoiled_count = 0
+        spoiled = []  # [(user, spoilage)]
+        for user in overflowing:
+            spoilage = int((user["used"] - user["capacity"]) * SPOILAGE_RATE)
+            if spoilage > 0:
+                spoiled.append((user, spoilage))
         
-        for user in users:
-            uid = user.get("id", "")
-            wallet = user.get("wallet_address", "")
-            
-            # Get businesses
-            or_q = [{"owner": uid}]
-            if wallet:
-                or_q.append({"owner": wallet})
-            
-            businesses = await db.businesses.find({"$or": or_q}, {"_id": 0}).to_list(50)
-            if not businesses:
-                continue
+        if spoiled:
+            owners = [owner for user, _ in spoiled for owner in user["owners"]]
+            owner_businesses = {}
+            cursor = db.businesses.find({"owner": {"$in": owners}}, {"_id": 0, "id": 1, "owner": 1, "storage.items": 1})
+            async for biz in cursor:
+                owner_businesses.setdefault(biz["owner"], []).append(biz)
             
-            # Calculate total capacity and usage
-            total_capacity = 0
-            total_used = 0
-            biz_items = []  # [(biz_id, resource, amount)]
-            
-            for biz in businesses:
-                storage = biz.get("storage", {})
-                total_capacity += storage.get("capacity", 0)
-                items = storage.get("items", {})
-                for resource, amount in items.items():
-                    amt = int(amount)
-                    if amt > 0:
-                        total_used += amt
-                        biz_items.append((biz["id"], resource, amt))
-            
-            overflow = total_used - total_capacity
-            if overflow <= 0:
-                continue
-            
-            # 50% of overflow is destroyed
-            spoilage = int(overflow * 0.5)
-            if spoilage <= 0:
-                continue
-            
-            # Distribute spoilage proportionally across items
-            remaining_spoil = spoilage
-            for biz_id, resource, amount in sorted(biz_items, key=lambda x: -x[2]):
-                if remaining_spoil <= 0:
-                    break
-                destroy = min(remaining_spoil, amount)
-                await db.businesses.update_one(
-                    {"id": biz_id},
-                    {"$inc": {f"storage.items.{resource}": -destroy}}
-                )
-                remaining_spoil -= destroy
-            
-            spoiled_count += 1
-            logger.info(f"  🗑️ User {user.get('username', uid[:8])}: spoiled {spoilage} units (overflow: {overflow})")
+            business_ops = []
+            notifications = []
+            for user, spoilage in spoiled:
+                businesses = [b for owner in user["owners"] for b in owner_businesses.get(owner, [])]
+                for biz_id, inc in plan_spoilage(businesses, spoilage).items():
+                    business_ops.append(UpdateOne({"id": biz_id}, {"$inc": inc}))
+                
+                uid = user.get("user_id") or ""
+                overflow = user["used"] - user["capacity"]
+                logger.info(f"  🗑️ User {user.get('username') or uid[:8]}: spoiled {spoilage} units (overflow: {overflow})")
+                notifications.append({
+                    "user_id": uid,
+                    "type": "warehouse_spoilage",
+                    "message": f"Склад переполнен! Испорчено {spoilage} единиц товара.",
+                    "created_at": now.isoformat(),
+                    "read": False,
+                })
             
-            # Notify user
-            await db.notifications.insert_one({
-                "user_id": uid,
-                "type": "warehouse_spoilage",
-                "message": f"Склад переполнен! Испорчено {spoilage} единиц товара.",
-                "created_at": now.isoformat(),
-                "read": False,
-            })
+            if business_ops:
+                await db.businesses.bulk_write(business_ops, ordered=False)
+            await db.notifications.insert_many(notifications, ordered=False)
         
-        logger.info(f"✅ Warehouse spoilage: {spoiled_count} users affected")
-        client.close()
+        logger.info(f"✅ Warehouse spoilage: {len(spoiled)} users affected")
+        return {"users_affected": len(spoiled), "overflowing": len(overflowing)}
         
     except Exception as e:
         logger.error(f"❌ Warehouse spoilage error: {e}")
 
 
+# ==================== LEADERBOARD, COUNTERS, OWNER KEYS ====================
+
+@scheduled_job("leaderboard_rebuild")
+async def rebuild_leaderboard_job():
+    """Recompute the materialized leaderboard"""
+    try:
+        return await rebuild_leaderboard(get_job_db())
+    except Exception as e:
+        logger.error(f"❌ Leaderboard rebuild error: {e}")
+
+
+@scheduled_job("counters_reconcile")
+async def reconcile_counters_job():
+    """Correct drift in the /stats game counters"""
+    try:
+        return await reconcile_counters(get_job_db())
+    except Exception as e:
+        logger.error(f"❌ Game counters reconciliation error: {e}")
+
+
+@scheduled_job("owner_key_backfill")
+async def backfill_owner_keys_job():
+    """Set owner_key on documents written without it"""
+    try:
+        return await backfill_owner_keys(get_job_db())
+    except Exception as e:
+        logger.error(f"❌ Owner key backfill error: {e}")
+
+
 # ==================== NOTIFICATIONS SENDER ====================
 
+@scheduled_job("notification_outbox")
+async def deliver_notification_outbox():
+    """Deliver durability alerts queued by the economic tick"""
+    try:
+        return await process_outbox(get_job_db())
+    except Exception as e:
+        logger.error(f"❌ Notification outbox error: {e}")
+
+
+@scheduled_job("notification_sender")
 async def send_pending_notifications():
     """Send pending notifications via Telegram"""
     try:
-        client = AsyncIOMotorClient(mongo_url)
-        db = client[db_name]
-        
-        # Get unread notifications for users with Telegram
-        notifications = await db.notifications.find(
-            {"read": False, "telegram_sent": {"$ne": True}},
-            {"_id": 0}
-        ).sort("created_at", -1).to_list(100)
-        
-        if not notifications:
-            client.close()
-            return
-        
-        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN", "")
-        if not bot_token:
-            client.close()
-            return
-        
-        import aiohttp
-        
-        async with aiohttp.ClientSession() as session:
-            for notif in notifications:
-                user_id = notif.get("user_id", "")
-                user = await db.users.find_one(
-                    {"$or": [{"id": user_id}, {"wallet_address": user_id}]},
-                    {"_id": 0}
-                )
-                if not user or not user.get("telegram_username"):
-                    continue
-                
-                # Get chat_id from stored mapping
-                tg_mapping = await db.telegram_mappings.find_one(
-                    {"username": user.get("telegram_username")},
-                    {"_id": 0}
-                )
-                if not tg_mapping or not tg_mapping.get("chat_id"):
-                    continue
-                
-                chat_id = tg_mapping["chat_id"]
-                message = f"🏙️ TON City\n\n{notif.get('message', '')}"
-                
-                try:
-                    url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-                    await session.post(url, json={
-                        "chat_id": chat_id,
-                        "text": message,
-                        "parse_mode": "HTML"
-                    })
-                    
-                    await db.notifications.update_one(
-                        {"user_id": user_id, "created_at": notif["created_at"]},
-                        {"$set": {"telegram_sent": True}}
-                    )
-                except Exception as e:
-                    logger.error(f"Telegram send error: {e}")
-        
-        client.close()
-        
+        return await dispatch_pending_notifications(get_job_db())
     except Exception as e:
         logger.error(f"❌ Notification sender error: {e}")
 
 
+# Jobs that also run as soon as a worker becomes the leader (first run at startup)
+STARTUP_JOBS = ("leaderboard_rebuild", "owner_key_backfill")
+
+
+def request_job_run(job_id: str) -> bool:
+    """Move a scheduled job's next run to now; False when the job is not scheduled"""
+    if not scheduler or not scheduler.get_job(job_id):
+        return False
+    scheduler.modify_job(job_id, next_run_time=datetime.now(timezone.utc))
+    return True
+
+
+def run_startup_jobs():
+    """Run STARTUP_JOBS now; their next_run_time=now run is skipped while no lease is held yet"""
+    for job_id in STARTUP_JOBS:
+        request_job_run(job_id)
+
+
 def init_scheduler():
     """Initialize APScheduler with all background tasks"""
-    global scheduler
+    global scheduler, scheduler_lease
+    
+    # One instance per job; a late run is coalesced instead of replayed
+    scheduler = AsyncIOScheduler(job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 30})
+    scheduler.add_listener(
+        on_scheduler_event,
+        EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_EXECUTED,
+    )
+    
+    # Every worker starts the scheduler; only the lease holder runs the jobs
+    if LEADER_ELECTION_ENABLED:
+        scheduler_lease = SchedulerLease(get_job_db())
+        scheduler_lease.on_acquired = run_startup_jobs
+        scheduler.add_job(
+            scheduler_lease.heartbeat,
+            trigger=IntervalTrigger(seconds=LEASE_RENEW_SECONDS),
+            id="scheduler_lease_heartbeat",
+            name="Scheduler Lease Heartbeat",
+            next_run_time=datetime.now(timezone.utc),
+            replace_existing=True,
+        )
     
-    scheduler = AsyncIOScheduler()
+    def job(func, job_id):
+        return leader_only(scheduler_lease, job_id, func) if scheduler_lease else func
     
     # Main economic tick - every minute
     scheduler.add_job(
-        economic_tick,
-        trigger=IntervalTrigger(minutes=1),
+        job(economic_tick, "economic_tick"),
+        trigger=IntervalTrigger(seconds=tick_interval_seconds),
         id="economic_tick",
         name="Economic Tick (Every Minute)",
         replace_existing=True,
@@ -984,7 +1719,7 @@ def init_scheduler():
     
     # Midnight decay - daily at 21:00 UTC (00:00 MSK)
     scheduler.add_job(
-        midnight_decay,
+        job(midnight_decay, "midnight_decay"),
         trigger=CronTrigger(hour=21, minute=0),
         id="midnight_decay",
         name="Midnight Decay (00:00 MSK)",
@@ -993,7 +1728,7 @@ def init_scheduler():
     
     # Durability wear - every 6 hours (as backup, main wear happens in tick)
     scheduler.add_job(
-        apply_global_durability_wear,
+        job(apply_global_durability_wear, "durability_wear"),
         trigger=IntervalTrigger(hours=6),
         id="durability_wear",
         name="Durability Wear Check",
@@ -1002,7 +1737,7 @@ def init_scheduler():
     
     # Credit processing - daily at 22:00 UTC (01:00 MSK)
     scheduler.add_job(
-        process_credits,
+        job(process_credits, "credit_processing"),
         trigger=CronTrigger(hour=22, minute=0),
         id="credit_processing",
         name="Credit Processing Daily",
@@ -1011,7 +1746,7 @@ def init_scheduler():
     
     # Warehouse spoilage - daily at 21:30 UTC (00:30 MSK)
     scheduler.add_job(
-        process_warehouse_spoilage,
+        job(process_warehouse_spoilage, "warehouse_spoilage"),
         trigger=CronTrigger(hour=21, minute=30),
         id="warehouse_spoilage",
         name="Warehouse Spoilage Daily",
@@ -1020,24 +1755,108 @@ def init_scheduler():
     
     # Notification sender - every 5 minutes
     scheduler.add_job(
-        send_pending_notifications,
+        job(send_pending_notifications, "notification_sender"),
         trigger=IntervalTrigger(minutes=5),
         id="notification_sender",
         name="Notification Sender",
         replace_existing=True,
     )
     
+    # Notification outbox - alerts queued by the tick
+    scheduler.add_job(
+        job(deliver_notification_outbox, "notification_outbox"),
+        trigger=IntervalTrigger(seconds=OUTBOX_INTERVAL_SECONDS),
+        id="notification_outbox",
+        name="Notification Outbox",
+        replace_existing=True,
+    )
+    
+    # Leaderboard - materialized every few minutes, first build at startup
+    scheduler.add_job(
+        job(rebuild_leaderboard_job, "leaderboard_rebuild"),
+        trigger=IntervalTrigger(minutes=LEADERBOARD_REBUILD_MINUTES),
+        id="leaderboard_rebuild",
+        name="Leaderboard Rebuild",
+        replace_existing=True,
+        next_run_time=datetime.now(timezone.utc),
+    )
+    
+    # Game counters - recounted to correct drift
+    scheduler.add_job(
+        job(reconcile_counters_job, "counters_reconcile"),
+        trigger=IntervalTrigger(minutes=COUNTERS_RECONCILE_MINUTES),
+        id="counters_reconcile",
+        name="Game Counters Reconciliation",
+        replace_existing=True,
+    )
+    
+    # Owner keys - backfill for documents from before the field or paths that clear it
+    scheduler.add_job(
+        job(backfill_owner_keys_job, "owner_key_backfill"),
+        trigger=IntervalTrigger(minutes=OWNER_KEY_BACKFILL_MINUTES),
+        id="owner_key_backfill",
+        name="Owner Key Backfill",
+        next_run_time=datetime.now(timezone.utc),
+        replace_existing=True,
+    )
+    
     logger.info("✅ Scheduler initialized with V2.0 economic engine")
-    logger.info("📅 Economic Tick: Every 1 minute")
+    logger.info(f"📅 Economic Tick: Every {tick_interval_seconds}s (up to {TICK_MAX_INTERVAL_SECONDS}s when over budget)")
     logger.info("📅 Midnight Decay: Daily at 21:00 UTC (00:00 MSK)")
     logger.info("📅 Durability Wear: Every 6 hours")
     logger.info("📅 Credit Processing: Daily at 22:00 UTC")
     logger.info("📅 Warehouse Spoilage: Daily at 21:30 UTC")
     logger.info("📅 Notifications: Every 5 minutes")
+    if scheduler_lease:
+        logger.info(f"👑 Leader election: lease '{scheduler_lease.name}', worker {scheduler_lease.worker_id}")
     
     return scheduler
 
 
+def on_scheduler_event(event):
+    """Record scheduler-side run events and adapt the tick interval"""
+    if event.code == EVENT_JOB_SUBMITTED:
+        run_times = event.scheduled_run_times
+        lag = (datetime.now(timezone.utc) - run_times[-1]).total_seconds() if run_times else None
+        record_scheduler_event(event.job_id, coalesced=max(0, len(run_times) - 1), lag_s=lag)
+        if len(run_times) > 1:
+            logger.warning(f"⏰ {event.job_id}: {len(run_times) - 1} late runs coalesced")
+    elif event.code == EVENT_JOB_MISSED:
+        record_scheduler_event(event.job_id, missed=1)
+        logger.warning(f"⏰ {event.job_id}: run at {event.scheduled_run_time} missed")
+    elif event.code == EVENT_JOB_MAX_INSTANCES:
+        record_scheduler_event(event.job_id, skipped_overlap=1)
+        logger.warning(f"⏰ {event.job_id}: previous run still in progress - skipped")
+    elif event.code == EVENT_JOB_EXECUTED and event.job_id == "economic_tick":
+        adapt_tick_interval()
+
+
+def adapt_tick_interval():
+    """Stretch the tick interval after an over-budget run, step back once runs fit again"""
+    global tick_interval_seconds
+    duration = get_job_metric("economic_tick", "last_duration_s")
+    if duration is None or scheduler is None:
+        return
+    
+    needed = duration / TICK_BUDGET_FRACTION
+    if needed > tick_interval_seconds:
+        interval = min(TICK_MAX_INTERVAL_SECONDS, math.ceil(needed))
+    elif tick_interval_seconds > TICK_INTERVAL_SECONDS and needed <= tick_interval_seconds / 2:
+        interval = max(TICK_INTERVAL_SECONDS, tick_interval_seconds // 2)
+    else:
+        return
+    
+    if interval != tick_interval_seconds:
+        logger.warning(f"⏱️ Economic tick took {duration:.1f}s - interval {tick_interval_seconds}s → {interval}s")
+        tick_interval_seconds = interval
+        scheduler.reschedule_job("economic_tick", trigger=IntervalTrigger(seconds=interval))
+
+
+def get_tick_interval_seconds() -> int:
+    """Current (possibly stretched) economic tick interval"""
+    return tick_interval_seconds
+
+
 def start_scheduler():
     """Start the scheduler"""
     global scheduler
@@ -1054,6 +1873,20 @@ def shutdown_scheduler():
     if scheduler and scheduler.running:
         scheduler.shutdown()
         logger.info("🛑 Scheduler stopped")
+    close_job_db()
+
+
+async def release_scheduler_lease():
+    """Hand the leader lease to another worker before this process exits"""
+    if scheduler_lease:
+        await scheduler_lease.release()
+
+
+def get_scheduler_leader_status() -> dict:
+    """Leader lease state of this process"""
+    if scheduler_lease is None:
+        return {"enabled": False}
+    return scheduler_lease.status()
 
 
 async def trigger_auto_collection_now():
@@ -0,0 +1,80 @@
+"""
+City Pricing Benchmark
+Builds a synthetic square city (200x200 by default), then compares the
+per-cell grid scan that /cities/{city_id}/plots used to run for every land
+cell with one vectorized price grid build plus per-cell lookups. The scan
+is timed on a sample of cells and extrapolated; sampled prices must match
+the grid exactly.
+
+Usage:
+    python benchmarks/bench_city_pricing.py --size 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from city_generator import compute_plot_price, compute_price_grid, ensure_price_grid  # noqa: E402
+
+
+def synthetic_city(size: int, rng: random.Random) -> dict:
+    """Roughly round landmass with a ragged coast"""
+    center = (size - 1) / 2
+    grid = []
+    for y in range(size):
+        row = []
+        for x in range(size):
+            dist = ((x - center) ** 2 + (y - center) ** 2) ** 0.5 / (size / 2)
+            row.append(1 if dist < 0.85 + rng.uniform(-0.1, 0.1) else 0)
+        grid.append(row)
+    return {"id": "bench-city", "grid": grid, "base_price": 10.0, "price_multiplier": 1.2}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-city plot pricing")
+    parser.add_argument("--size", type=int, default=200)
+    parser.add_argument("--sample", type=int, default=50, help="cells priced with the legacy scan")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    city = synthetic_city(args.size, rng)
+    land = [(x, y) for y, row in enumerate(city["grid"]) for x, cell in enumerate(row) if cell == 1]
+
+    sample = rng.sample(land, min(args.sample, len(land)))
+    started = time.perf_counter()
+    legacy = [compute_plot_price(city, x, y) for x, y in sample]
+    per_cell = (time.perf_counter() - started) / len(sample)
+
+    build_timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        fields = compute_price_grid(city)
+        build_timings.append(time.perf_counter() - started)
+    ensure_price_grid(city)
+
+    started = time.perf_counter()
+    price_grid = city["price_grid"]
+    prices = [price_grid[y][x] for x, y in land]
+    lookup = time.perf_counter() - started
+
+    mismatches = sum(1 for (x, y), price in zip(sample, legacy) if fields["price_grid"][y][x] != price)
+    started = time.perf_counter()
+    fresh = ensure_price_grid(city)
+    key_check = time.perf_counter() - started
+
+    print(f"City pricing: {args.size}x{args.size} grid, {len(land)} land cells")
+    print(f"  legacy scan:     {per_cell * 1000:.2f} ms/cell, ~{per_cell * len(land):.1f}s for every land cell (extrapolated)")
+    print(f"  price grid:      best {min(build_timings) * 1000:.1f} ms to build, {lookup * 1000:.1f} ms for {len(prices)} lookups")
+    print(f"  staleness check: {key_check * 1000:.1f} ms, recomputed={bool(fresh)}")
+    print(f"  center of mass:  {fields['center_of_mass']}")
+    print(f"  mismatches:      {mismatches} of {len(sample)} sampled cells")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
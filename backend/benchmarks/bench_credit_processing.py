@@ -0,0 +1,141 @@
+"""
+Credit Processing Benchmark
+Seeds a scratch database with N credits (payments, overdue transitions and
+seizures for government and bank lenders), runs process_credits once and
+reports DB round trips and wall time. Checks that every credit was visited
+and that balances are conserved: what borrowers lost equals what the
+credits were paid, and bank lenders received exactly their share.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_credit_processing.py --credits 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ['DB_NAME'] = os.environ.get('BENCH_DB_NAME', 'ton_city_bench')
+
+import background_tasks  # noqa: E402
+import job_context  # noqa: E402
+from bench_utils import counter  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+COLLECTIONS = ("users", "credits", "businesses", "plots", "land_listings", "notifications")
+
+
+async def insert_batched(collection, docs: list, size: int = 5000):
+    for i in range(0, len(docs), size):
+        await collection.insert_many(docs[i:i + size])
+
+
+async def seed(db, n_credits: int, n_banks: int):
+    """Borrowers with one or two credits each; about 5% seizable, 10% going overdue"""
+    for name in COLLECTIONS:
+        await db[name].delete_many({})
+    rng = random.Random(42)
+    now = datetime.now(timezone.utc)
+    users, credits, businesses, plots = [], [], [], []
+
+    for b in range(n_banks):
+        users.append({"id": f"bank-{b}", "wallet_address": f"0:bank{b:04d}", "balance_ton": 0.0,
+                      "total_income": 0.0, "created_at": now.isoformat()})
+
+    n_borrowers = max(1, n_credits * 2 // 3)
+    for u in range(n_borrowers):
+        users.append({
+            "id": f"user-{u}",
+            "wallet_address": f"0:user{u:08d}",
+            "balance_ton": round(rng.uniform(0, 50), 4),
+            "total_income": round(rng.uniform(0, 500), 4),
+            "created_at": (now - timedelta(days=rng.randint(1, 60))).isoformat(),
+        })
+
+    for i in range(n_credits):
+        borrower = i % n_borrowers
+        bank = rng.random() < 0.5
+        roll = rng.random()
+        credit = {
+            "id": f"credit-{i}",
+            "borrower_id": f"user-{borrower}",
+            "borrower_wallet": f"0:user{borrower:08d}",
+            "lender_type": "bank" if bank else "government",
+            "lender_id": f"bank-{rng.randrange(n_banks)}" if bank else "government",
+            "remaining": round(rng.uniform(1, 100), 4),
+            "paid": 0.0,
+            "salary_deduction_percent": 0.10,
+            "collateral_business_id": f"biz-{i}",
+            "collateral_value": round(rng.uniform(10, 200), 2),
+            "status": "active",
+            "created_at": (now - timedelta(days=rng.randint(0, 10))).isoformat(),
+        }
+        if roll < 0.05:
+            credit.update(status="overdue", is_doubled_rate=True,
+                          overdue_since=(now - timedelta(days=8)).isoformat())
+            businesses.append({"id": f"biz-{i}", "owner": credit["borrower_wallet"],
+                               "business_type": "helios", "level": 1, "plot_id": f"plot-{i}"})
+            plots.append({"id": f"plot-{i}", "owner": credit["borrower_wallet"], "x": i % 100, "y": i // 100})
+        elif roll < 0.06:
+            credit["remaining"] = 0
+        credits.append(credit)
+
+    await insert_batched(db.users, users)
+    await insert_batched(db.credits, credits)
+    await insert_batched(db.businesses, businesses)
+    await insert_batched(db.plots, plots)
+
+
+async def balances(db) -> dict:
+    return {u["id"]: u.get("balance_ton", 0) async for u in db.users.find({}, {"_id": 0, "id": 1, "balance_ton": 1})}
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark process_credits")
+    parser.add_argument("--credits", type=int, default=100_000)
+    parser.add_argument("--banks", type=int, default=50)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Credit processing benchmark: {args.credits} credits, page size {background_tasks.CREDIT_PAGE_SIZE}")
+    await seed(db, args.credits, args.banks)
+    before = await balances(db)
+
+    counter.reset()
+    counter.enabled = True
+    started = time.perf_counter()
+    totals = await background_tasks.process_credits()
+    elapsed = time.perf_counter() - started
+    counter.enabled = False
+
+    after = await balances(db)
+    borrowers_paid = sum(before[k] - after[k] for k in before if k.startswith("user-"))
+    banks_received = sum(after[k] - before[k] for k in before if k.startswith("bank-"))
+    credits_paid = 0.0
+    bank_share = 0.0
+    async for credit in db.credits.find({}, {"_id": 0, "paid": 1, "lender_type": 1}):
+        credits_paid += credit.get("paid", 0)
+        if credit.get("lender_type") == "bank":
+            bank_share += credit.get("paid", 0)
+
+    print(f"  totals:       {totals}")
+    print(f"  round trips:  {counter.total} ({counter.total / max(1, args.credits):.4f} per credit)")
+    print(f"  wall time:    {elapsed:.3f}s")
+    print(f"  commands:     {dict(sorted(counter.counts.items()))}")
+    print(f"  all visited:  {totals['credits'] == args.credits}")
+    print(f"  conserved:    {abs(borrowers_paid - credits_paid) < 1e-3 and abs(banks_received - bank_share) < 1e-3}")
+
+    await client.drop_database(os.environ['DB_NAME'])
+    client.close()
+    job_context.close_job_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+Economic Tick Benchmark
+Seeds a scratch database with N businesses and reports DB round trips
+and wall time of one economic_tick run, per-document vs bulk writes.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_economic_tick.py --businesses 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ['DB_NAME'] = os.environ.get('BENCH_DB_NAME', 'ton_city_bench')
+
+import background_tasks  # noqa: E402
+import job_context  # noqa: E402
+from bench_utils import counter  # noqa: E402
+from business_config import BUSINESSES, RESOURCE_TYPES  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+
+async def seed(db, n_businesses: int, businesses_per_owner: int):
+    """Create owners with full inventories and businesses due for a tick"""
+    await db.users.delete_many({})
+    await db.businesses.delete_many({})
+    await db.economic_snapshots.delete_many({})
+
+    n_owners = max(1, n_businesses // businesses_per_owner)
+    last_tick = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    types = list(BUSINESSES.keys())
+
+    users = [{
+        "id": str(uuid.uuid4()),
+        "wallet_address": f"0:bench{i:08d}",
+        "username": f"bench_{i}",
+        "balance_ton": 100.0,
+        "resources": {r: 1_000_000 for r in RESOURCE_TYPES},
+    } for i in range(n_owners)]
+    await db.users.insert_many(users)
+
+    businesses = [{
+        "id": str(uuid.uuid4()),
+        "owner": users[i % n_owners]["wallet_address"],
+        "business_type": random.choice(types),
+        "level": random.randint(1, 10),
+        "durability": random.uniform(5, 100),
+        "is_active": True,
+        "last_tick": last_tick,
+    } for i in range(n_businesses)]
+    for i in range(0, len(businesses), 5000):
+        await db.businesses.insert_many(businesses[i:i + 5000])
+
+    # The benchmark measures write batching, not lookups
+    await db.businesses.create_index("id")
+    await db.users.create_index("wallet_address")
+    await db.users.create_index("id")
+
+
+async def run_mode(db, bulk: bool, n_businesses: int, businesses_per_owner: int) -> dict:
+    await seed(db, n_businesses, businesses_per_owner)
+    background_tasks.TICK_BULK_WRITES = bulk
+
+    counter.reset()
+    counter.enabled = True
+    started = time.perf_counter()
+    await background_tasks.economic_tick()
+    elapsed = time.perf_counter() - started
+    counter.enabled = False
+
+    per_10k = 10_000 / n_businesses
+    return {
+        "mode": "bulk" if bulk else "per-document",
+        "round_trips": counter.total,
+        "round_trips_per_10k": round(counter.total * per_10k),
+        "wall_time_s": round(elapsed, 3),
+        "wall_time_per_10k_s": round(elapsed * per_10k, 3),
+        "commands": dict(sorted(counter.counts.items())),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark economic_tick write modes")
+    parser.add_argument("--businesses", type=int, default=10_000)
+    parser.add_argument("--per-owner", type=int, default=5, help="Businesses per owner")
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Economic tick benchmark: {args.businesses} businesses, {args.per_owner} per owner")
+    for bulk in (False, True):
+        result = await run_mode(db, bulk, args.businesses, args.per_owner)
+        print(f"\n[{result['mode']}]")
+        print(f"  round trips:        {result['round_trips']} ({result['round_trips_per_10k']} per 10k businesses)")
+        print(f"  wall time:          {result['wall_time_s']}s ({result['wall_time_per_10k_s']}s per 10k businesses)")
+        print(f"  commands:           {result['commands']}")
+
+    await client.drop_database(os.environ['DB_NAME'])
+    client.close()
+    job_context.close_job_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
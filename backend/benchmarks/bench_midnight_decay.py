@@ -0,0 +1,118 @@
+"""
+Midnight Decay Benchmark
+Seeds a scratch database with N users and compares the former per-user
+read/compute/$set loop with the pipeline update_many job: DB round trips,
+wall time, and that both leave identical inventories.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_midnight_decay.py --users 100000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ['DB_NAME'] = os.environ.get('BENCH_DB_NAME', 'ton_city_bench')
+
+import background_tasks  # noqa: E402
+import job_context  # noqa: E402
+from bench_utils import counter  # noqa: E402
+from business_config import MIDNIGHT_DECAY_RATE, RESOURCE_TYPES  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+
+async def legacy_decay_loop(db):
+    """The per-user implementation midnight_decay used before the pipeline update"""
+    async for user in db.users.find({"resources": {"$exists": True}}):
+        resources = user.get("resources", {})
+        if not resources:
+            continue
+        new_resources = {}
+        for resource, amount in resources.items():
+            if isinstance(amount, (int, float)) and amount > 0:
+                lost = int(amount * MIDNIGHT_DECAY_RATE)
+                new_resources[resource] = max(0, amount - lost)
+            else:
+                new_resources[resource] = amount
+        await db.users.update_one({"_id": user["_id"]}, {"$set": {"resources": new_resources}})
+
+
+async def seed(db, n_users: int):
+    """Users with mixed int/float inventories, some empty or without resources"""
+    await db.users.delete_many({})
+    await db.system_events.delete_many({})
+    rng = random.Random(42)
+    resources = list(RESOURCE_TYPES)
+    batch = []
+    for i in range(n_users):
+        user = {"id": f"bench-{i}", "wallet_address": f"0:bench{i:08d}"}
+        if i % 50 != 0:
+            user["resources"] = {
+                r: rng.choice([rng.randint(0, 5000), round(rng.uniform(0, 5000), 2)])
+                for r in rng.sample(resources, rng.randint(0, len(resources)))
+            }
+        batch.append(user)
+        if len(batch) == 5000:
+            await db.users.insert_many(batch)
+            batch = []
+    if batch:
+        await db.users.insert_many(batch)
+
+
+async def inventories(db) -> dict:
+    return {u["id"]: u.get("resources") async for u in db.users.find({}, {"_id": 0, "id": 1, "resources": 1})}
+
+
+async def run_mode(db, mode: str, n_users: int) -> dict:
+    await seed(db, n_users)
+    counter.reset()
+    counter.enabled = True
+    started = time.perf_counter()
+    if mode == "loop":
+        await legacy_decay_loop(db)
+    else:
+        await background_tasks.midnight_decay()
+    elapsed = time.perf_counter() - started
+    counter.enabled = False
+    return {
+        "mode": mode,
+        "round_trips": counter.total,
+        "wall_time_s": round(elapsed, 3),
+        "commands": dict(sorted(counter.counts.items())),
+        "inventories": await inventories(db),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark midnight_decay implementations")
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+
+    print(f"Midnight decay benchmark: {args.users} users")
+    results = []
+    for mode in ("loop", "pipeline"):
+        result = await run_mode(db, mode, args.users)
+        results.append(result)
+        print(f"\n[{result['mode']}]")
+        print(f"  round trips:  {result['round_trips']}")
+        print(f"  wall time:    {result['wall_time_s']}s")
+        print(f"  commands:     {result['commands']}")
+
+    same = results[0]["inventories"] == results[1]["inventories"]
+    print(f"\nInventories identical: {same}")
+
+    await client.drop_database(os.environ['DB_NAME'])
+    client.close()
+    job_context.close_job_db()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,36 @@
+"""
+Shared benchmark helpers: application round-trip counting via pymongo monitoring.
+"""
+from pymongo import monitoring
+
+# Commands that are connection handshakes/heartbeats, not application round trips
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+
+class RoundTripCounter(monitoring.CommandListener):
+    """Counts application commands sent to the server"""
+
+    def __init__(self):
+        self.counts = {}
+        self.enabled = False
+
+    def started(self, event):
+        if self.enabled and event.command_name not in IGNORED_COMMANDS:
+            self.counts[event.command_name] = self.counts.get(event.command_name, 0) + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def reset(self):
+        self.counts = {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+counter = RoundTripCounter()
+monitoring.register(counter)
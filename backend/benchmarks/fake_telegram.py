@@ -0,0 +1,88 @@
+"""
+Fake Telegram Bot API
+Local sendMessage endpoint for dispatcher throughput tests. Enforces a
+global and a per-chat rate like Telegram does and answers excess requests
+with 429 and `parameters.retry_after`.
+
+Usage:
+    python benchmarks/fake_telegram.py --port 8081
+    TELEGRAM_API_BASE=http://127.0.0.1:8081 ...
+"""
+import argparse
+import asyncio
+import math
+import time
+
+from aiohttp import web
+
+
+class FakeTelegram:
+    """Counts accepted and throttled messages per chat"""
+
+    def __init__(self, global_rate: float = 30, chat_rate: float = 1, latency: float = 0.0,
+                 integer_retry_after: bool = True):
+        self.global_rate = global_rate
+        self.chat_rate = chat_rate
+        self.latency = latency
+        self.integer_retry_after = integer_retry_after
+        self.global_next = 0.0
+        self.chat_next = {}
+        self.accepted = 0
+        self.throttled = 0
+        self.per_chat = {}
+
+    def _retry_after(self, seconds: float):
+        return max(1, math.ceil(seconds)) if self.integer_retry_after else round(seconds, 3)
+
+    async def send_message(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        chat_id = payload.get("chat_id")
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        now = time.monotonic()
+        # A little slack so a client pacing exactly at the limit is not throttled by jitter
+        wait = max(self.chat_next.get(chat_id, 0.0) - now, self.global_next - now) - 0.005
+        if wait > 0:
+            self.throttled += 1
+            return web.json_response({
+                "ok": False,
+                "error_code": 429,
+                "description": "Too Many Requests",
+                "parameters": {"retry_after": self._retry_after(wait)},
+            }, status=429)
+
+        self.global_next = max(self.global_next, now) + 1 / self.global_rate
+        self.chat_next[chat_id] = max(self.chat_next.get(chat_id, 0.0), now) + 1 / self.chat_rate
+        self.accepted += 1
+        self.per_chat[chat_id] = self.per_chat.get(chat_id, 0) + 1
+        return web.json_response({"ok": True, "result": {"chat": {"id": chat_id}, "text": payload.get("text")}})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/sendMessage", self.send_message)
+        return app
+
+
+async def start_fake_telegram(fake: FakeTelegram, port: int = 0) -> tuple:
+    """Start on 127.0.0.1; returns (runner, base_url)"""
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", port)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram sendMessage endpoint")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate", type=float, default=1)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+    web.run_app(FakeTelegram(args.global_rate, args.chat_rate, args.latency).app(), host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
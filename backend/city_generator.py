@@ -1,13 +1,21 @@
 """
 City Generator Module for TON City Builder
 Generates cities with organic/chaotic shapes
+
+Plot prices depend only on the grid, base_price and price_multiplier, so each
+city carries a precomputed `price_grid` (plus its center of mass) keyed by a
+hash of those inputs; it is rebuilt only when one of them changes.
 """
+import hashlib
+import json
 import random
 import math
 from typing import List, Dict, Tuple
 import uuid
 from datetime import datetime, timezone
 
+import numpy as np
+
 def generate_organic_shape(target_cells: int = 450, width: int = 30, height: int = 25) -> List[List[int]]:
     """
     Generate an organic blob-like shape using cellular automata
@@ -384,14 +392,79 @@ def create_demo_cities() -> List[Dict]:
         "created_at": datetime.now(timezone.utc).isoformat()
     })
     
+    for city in cities:
+        ensure_price_grid(city)
+    
     return cities
 
 
+# ==================== PLOT PRICING ====================
+
+PRICING_FIELDS = ("grid", "base_price", "price_multiplier")
+
+
+def pricing_key(city: Dict) -> str:
+    """Hash of the inputs the price grid is derived from"""
+    inputs = json.dumps([city.get(f) for f in PRICING_FIELDS], separators=(",", ":"))
+    return hashlib.sha1(inputs.encode()).hexdigest()
+
+
+def compute_price_grid(city: Dict) -> Dict:
+    """
+    Price of every cell in one vectorized pass: center plots cost
+    base_price * price_multiplier, falling off linearly to half of that
+    at max(width, height) / 2 from the land's center of mass.
+    """
+    grid = np.asarray(city["grid"], dtype=np.int8)
+    height, width = grid.shape
+    land_y, land_x = np.nonzero(grid == 1)
+
+    if land_x.size == 0:
+        prices = np.full((height, width), float(city["base_price"]))
+        center = None
+    else:
+        center_x = int(land_x.sum()) / land_x.size
+        center_y = int(land_y.sum()) / land_y.size
+        ys, xs = np.indices((height, width), dtype=np.float64)
+        dist = np.sqrt((xs - center_x) ** 2 + (ys - center_y) ** 2)
+        dist_factor = 1 - (dist / (max(width, height) / 2)) * 0.5
+        prices = city["base_price"] * city["price_multiplier"] * dist_factor
+        center = [center_x, center_y]
+
+    return {
+        "price_grid": [[round(p, 2) for p in row] for row in prices.tolist()],
+        "center_of_mass": center,
+        "pricing_key": pricing_key(city),
+    }
+
+
+def ensure_price_grid(city: Dict) -> Dict:
+    """
+    Attach a fresh price grid to the city when it is missing or its inputs changed.
+    Returns the recomputed fields (to persist), or {} when the stored grid is current.
+    """
+    if city.get("price_grid") and city.get("pricing_key") == pricing_key(city):
+        return {}
+    fields = compute_price_grid(city)
+    city.update(fields)
+    return fields
+
+
 def calculate_plot_price_in_city(city: Dict, x: int, y: int) -> float:
     """
     Calculate plot price based on position in city
     Center plots are more expensive
     """
+    if not city.get("price_grid"):
+        ensure_price_grid(city)
+    price_grid = city["price_grid"]
+    if 0 <= y < len(price_grid) and 0 <= x < len(price_grid[y]):
+        return price_grid[y][x]
+    return compute_plot_price(city, x, y)
+
+
+def compute_plot_price(city: Dict, x: int, y: int) -> float:
+    """Single-cell price straight from the grid scan; reference for the price grid"""
     grid = city["grid"]
     height = len(grid)
     width = len(grid[0]) if grid else 0
@@ -0,0 +1,155 @@
+"""
+TON-City City List
+GET /cities is served from a short-lived per-process cache.
+
+- Owned plots and businesses of every city come from one aggregation
+  ($group on plots, $unionWith a $group on businesses, keyed by city_id)
+  instead of two count_documents per city
+- Each city ships a compact silhouette (downsampled, run-length encoded)
+  instead of its full grid
+- Entries live for CITY_LIST_TTL_SECONDS; writes in this process that change
+  the counts call invalidate_city_list() so the next read rebuilds
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import List
+
+from db_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+CITY_LIST_TTL_SECONDS = int(os.environ.get('CITY_LIST_TTL_SECONDS', '30'))
+SILHOUETTE_MAX_SIDE = int(os.environ.get('SILHOUETTE_MAX_SIDE', '48'))
+
+# Only what the list view needs; grids are reduced to silhouettes
+CITY_LIST_PROJECTION = {
+    "_id": 0, "id": 1, "name": 1, "description": 1, "style": 1, "base_price": 1, "grid": 1, "stats": 1,
+}
+
+
+async def ensure_city_list_indexes(db):
+    await ensure_indexes(db, "plots", "businesses")
+
+
+def compact_silhouette(grid: List[List[int]], max_side: int = SILHOUETTE_MAX_SIDE) -> dict:
+    """
+    Land mask downsampled so neither side exceeds max_side (a block is land
+    when any of its cells is), then run-length encoded row-major as
+    alternating water/land run lengths, starting with water.
+    """
+    height = len(grid)
+    width = len(grid[0]) if height else 0
+    step = max(1, -(-max(width, height) // max_side))
+    out_w, out_h = -(-width // step), -(-height // step)
+
+    runs, current, length = [], 0, 0
+    for by in range(out_h):
+        rows = grid[by * step:(by + 1) * step]
+        for bx in range(out_w):
+            land = 1 if any(1 in row[bx * step:(bx + 1) * step] for row in rows) else 0
+            if land == current:
+                length += 1
+            else:
+                runs.append(length)
+                current, length = land, 1
+    runs.append(length)
+    return {"w": out_w, "h": out_h, "rle": runs}
+
+
+def expand_silhouette(silhouette: dict) -> List[List[int]]:
+    """Inverse of compact_silhouette (downsampled grid)"""
+    cells, value = [], 0
+    for run in silhouette["rle"]:
+        cells.extend([value] * run)
+        value ^= 1
+    w = silhouette["w"]
+    return [cells[i:i + w] for i in range(0, w * silhouette["h"], w)]
+
+
+def city_counts_pipeline(city_ids: list) -> list:
+    """Owned plots and businesses per city_id, in one plots aggregation"""
+    return [
+        {"$match": {"city_id": {"$in": city_ids}, "owner": {"$ne": None}}},
+        {"$group": {"_id": "$city_id", "owned_plots": {"$sum": 1}, "total_businesses": {"$sum": 0}}},
+        {"$unionWith": {"coll": "businesses", "pipeline": [
+            {"$match": {"city_id": {"$in": city_ids}}},
+            {"$group": {"_id": "$city_id", "owned_plots": {"$sum": 0}, "total_businesses": {"$sum": 1}}},
+        ]}},
+        {"$group": {
+            "_id": "$_id",
+            "owned_plots": {"$sum": "$owned_plots"},
+            "total_businesses": {"$sum": "$total_businesses"},
+        }},
+    ]
+
+
+async def city_counts(db, city_ids: list) -> dict:
+    if not city_ids:
+        return {}
+    await ensure_city_list_indexes(db)
+    return {
+        row["_id"]: row
+        async for row in db.plots.aggregate(city_counts_pipeline(city_ids))
+    }
+
+
+def _localized(value, default: str) -> str:
+    if isinstance(value, dict):
+        return value.get("ru") or value.get("en") or default
+    return value or default
+
+
+def city_list_entry(city: dict, counts: dict) -> dict:
+    stats = city.get("stats", {})
+    return {
+        "id": city["id"],
+        "name": _localized(city.get("name"), "Unknown"),
+        "description": _localized(city.get("description"), ""),
+        "style": city["style"],
+        "base_price": city["base_price"],
+        "silhouette": compact_silhouette(city.get("grid") or []),
+        "stats": {
+            "total_plots": stats.get("total_plots", 0),
+            "owned_plots": counts.get("owned_plots", 0),
+            "total_businesses": counts.get("total_businesses", 0),
+            "monthly_volume": stats.get("monthly_volume", 0),
+            "active_players": stats.get("active_players", 0),
+        },
+    }
+
+
+class CityListCache:
+    """GET /cities response of this process, rebuilt after CITY_LIST_TTL_SECONDS or invalidation"""
+
+    def __init__(self, ttl: float = CITY_LIST_TTL_SECONDS):
+        self.ttl = ttl
+        self.value = None
+        self.expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def invalidate(self):
+        self.expires_at = 0.0
+
+    async def get(self, db, cities: list = None) -> dict:
+        """`cities` lets a caller that just loaded (or seeded) them skip the read"""
+        if self.value is not None and time.monotonic() < self.expires_at:
+            return self.value
+        async with self._lock:
+            if self.value is not None and time.monotonic() < self.expires_at:
+                return self.value
+            if cities is None:
+                cities = await db.cities.find({}, CITY_LIST_PROJECTION).to_list(None)
+            counts = await city_counts(db, [c["id"] for c in cities])
+            result = [city_list_entry(c, counts.get(c["id"], {})) for c in cities]
+            self.value = {"cities": result, "total": len(result)}
+            self.expires_at = time.monotonic() + self.ttl
+        return self.value
+
+
+city_list_cache = CityListCache()
+
+
+def invalidate_city_list():
+    city_list_cache.invalidate()
@@ -0,0 +1,293 @@
+"""
+TON-City Database Indexes
+Every MongoDB index the backend relies on, declared in one place.
+
+- INDEXES maps collection -> IndexModels; names are pymongo's defaults
+- ensure_indexes() creates the declared indexes of a few collections once per
+  process; the ensure_*_indexes helpers of individual modules delegate to it,
+  so jobs and CLIs started without the API startup sync still get them
+- sync_indexes() creates what is missing and reports conflicts (same name,
+  different options); it runs at API startup and is idempotent
+- HOT_QUERIES lists the filters of hot endpoints and jobs; check_query_plans()
+  explains each one and reports those whose winning plan is a COLLSCAN
+  (tests/test_db_indexes.py runs it against a scratch database)
+
+Usage:
+    python db_indexes.py sync [--drop-unknown] [--rebuild]
+    python db_indexes.py check
+"""
+import logging
+
+from pymongo import ASCENDING as ASC, DESCENDING as DESC, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel("id"),
+        IndexModel("wallet_address"),
+        IndexModel("raw_address"),
+        IndexModel("email"),
+        IndexModel("username"),
+    ],
+    "businesses": [
+        IndexModel("id"),
+        IndexModel("owner_key"),
+        IndexModel("owner"),
+        IndexModel("owner_wallet"),
+        IndexModel("plot_id"),
+        IndexModel("city_id"),
+        IndexModel("business_type"),
+        IndexModel([("island_id", ASC), ("x", ASC), ("y", ASC)]),
+        IndexModel("next_state_change_at", sparse=True),
+    ],
+    "plots": [
+        IndexModel("id"),
+        IndexModel("owner_key"),
+        IndexModel("owner"),
+        IndexModel("business_id"),
+        IndexModel([("city_id", ASC), ("owner", ASC)]),
+        IndexModel([("x", ASC), ("y", ASC)]),
+        # One plot per cell of the island and of each city
+        IndexModel([("island_id", ASC), ("x", ASC), ("y", ASC)], unique=True,
+                   partialFilterExpression={"island_id": {"$exists": True}}),
+        IndexModel([("city_id", ASC), ("x", ASC), ("y", ASC)], unique=True,
+                   partialFilterExpression={"city_id": {"$exists": True}}),
+    ],
+    "market_listings": [
+        IndexModel("id"),
+        IndexModel([("status", ASC), ("resource_type", ASC), ("price_per_unit", ASC)]),
+        IndexModel([("status", ASC), ("created_at", DESC)]),
+        IndexModel([("owner_key", ASC), ("status", ASC)]),
+        IndexModel([("seller_id", ASC), ("status", ASC)]),
+    ],
+    "land_listings": [
+        IndexModel("id"),
+        IndexModel([("status", ASC), ("price", ASC)]),
+        IndexModel("owner_key"),
+        IndexModel("plot_id"),
+    ],
+    "transactions": [
+        IndexModel("id"),
+        IndexModel([("user_id", ASC), ("created_at", DESC)]),
+        IndexModel([("user_wallet", ASC), ("created_at", DESC)]),
+        IndexModel([("tx_type", ASC), ("status", ASC)]),
+        IndexModel([("tx_type", ASC), ("created_at", DESC)]),
+        IndexModel("created_at"),
+    ],
+    "chat_messages": [
+        IndexModel([("chat_type", ASC), ("created_at", DESC)]),
+        IndexModel([("chat_type", ASC), ("city_id", ASC), ("created_at", DESC)]),
+        IndexModel([("sender_id", ASC), ("recipient_id", ASC), ("created_at", DESC)]),
+    ],
+    "credits": [
+        IndexModel("id"),
+        IndexModel("status"),
+        IndexModel([("owner_key", ASC), ("status", ASC)]),
+        IndexModel([("borrower_id", ASC), ("status", ASC)]),
+        IndexModel([("borrower_wallet", ASC), ("status", ASC)]),
+        IndexModel([("collateral_business_id", ASC), ("status", ASC)]),
+    ],
+    "deposits": [
+        IndexModel("tx_hash"),
+    ],
+    "notifications": [
+        IndexModel([("read", ASC), ("telegram_status", ASC)]),
+        IndexModel("user_id"),
+    ],
+    "telegram_mappings": [IndexModel("username")],
+    "leaderboard": [
+        IndexModel([("balance_ton", DESC), ("_id", ASC)]),
+        IndexModel([("total_income", DESC), ("_id", ASC)]),
+        IndexModel([("businesses_count", DESC), ("_id", ASC)]),
+        IndexModel([("plots_count", DESC), ("_id", ASC)]),
+        IndexModel("rebuilt_at"),
+    ],
+    "map_changes": [
+        IndexModel([("island_id", ASC), ("version", ASC)]),
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "economic_snapshots": [
+        IndexModel([("type", ASC), ("timestamp", DESC)]),
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "economic_snapshot_rollups": [
+        IndexModel([("resolution", ASC), ("bucket", DESC)]),
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "notification_outbox": [
+        IndexModel([("status", ASC), ("_id", ASC)]),
+        IndexModel("expires_at", expireAfterSeconds=0),
+    ],
+    "notification_dedupe": [IndexModel("expires_at", expireAfterSeconds=0)],
+    "accrual_claims": [IndexModel("expires_at", expireAfterSeconds=0)],
+    "scheduler_leases": [IndexModel("expires_at", expireAfterSeconds=0)],
+}
+
+# (name, collection, filter, sort) of queries on hot paths; none may COLLSCAN
+HOT_QUERIES = [
+    ("user by wallet", "users", {"wallet_address": "0:w"}, None),
+    ("user by email", "users", {"email": "a@b.c"}, None),
+    ("user by username", "users", {"username": "u"}, None),
+    ("user by id", "users", {"id": "u1"}, None),
+    ("business by id", "businesses", {"id": "b1"}, None),
+    ("businesses of user", "businesses", {"owner_key": "u1"}, None),
+    ("businesses of user (compat)", "businesses", {"$or": [{"owner": {"$in": ["u1", "0:w"]}},
+                                                           {"owner_wallet": {"$in": ["u1", "0:w"]}}]}, None),
+    ("plots of user", "plots", {"owner_key": "u1"}, None),
+    ("owner key backfill", "businesses", {"owner_key": None, "$or": [
+        {"owner": {"$nin": [None, ""]}}, {"owner_wallet": {"$nin": [None, ""]}}]}, [("_id", ASC)]),
+    ("businesses on plot", "businesses", {"plot_id": "p1"}, None),
+    ("businesses in city", "businesses", {"city_id": "c1"}, None),
+    ("business on island cell", "businesses", {"island_id": "ton_island", "x": 1, "y": 2}, None),
+    ("patron businesses", "businesses", {"business_type": {"$in": ["validator", "gram_bank"]}}, None),
+    ("island plot", "plots", {"island_id": "ton_island", "x": 1, "y": 2}, None),
+    ("city plot", "plots", {"city_id": "c1", "x": 1, "y": 2}, None),
+    ("plot by id", "plots", {"id": "p1"}, None),
+    ("plot by business", "plots", {"business_id": "b1"}, None),
+    ("market listings", "market_listings", {"status": "active", "resource_type": "energy"}, [("price_per_unit", ASC)]),
+    ("my market listings", "market_listings", {"owner_key": "u1", "status": "active"}, None),
+    ("my land listings", "land_listings", {"owner_key": "u1"}, [("created_at", DESC)]),
+    ("land listings", "land_listings", {"status": "active"}, [("price", ASC)]),
+    ("transaction history", "transactions", {"$or": [{"user_wallet": "0:w"}, {"user_id": "u1"}]}, [("created_at", DESC)]),
+    ("withdrawal queue", "transactions", {"user_wallet": "0:w", "tx_type": {"$in": ["withdrawal", "instant_withdrawal"]}},
+     [("created_at", DESC)]),
+    ("market purchases", "transactions", {"tx_type": "market_purchase", "$or": [
+        {"from_address": {"$in": ["u1"]}}, {"buyer_id": {"$in": ["u1"]}}]}, [("created_at", DESC)]),
+    ("pending withdrawals", "transactions", {"tx_type": "withdrawal", "status": "pending"}, None),
+    ("global chat", "chat_messages", {"chat_type": "global"}, [("created_at", DESC)]),
+    ("city chat", "chat_messages", {"chat_type": "city", "city_id": "c1"}, [("created_at", DESC)]),
+    ("private chat", "chat_messages", {"chat_type": "private", "$or": [
+        {"sender_id": "a", "recipient_id": "b"}, {"sender_id": "b", "recipient_id": "a"}]}, [("created_at", DESC)]),
+    ("open credits", "credits", {"status": {"$in": ["active", "overdue"]}}, [("_id", ASC)]),
+    ("credits of borrower", "credits", {"owner_key": "u1", "status": {"$in": ["active", "overdue"]}}, None),
+    ("credit on collateral", "credits", {"collateral_business_id": "b1", "status": {"$in": ["active", "overdue"]}}, None),
+    ("deposit by hash", "deposits", {"tx_hash": "h"}, None),
+]
+
+# Collections whose declared indexes this process has already created
+_ensured = set()
+
+# Options that make two indexes with the same keys different
+_OPTIONS = ("unique", "sparse", "expireAfterSeconds", "partialFilterExpression")
+
+
+def _same_index(declared: dict, current: dict) -> bool:
+    if list(declared["key"].items()) != list(current["key"].items()):
+        return False
+    return all(declared.get(opt, False if opt in ("unique", "sparse") else None) ==
+               current.get(opt, False if opt in ("unique", "sparse") else None) for opt in _OPTIONS)
+
+
+async def ensure_indexes(db, *collections):
+    """Create the declared indexes of these collections, once per process"""
+    for collection in collections:
+        if collection in _ensured:
+            continue
+        try:
+            await db[collection].create_indexes(INDEXES[collection])
+        except OperationFailure as e:
+            # Conflicts are reported (and rebuilt) by sync_indexes
+            logger.warning(f"⚠️ Indexes of {collection} not ensured (run db_indexes.py sync): {e}")
+        _ensured.add(collection)
+
+
+async def sync_indexes(db, drop_unknown: bool = False, rebuild: bool = False) -> dict:
+    """
+    Create missing declared indexes. An index with a declared name but other
+    options is a conflict: reported, or dropped and recreated with `rebuild`.
+    `drop_unknown` removes indexes that are not declared.
+    """
+    report = {"created": [], "ok": 0, "conflicts": [], "failed": [], "dropped": []}
+    for collection, models in INDEXES.items():
+        coll = db[collection]
+        existing = {ix["name"]: ix async for ix in coll.list_indexes()}
+        declared = set()
+        for model in models:
+            spec = model.document
+            name = spec["name"]
+            declared.add(name)
+            current = existing.get(name)
+            if current is not None and _same_index(spec, current):
+                report["ok"] += 1
+                continue
+            if current is not None:
+                if not rebuild:
+                    report["conflicts"].append(f"{collection}.{name}")
+                    continue
+                await coll.drop_index(name)
+                report["dropped"].append(f"{collection}.{name}")
+            try:
+                await coll.create_indexes([model])
+                report["created"].append(f"{collection}.{name}")
+            except OperationFailure as e:
+                # e.g. duplicate plot coordinates under a unique index
+                report["failed"].append(f"{collection}.{name}: {e.details.get('errmsg', e) if e.details else e}")
+        if drop_unknown:
+            for name in existing.keys() - declared - {"_id_"}:
+                await coll.drop_index(name)
+                report["dropped"].append(f"{collection}.{name}")
+
+    _ensured.update(INDEXES)
+    if report["created"] or report["dropped"]:
+        logger.info(f"🗂️ Indexes synced: created {report['created']}, dropped {report['dropped']}")
+    for problem in report["conflicts"]:
+        logger.warning(f"⚠️ Index conflict (run db_indexes.py sync --rebuild): {problem}")
+    for problem in report["failed"]:
+        logger.error(f"❌ Index creation failed: {problem}")
+    return report
+
+
+def _plan_stages(plan) -> list:
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(_plan_stages(value))
+    return stages
+
+
+async def explain_stages(db, collection: str, query: dict, sort=None) -> list:
+    command = {"find": collection, "filter": query}
+    if sort:
+        command["sort"] = dict(sort)
+    explained = await db.command("explain", command, verbosity="queryPlanner")
+    return _plan_stages(explained["queryPlanner"]["winningPlan"])
+
+
+async def check_query_plans(db) -> list:
+    """Names of HOT_QUERIES whose winning plan scans a whole collection"""
+    collscans = []
+    for name, collection, query, sort in HOT_QUERIES:
+        if "COLLSCAN" in await explain_stages(db, collection, query, sort):
+            collscans.append(name)
+    return collscans
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from job_context import get_job_db, close_job_db
+
+    logging.basicConfig(level=logging.INFO)
+    args = sys.argv[1:]
+    if not args or args[0] not in ("sync", "check"):
+        sys.exit("usage: python db_indexes.py sync [--drop-unknown] [--rebuild] | check")
+    db = get_job_db()
+    failed = False
+    if args[0] == "sync":
+        report = asyncio.run(sync_indexes(db, drop_unknown="--drop-unknown" in args, rebuild="--rebuild" in args))
+        print(report)
+        failed = bool(report["conflicts"] or report["failed"])
+    else:
+        collscans = asyncio.run(check_query_plans(db))
+        print(f"COLLSCAN: {collscans}" if collscans else "All hot queries use an index")
+        failed = bool(collscans)
+    close_job_db()
+    sys.exit(1 if failed else 0)
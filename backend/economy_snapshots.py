@@ -0,0 +1,180 @@
+"""
+TON-City Economic Snapshot Storage
+Raw tick snapshots plus bucketed rollups for charts over long ranges.
+
+- `economic_snapshots` keeps one raw document per tick for
+  SNAPSHOT_RAW_RETENTION_HOURS (TTL on expires_at)
+- `economic_snapshot_rollups` keeps one document per resolution and bucket
+  (5m, 1h, 1d), updated incrementally by every tick with one bulk upsert:
+  sums of the tick totals, average inflation and the closing market prices
+- 5m and hourly buckets expire after their own retention; daily ones are kept
+
+Usage (one-off rollup of snapshots written before rollups existed):
+    python economy_snapshots.py backfill
+"""
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from db_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_RAW_RETENTION_HOURS = int(os.environ.get('SNAPSHOT_RAW_RETENTION_HOURS', '48'))
+
+# resolution -> (bucket seconds, retention days or None to keep forever)
+ROLLUP_RESOLUTIONS = {
+    "5m": (300, int(os.environ.get('SNAPSHOT_5M_RETENTION_DAYS', '30'))),
+    "1h": (3600, int(os.environ.get('SNAPSHOT_1H_RETENTION_DAYS', '365'))),
+    "1d": (86400, None),
+}
+RESOLUTIONS = ("raw",) + tuple(ROLLUP_RESOLUTIONS)
+
+# Tick totals summed into every bucket
+SUMMED_FIELDS = (
+    "businesses_processed", "total_tax_collected", "total_maintenance_collected",
+    "npc_interventions", "bankruptcies",
+)
+
+MAX_SNAPSHOTS = 2000
+
+async def ensure_snapshot_indexes(db):
+    await ensure_indexes(db, "economic_snapshots", "economic_snapshot_rollups")
+
+
+def bucket_start(moment: datetime, seconds: int) -> datetime:
+    epoch = int(moment.timestamp())
+    return datetime.fromtimestamp(epoch - epoch % seconds, tz=timezone.utc)
+
+
+def raw_expiry(now: datetime) -> datetime:
+    return now + timedelta(hours=SNAPSHOT_RAW_RETENTION_HOURS)
+
+
+def rollup_updates(snapshot: dict, now: datetime) -> list:
+    """One upsert per resolution folding this tick into its bucket"""
+    inc = {field: snapshot.get(field, 0) for field in SUMMED_FIELDS}
+    inc["ticks"] = 1
+    inc["inflation_sum"] = snapshot.get("inflation_factor", 1.0)
+    for resource, amount in snapshot.get("total_production", {}).items():
+        inc[f"total_production.{resource}"] = amount
+    for resource, amount in snapshot.get("total_consumption", {}).items():
+        inc[f"total_consumption.{resource}"] = amount
+
+    ops = []
+    for resolution, (seconds, retention_days) in ROLLUP_RESOLUTIONS.items():
+        bucket = bucket_start(now, seconds)
+        fields = {"market_prices": snapshot.get("market_prices", {}), "last_tick_at": now.isoformat()}
+        if retention_days is not None:
+            fields["expires_at"] = bucket + timedelta(seconds=seconds, days=retention_days)
+        ops.append(UpdateOne(
+            {"_id": f"{resolution}:{bucket.isoformat()}"},
+            {
+                "$inc": inc,
+                "$set": fields,
+                "$setOnInsert": {"resolution": resolution, "bucket": bucket, "timestamp": bucket.isoformat()},
+            },
+            upsert=True,
+        ))
+    return ops
+
+
+async def record_rollups(db, snapshot: dict, now: datetime):
+    await db.economic_snapshot_rollups.bulk_write(rollup_updates(snapshot, now), ordered=False)
+
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    # Raw snapshots are compared as UTC isoformat strings
+    return moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+async def query_snapshots(db, resolution: str = "raw", start: str = None, end: str = None,
+                          limit: int = 24) -> list:
+    """
+    Snapshots newest first. `start`/`end` are ISO timestamps (inclusive).
+    Raises ValueError for an unknown resolution or a malformed timestamp.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {', '.join(RESOLUTIONS)}")
+    start_dt, end_dt = _parse(start), _parse(end)
+    limit = max(1, min(limit, MAX_SNAPSHOTS))
+
+    if resolution == "raw":
+        query = {"type": "tick_snapshot"}
+        if start_dt or end_dt:
+            query["timestamp"] = {}
+            if start_dt:
+                query["timestamp"]["$gte"] = start_dt.isoformat()
+            if end_dt:
+                query["timestamp"]["$lte"] = end_dt.isoformat()
+        return await db.economic_snapshots.find(
+            query, {"_id": 0, "expires_at": 0}
+        ).sort("timestamp", -1).limit(limit).to_list(limit)
+
+    query = {"resolution": resolution}
+    if start_dt or end_dt:
+        query["bucket"] = {}
+        if start_dt:
+            query["bucket"]["$gte"] = bucket_start(start_dt, ROLLUP_RESOLUTIONS[resolution][0])
+        if end_dt:
+            query["bucket"]["$lte"] = end_dt
+    rollups = await db.economic_snapshot_rollups.find(
+        query, {"_id": 0, "bucket": 0, "expires_at": 0}
+    ).sort("bucket", -1).limit(limit).to_list(limit)
+
+    for rollup in rollups:
+        ticks = rollup.get("ticks") or 1
+        rollup["inflation_factor"] = round(rollup.pop("inflation_sum", ticks) / ticks, 6)
+        for field in ("total_tax_collected", "total_maintenance_collected"):
+            rollup[field] = round(rollup.get(field, 0), 4)
+    return rollups
+
+
+async def backfill_rollups(db, batch_size: int = 1000) -> int:
+    """Fold raw snapshots without expires_at into the rollups, then let them expire"""
+    await ensure_snapshot_indexes(db)
+    done = 0
+    cursor = db.economic_snapshots.find(
+        {"type": "tick_snapshot", "expires_at": {"$exists": False}},
+        {"timestamp": 1, "market_prices": 1, "total_production": 1, "total_consumption": 1,
+         "inflation_factor": 1, **{f: 1 for f in SUMMED_FIELDS}},
+    ).sort("timestamp", 1).batch_size(batch_size)
+
+    rollup_ops, raw_ops = [], []
+    async for snapshot in cursor:
+        moment = _parse(snapshot.get("timestamp"))
+        if moment is None:
+            continue
+        rollup_ops.extend(rollup_updates(snapshot, moment))
+        raw_ops.append(UpdateOne({"_id": snapshot["_id"]}, {"$set": {"expires_at": raw_expiry(moment)}}))
+        if len(raw_ops) >= batch_size:
+            await db.economic_snapshot_rollups.bulk_write(rollup_ops, ordered=True)
+            await db.economic_snapshots.bulk_write(raw_ops, ordered=False)
+            done += len(raw_ops)
+            rollup_ops, raw_ops = [], []
+    if raw_ops:
+        await db.economic_snapshot_rollups.bulk_write(rollup_ops, ordered=True)
+        await db.economic_snapshots.bulk_write(raw_ops, ordered=False)
+        done += len(raw_ops)
+
+    logger.info(f"📈 Snapshot rollups backfilled from {done} raw snapshots")
+    return done
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from job_context import get_job_db, close_job_db
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["backfill"]:
+        sys.exit("usage: python economy_snapshots.py backfill")
+    asyncio.run(backfill_rollups(get_job_db()))
+    close_job_db()
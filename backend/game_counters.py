@@ -0,0 +1,129 @@
+"""
+TON-City Game Counters
+Global totals for GET /stats, kept in one `game_counters` document.
+
+- Buy/build/demolish/register/deposit paths $inc the counters as they write
+- A scheduled reconciliation recounts from the real collections and
+  overwrites the document, correcting drift from paths that don't bump
+  (resales, seizures, admin edits) and folding in balance changes from the
+  tick, which moves balances far too often to track per write
+- /stats reads the counters and the treasury once per STATS_CACHE_SECONDS
+  per process
+
+Usage (one-off recount, e.g. right after deploying):
+    python game_counters.py reconcile
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+COUNTERS_ID = "global"
+STATS_CACHE_SECONDS = int(os.environ.get('STATS_CACHE_SECONDS', '10'))
+
+# Plot counts shown on the landing page never drop below this
+MIN_TOTAL_PLOTS = 10000
+
+OWNED_PLOT = {"owner": {"$nin": [None, ""]}}
+
+
+async def bump_counters(db, **deltas):
+    """$inc counters; a failure only costs accuracy until the next reconciliation"""
+    try:
+        await db.game_counters.update_one(
+            {"_id": COUNTERS_ID},
+            {"$inc": deltas, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}},
+            upsert=True,
+        )
+    except Exception as e:
+        logger.warning(f"Game counters $inc {deltas} failed: {e}")
+    invalidate_stats()
+
+
+async def count_game_totals(db) -> dict:
+    """Counters recomputed from plots, businesses, users and the island"""
+    balance = await db.users.aggregate([
+        {"$match": {"balance_ton": {"$gt": 0}}},
+        {"$group": {"_id": None, "total": {"$sum": "$balance_ton"}}},
+    ]).to_list(1)
+    island = await db.islands.aggregate([
+        {"$match": {"id": "ton_island"}},
+        {"$project": {"_id": 0, "cells": {"$size": {"$ifNull": ["$cells", []]}}}},
+    ]).to_list(1)
+    return {
+        "owned_plots": await db.plots.count_documents(OWNED_PLOT),
+        "total_businesses": await db.businesses.count_documents({}),
+        "total_players": await db.users.count_documents({}),
+        "total_volume_ton": balance[0]["total"] if balance else 0,
+        "island_cells": island[0]["cells"] if island else 0,
+    }
+
+
+async def reconcile_counters(db) -> dict:
+    """Overwrite the counters with real totals; logs how far they had drifted"""
+    totals = await count_game_totals(db)
+    previous = await db.game_counters.find_one({"_id": COUNTERS_ID}) or {}
+    drift = {
+        k: round(v - previous.get(k, 0), 4)
+        for k, v in totals.items()
+        if k != "total_volume_ton" and previous and v != previous.get(k, 0)
+    }
+    now = datetime.now(timezone.utc).isoformat()
+    await db.game_counters.update_one(
+        {"_id": COUNTERS_ID},
+        {"$set": {**totals, "reconciled_at": now, "updated_at": now}},
+        upsert=True,
+    )
+    invalidate_stats()
+    if drift:
+        logger.info(f"🔢 Game counters reconciled, drift: {drift}")
+    return totals
+
+
+_stats_cache = {"value": None, "expires_at": 0.0}
+
+
+def invalidate_stats():
+    _stats_cache["expires_at"] = 0.0
+
+
+async def read_game_stats(db) -> dict:
+    """GET /stats payload from the counters document, cached briefly in memory"""
+    if _stats_cache["value"] is not None and time.monotonic() < _stats_cache["expires_at"]:
+        return _stats_cache["value"]
+
+    counters = await db.game_counters.find_one({"_id": COUNTERS_ID})
+    if counters is None or "reconciled_at" not in counters:
+        await reconcile_counters(db)
+        counters = await db.game_counters.find_one({"_id": COUNTERS_ID})
+    admin_stats = await db.admin_stats.find_one({"type": "treasury"}, {"_id": 0})
+
+    total_plots = max(MIN_TOTAL_PLOTS, counters.get("island_cells", 0))
+    owned_plots = counters.get("owned_plots", 0)
+    stats = {
+        "total_plots": total_plots,
+        "owned_plots": owned_plots,
+        "available_plots": total_plots - owned_plots,
+        "total_businesses": counters.get("total_businesses", 0),
+        "total_players": counters.get("total_players", 0),
+        "total_volume_ton": max(0, round(counters.get("total_volume_ton", 0), 2)),  # TON in circulation - only positive
+        "treasury": admin_stats or {},
+    }
+    _stats_cache["value"] = stats
+    _stats_cache["expires_at"] = time.monotonic() + STATS_CACHE_SECONDS
+    return stats
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from job_context import get_job_db, close_job_db
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["reconcile"]:
+        sys.exit("usage: python game_counters.py reconcile")
+    print(asyncio.run(reconcile_counters(get_job_db())))
+    close_job_db()
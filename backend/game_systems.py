@@ -93,7 +93,7 @@ class BusinessEconomics:
         }
     
     @staticmethod
-    def apply_wear(business: dict, hours_passed: float) -> dict:
+    def apply_wear(business: dict, hours_passed: float, decimals: int = 2) -> dict:
         """Apply durability wear based on time passed"""
         business_type = business.get("business_type")
         level = business.get("level", 1)
@@ -106,7 +106,7 @@ class BusinessEconomics:
         new_durability = max(0, current_durability - wear)
         
         return {
-            "durability": round(new_durability, 2),
+            "durability": round(new_durability, decimals),
             "last_wear_update": datetime.now(timezone.utc).isoformat(),
             "wear_applied": round(wear, 2),
         }
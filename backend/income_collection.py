@@ -0,0 +1,102 @@
+"""
+TON-City Income Collection
+Batched writes for the collect-all endpoints (/my/collect-all and
+/income/collect-all).
+
+- Patron businesses and plot zones of the collected businesses are loaded
+  with one $in query each
+- CollectionPlan queues a $set per collected business and merges balance
+  increments per user, then commits them as one businesses bulk_write and
+  one users bulk_write
+- Patron owners may be stored as a user id or a wallet; each is paid once
+  per request, whatever the number of businesses it is patron of
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo import UpdateOne
+
+from game_systems import IncomeCollector
+
+
+async def load_patrons(db, businesses: list) -> dict:
+    """Patron businesses of `businesses` by id, in one query"""
+    patron_ids = sorted({b["patron_id"] for b in businesses if b.get("patron_id")})
+    if not patron_ids:
+        return {}
+    patrons = await db.businesses.find(
+        {"id": {"$in": patron_ids}}, {"_id": 0, "id": 1, "owner": 1, "business_type": 1, "level": 1}
+    ).to_list(None)
+    return {p["id"]: p for p in patrons}
+
+
+async def load_plot_zones(db, businesses: list) -> dict:
+    """Zone of each business's plot by plot id, in one query"""
+    plot_ids = sorted({b["plot_id"] for b in businesses if b.get("plot_id")})
+    if not plot_ids:
+        return {}
+    plots = await db.plots.find({"id": {"$in": plot_ids}}, {"_id": 0, "id": 1, "zone": 1}).to_list(None)
+    return {p["id"]: p.get("zone", "outskirts") for p in plots}
+
+
+class CollectionPlan:
+    """Writes of one collect-all request"""
+
+    def __init__(self, now: Optional[datetime] = None):
+        self.now = now or datetime.now(timezone.utc)
+        self.business_ops = []
+        self.user_incs = {}  # identifiers of one user -> $inc
+
+    def collect(self, business_id: str, inc: dict = None):
+        """Restart accrual of one business, optionally with an $inc (e.g. xp)"""
+        update = {"$set": {"last_collection": self.now.isoformat()}}
+        if inc:
+            update["$inc"] = inc
+        self.business_ops.append(UpdateOne({"id": business_id}, update))
+
+    def pay(self, amount: float, *identifiers, income: bool = False):
+        """Credit a user found by any of its identifiers (user id or wallet)"""
+        key = tuple(i for i in identifiers if i)
+        if not key or amount <= 0:
+            return
+        inc = self.user_incs.setdefault(key, {})
+        inc["balance_ton"] = inc.get("balance_ton", 0) + amount
+        if income:
+            inc["total_income"] = inc.get("total_income", 0) + amount
+
+    def paid(self) -> list:
+        return [identifier for key in self.user_incs for identifier in key]
+
+    async def commit(self, db):
+        if self.business_ops:
+            await db.businesses.bulk_write(self.business_ops, ordered=False)
+        if self.user_incs:
+            await db.users.bulk_write([
+                UpdateOne(
+                    {"$or": [{"id": {"$in": list(key)}}, {"wallet_address": {"$in": list(key)}}]},
+                    {"$inc": inc},
+                )
+                for key, inc in self.user_incs.items()
+            ], ordered=False)
+
+
+def plan_business_collection(plan: CollectionPlan, businesses: list, patrons: dict) -> dict:
+    """IncomeCollector over `businesses`: collector totals, patron fees queued per patron owner"""
+    totals = {"collected": 0, "tax": 0, "patron": 0, "count": 0}
+    for biz in businesses:
+        patron = patrons.get(biz.get("patron_id")) if biz.get("patron_id") else None
+        patron_owner = patron.get("owner") if patron else None
+
+        collection = IncomeCollector.collect_income(biz, patron_owner)
+        if collection.get("halted") or collection["collected"] <= 0:
+            continue
+
+        totals["collected"] += collection["player_receives"]
+        totals["tax"] += collection["treasury_receives"]
+        totals["patron"] += collection["patron_receives"]
+        totals["count"] += 1
+
+        plan.collect(biz["id"])
+        if patron_owner:
+            plan.pay(collection["patron_receives"], patron_owner)
+    return totals
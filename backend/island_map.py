@@ -0,0 +1,248 @@
+"""
+TON-City Island Map Cache
+GET /island is served from a per-process copy of the merged island view
+(base cells + plot owners + businesses), keyed by a map version kept in Mongo.
+
+- Every handler that changes what a cell shows (owner, business, level)
+  calls touch_island_cells(): one $inc on `map_versions` plus one
+  `map_changes` entry listing the touched coordinates (TTL on expires_at)
+- A request compares the stored version with its cached one; when behind,
+  only the changed cells are re-read, and the whole view is rebuilt only
+  when the change log has a gap (expired or not written yet)
+- The serialized body is cached per version and sent with a weak ETag, so
+  clients polling with If-None-Match get a 304
+- GET /island/changes?since=<version> returns just the changed cells
+- Purchase handlers read one cell with a positional projection instead of
+  loading the whole island document
+"""
+import asyncio
+import copy
+import json
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+
+from pymongo import ReturnDocument
+
+from business_config import BUSINESSES
+from db_indexes import ensure_indexes
+from ton_island import INDEX_FIELDS, generate_ton_island_map, get_cell_at
+
+logger = logging.getLogger(__name__)
+
+ISLAND_ID = "ton_island"
+
+MAP_CHANGES_RETENTION_HOURS = int(os.environ.get('MAP_CHANGES_RETENTION_HOURS', '24'))
+# Past this many changed cells a full rebuild is cheaper than per-cell queries
+MAX_INCREMENTAL_CELLS = int(os.environ.get('MAX_INCREMENTAL_CELLS', '200'))
+
+async def ensure_map_indexes(db):
+    await ensure_indexes(db, "map_changes", "businesses")
+
+
+async def ensure_island(db) -> dict:
+    """Stored island document, generated and inserted on first use"""
+    island = await db.islands.find_one({"id": ISLAND_ID}, {"_id": 0})
+    if not island:
+        island = generate_ton_island_map()
+        await db.islands.insert_one(island.copy())
+        island.pop("_id", None)
+    return island
+
+
+async def fetch_island_cell(db, x: int, y: int):
+    """One island cell by coordinates, or None when (x, y) is not land"""
+    doc = await db.islands.find_one(
+        {"id": ISLAND_ID, "cells": {"$elemMatch": {"x": x, "y": y}}},
+        {"_id": 0, "cells.$": 1},
+    )
+    if doc:
+        return doc["cells"][0]
+    if await db.islands.count_documents({"id": ISLAND_ID}, limit=1):
+        return None
+    return get_cell_at(await ensure_island(db), x, y)
+
+
+def island_cells(*docs) -> list:
+    """(x, y) of the given plots/businesses that lie on TON Island"""
+    cells = []
+    for doc in docs:
+        if doc and doc.get("island_id") == ISLAND_ID and doc.get("x") is not None and doc.get("y") is not None:
+            cells.append((doc["x"], doc["y"]))
+    return cells
+
+
+async def touch_island_cells(db, cells, island_id: str = ISLAND_ID):
+    """Bump the map version and record which cells changed; returns the new version"""
+    coords = sorted({(int(x), int(y)) for x, y in cells})
+    if not coords:
+        return None
+    await ensure_map_indexes(db)
+    doc = await db.map_versions.find_one_and_update(
+        {"_id": island_id},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    now = datetime.now(timezone.utc)
+    await db.map_changes.insert_one({
+        "island_id": island_id,
+        "version": doc["version"],
+        "cells": [[x, y] for x, y in coords],
+        "created_at": now.isoformat(),
+        "expires_at": now + timedelta(hours=MAP_CHANGES_RETENTION_HOURS),
+    })
+    return doc["version"]
+
+
+async def current_map_version(db, island_id: str = ISLAND_ID) -> int:
+    doc = await db.map_versions.find_one({"_id": island_id})
+    return doc["version"] if doc else 0
+
+
+async def changed_cells_since(db, since: int, until: int, island_id: str = ISLAND_ID):
+    """Coordinates changed in (since, until], or None when the log has a gap"""
+    if until <= since:
+        return set()
+    changes = await db.map_changes.find(
+        {"island_id": island_id, "version": {"$gt": since, "$lte": until}},
+        {"_id": 0, "version": 1, "cells": 1},
+    ).to_list(None)
+    if len({c["version"] for c in changes}) < until - since:
+        return None
+    return {(x, y) for c in changes for x, y in c["cells"]}
+
+
+def business_view(business: dict) -> dict:
+    config = BUSINESSES.get(business.get("business_type"), {})
+    return {
+        "id": business.get("id"),
+        "type": business.get("business_type"),
+        "level": business.get("level", 1),
+        "tier": config.get("tier", 1),
+        "icon": config.get("icon", "🏢"),
+    }
+
+
+async def load_cell_state(db, coords=None) -> tuple:
+    """Plots and businesses by (x, y), plus owner avatars; all cells when coords is None"""
+    query = {"island_id": ISLAND_ID}
+    if coords is not None:
+        query["$or"] = [{"x": x, "y": y} for x, y in coords]
+    plots = await db.plots.find(
+        query, {"_id": 0, "x": 1, "y": 1, "owner": 1, "owner_username": 1, "owner_avatar": 1}
+    ).to_list(None)
+    businesses = await db.businesses.find(
+        query, {"_id": 0, "x": 1, "y": 1, "id": 1, "business_type": 1, "level": 1}
+    ).to_list(None)
+
+    owner_ids = list({p["owner"] for p in plots if p.get("owner") and not p.get("owner_avatar")})
+    avatars = {}
+    if owner_ids:
+        users = await db.users.find(
+            {"$or": [{"id": {"$in": owner_ids}}, {"wallet_address": {"$in": owner_ids}}]},
+            {"_id": 0, "id": 1, "wallet_address": 1, "avatar": 1}
+        ).to_list(None)
+        for u in users:
+            for key in (u.get("id"), u.get("wallet_address")):
+                if key:
+                    avatars[key] = u.get("avatar")
+
+    return (
+        {(p["x"], p["y"]): p for p in plots},
+        {(b["x"], b["y"]): b for b in businesses},
+        avatars,
+    )
+
+
+class IslandMapCache:
+    """Merged island view of one process, brought up to the stored map version on read"""
+
+    def __init__(self):
+        self.version = None
+        self.island = None
+        self.base_cells = {}
+        self.positions = {}
+        self.payload = b""
+        self._lock = asyncio.Lock()
+
+    @property
+    def etag(self) -> str:
+        return f'W/"island-{self.version}"'
+
+    def _apply(self, coords, plots: dict, businesses: dict, avatars: dict):
+        cells = self.island["cells"]
+        for coord in coords:
+            pos = self.positions.get(coord)
+            if pos is None:
+                continue
+            cell = dict(self.base_cells[coord])
+            plot = plots.get(coord)
+            if plot:
+                cell["owner"] = plot.get("owner")
+                cell["owner_username"] = plot.get("owner_username")
+                cell["owner_avatar"] = plot.get("owner_avatar") or avatars.get(plot.get("owner"))
+            business = businesses.get(coord)
+            if business:
+                cell["business"] = business_view(business)
+            cells[pos] = cell
+
+    def _finish(self, version: int):
+        cells = self.island["cells"]
+        owned = sum(1 for c in cells if c.get("owner"))
+        self.island["stats"] = {
+            "total_cells": len(cells),
+            "owned_cells": owned,
+            "available_cells": len(cells) - owned,
+            "businesses": sum(1 for c in cells if c.get("business")),
+        }
+        self.island["version"] = version
+        self.version = version
+        self.payload = json.dumps(self.island, ensure_ascii=False, default=str).encode("utf-8")
+
+    async def _rebuild(self, db, version: int):
+        island = await ensure_island(db)
+        for field in INDEX_FIELDS:
+            island.pop(field, None)
+        self.island = island
+        self.base_cells = {(c["x"], c["y"]): copy.deepcopy(c) for c in island.get("cells", [])}
+        self.positions = {(c["x"], c["y"]): i for i, c in enumerate(island.get("cells", []))}
+        self._apply(self.positions.keys(), *await load_cell_state(db))
+        self._finish(version)
+        logger.info(f"🗺️ Island map cache rebuilt at version {version}")
+
+    async def refresh(self, db) -> "IslandMapCache":
+        version = await current_map_version(db)
+        if self.version == version:
+            return self
+        async with self._lock:
+            if self.version == version:
+                return self
+            if self.island is not None and self.version is not None and version > self.version:
+                coords = await changed_cells_since(db, self.version, version)
+                if coords is not None and len(coords) <= MAX_INCREMENTAL_CELLS:
+                    self._apply(coords, *await load_cell_state(db, coords))
+                    self._finish(version)
+                    return self
+            await self._rebuild(db, version)
+        return self
+
+    async def changes_since(self, db, since: int) -> dict:
+        """Cells changed after `since`; `full` tells the client to reload GET /island"""
+        await self.refresh(db)
+        version = self.version
+        if since == version:
+            return {"version": version, "full": False, "cells": [], "stats": self.island["stats"]}
+        coords = await changed_cells_since(db, since, version) if since < version else None
+        if coords is None:
+            return {"version": version, "full": True, "cells": [], "stats": self.island["stats"]}
+        cells = self.island["cells"]
+        return {
+            "version": version,
+            "full": False,
+            "cells": [cells[self.positions[c]] for c in sorted(coords) if c in self.positions],
+            "stats": self.island["stats"],
+        }
+
+
+island_map_cache = IslandMapCache()
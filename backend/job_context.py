@@ -0,0 +1,296 @@
+"""
+TON-City Job Context
+Long-lived MongoDB pool shared by all scheduled jobs, with per-job
+connection metrics (commands, pool checkouts, checkout wait, saturation).
+
+Jobs are wrapped with @scheduled_job("name") and take their handle from
+get_job_db() instead of creating an AsyncIOMotorClient per run.
+StepTimer splits one run into named spans with wall time and DB round trips.
+"""
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import resource
+import threading
+import time
+from datetime import datetime, timezone
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+# MongoDB connection
+mongo_url = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+db_name = os.environ.get('DB_NAME', 'ton_city')
+
+# Pool limits for the scheduled jobs (separate from the API pool)
+JOB_POOL_MAX_SIZE = int(os.environ.get('JOB_MONGO_MAX_POOL_SIZE', '20'))
+JOB_POOL_MIN_SIZE = int(os.environ.get('JOB_MONGO_MIN_POOL_SIZE', '2'))
+JOB_POOL_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('JOB_MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000'))
+
+# Name of the job running in the current task (propagated into Motor's executor threads)
+current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+# Round-trip counter of the StepTimer span open in the current task
+current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+_client = None
+_db = None
+_lock = threading.Lock()
+
+# Per-job metrics, keyed by job name
+job_metrics = {}
+# Pool-wide connection state
+pool_state = {"checked_out": 0, "peak_checked_out": 0, "checkout_timeouts": 0}
+
+
+def _new_job_metrics() -> dict:
+    return {
+        "runs": 0,
+        "running": 0,
+        "failures": 0,
+        "last_started": None,
+        "last_duration_s": None,
+        "max_duration_s": 0.0,
+        "last_error": None,
+        "commands": 0,
+        "last_run_commands": 0,
+        "checkouts": 0,
+        "checkout_wait_ms_total": 0.0,
+        "checkout_wait_ms_max": 0.0,
+        "checkout_failures": 0,
+        "peak_checked_out": 0,
+        # Scheduler-side events (see record_scheduler_event)
+        "missed": 0,
+        "coalesced": 0,
+        "skipped_overlap": 0,
+        "last_lag_s": None,
+        "max_lag_s": 0.0,
+    }
+
+
+def _metrics_for(job: str) -> dict:
+    metrics = job_metrics.get(job)
+    if metrics is None:
+        metrics = job_metrics.setdefault(job, _new_job_metrics())
+    return metrics
+
+
+class _JobCommandListener(monitoring.CommandListener):
+    """Attributes every command to the job that issued it"""
+
+    def started(self, event):
+        job = current_job.get()
+        span = current_span.get()
+        if job or span is not None:
+            with _lock:
+                if job:
+                    metrics = _metrics_for(job)
+                    metrics["commands"] += 1
+                    metrics["last_run_commands"] += 1
+                if span is not None:
+                    span[0] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class _JobPoolListener(monitoring.ConnectionPoolListener):
+    """Tracks checkout wait and pool saturation per job"""
+
+    _checkout_started = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.at = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._checkout_started, "at", None)
+        wait_ms = (time.perf_counter() - started) * 1000 if started else 0.0
+        job = current_job.get()
+        with _lock:
+            pool_state["checked_out"] += 1
+            pool_state["peak_checked_out"] = max(pool_state["peak_checked_out"], pool_state["checked_out"])
+            if job:
+                metrics = _metrics_for(job)
+                metrics["checkouts"] += 1
+                metrics["checkout_wait_ms_total"] += wait_ms
+                metrics["checkout_wait_ms_max"] = max(metrics["checkout_wait_ms_max"], wait_ms)
+                metrics["peak_checked_out"] = max(metrics["peak_checked_out"], pool_state["checked_out"])
+
+    def connection_check_out_failed(self, event):
+        job = current_job.get()
+        with _lock:
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                pool_state["checkout_timeouts"] += 1
+            if job:
+                _metrics_for(job)["checkout_failures"] += 1
+
+    def connection_checked_in(self, event):
+        with _lock:
+            pool_state["checked_out"] = max(0, pool_state["checked_out"] - 1)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+
+def get_job_db():
+    """Get the shared job database handle, creating the pool on first use"""
+    global _client, _db
+    if _db is None:
+        _client = AsyncIOMotorClient(
+            mongo_url,
+            maxPoolSize=JOB_POOL_MAX_SIZE,
+            minPoolSize=JOB_POOL_MIN_SIZE,
+            waitQueueTimeoutMS=JOB_POOL_WAIT_QUEUE_TIMEOUT_MS,
+            appname="ton-city-jobs",
+            event_listeners=[_JobCommandListener(), _JobPoolListener()],
+        )
+        _db = _client[db_name]
+        logger.info(f"🔌 Job Mongo pool created (max {JOB_POOL_MAX_SIZE}, min {JOB_POOL_MIN_SIZE})")
+    return _db
+
+
+def close_job_db():
+    """Close the dedicated job pool"""
+    global _client, _db
+    if _client is not None:
+        _client.close()
+        logger.info("🔌 Job Mongo pool closed")
+    _client = None
+    _db = None
+
+
+def scheduled_job(name: str):
+    """Decorator: run a job coroutine under its name and record run metrics"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            token = current_job.set(name)
+            with _lock:
+                metrics = _metrics_for(name)
+                metrics["runs"] += 1
+                metrics["running"] += 1
+                metrics["last_run_commands"] = 0
+                metrics["last_started"] = datetime.now(timezone.utc).isoformat()
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception as e:
+                with _lock:
+                    metrics["failures"] += 1
+                    metrics["last_error"] = str(e)
+                raise
+            finally:
+                duration = time.perf_counter() - started
+                with _lock:
+                    metrics["running"] -= 1
+                    metrics["last_duration_s"] = round(duration, 4)
+                    metrics["max_duration_s"] = round(max(metrics["max_duration_s"], duration), 4)
+                current_job.reset(token)
+        return wrapper
+    return decorator
+
+
+class StepTimer:
+    """Wall time and DB round trips per named phase of one job run"""
+
+    def __init__(self):
+        self.spans = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str):
+        """Time a phase; re-entering the same name accumulates"""
+        stats = self.spans.setdefault(name, {"duration_ms": 0.0, "db_round_trips": 0, "calls": 0})
+        counter = [0]
+        token = current_span.set(counter)
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            current_span.reset(token)
+            with _lock:
+                stats["duration_ms"] = round(stats["duration_ms"] + (time.perf_counter() - started) * 1000, 3)
+                stats["db_round_trips"] += counter[0]
+                stats["calls"] += 1
+
+    @property
+    def total_ms(self) -> float:
+        return round(sum(s["duration_ms"] for s in self.spans.values()), 3)
+
+
+def record_scheduler_event(job: str, missed: int = 0, coalesced: int = 0,
+                           skipped_overlap: int = 0, lag_s: float = None):
+    """Record missed/coalesced/overlapping runs and start lag reported by the scheduler"""
+    with _lock:
+        metrics = _metrics_for(job)
+        metrics["missed"] += missed
+        metrics["coalesced"] += coalesced
+        metrics["skipped_overlap"] += skipped_overlap
+        if lag_s is not None:
+            metrics["last_lag_s"] = round(lag_s, 3)
+            metrics["max_lag_s"] = round(max(metrics["max_lag_s"], lag_s), 3)
+
+
+def get_job_metric(job: str, key: str, default=None):
+    """Single metric value of one job"""
+    with _lock:
+        return job_metrics.get(job, {}).get(key, default)
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB (lifetime peak where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return round(resident_pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024, 2)
+    except (OSError, ValueError, IndexError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+def get_job_metrics() -> dict:
+    """Snapshot of per-job metrics and pool saturation"""
+    with _lock:
+        jobs = {}
+        for name, metrics in job_metrics.items():
+            checkouts = metrics["checkouts"]
+            jobs[name] = {
+                **metrics,
+                "checkout_wait_ms_avg": round(metrics["checkout_wait_ms_total"] / checkouts, 3) if checkouts else 0.0,
+                "checkout_wait_ms_total": round(metrics["checkout_wait_ms_total"], 3),
+                "checkout_wait_ms_max": round(metrics["checkout_wait_ms_max"], 3),
+            }
+        return {
+            "pool": {
+                "dedicated": _client is not None,
+                "max_pool_size": JOB_POOL_MAX_SIZE,
+                "min_pool_size": JOB_POOL_MIN_SIZE,
+                "checked_out": pool_state["checked_out"],
+                "peak_checked_out": pool_state["peak_checked_out"],
+                "saturation": round(pool_state["peak_checked_out"] / JOB_POOL_MAX_SIZE, 4) if JOB_POOL_MAX_SIZE else 0,
+                "checkout_timeouts": pool_state["checkout_timeouts"],
+            },
+            "jobs": jobs,
+        }
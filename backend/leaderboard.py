@@ -0,0 +1,122 @@
+"""
+TON-City Leaderboard
+Materialized `leaderboard` collection, rebuilt by a background job with one
+users pipeline: business and plot counts come from indexed $lookups, ranks
+for every sort key from $setWindowFields, and the result is $merge'd in place.
+
+- Rows carry the user fields LeaderboardPage reads (id, username, the sort
+  values) next to the counts and ranks
+- Top-N reads walk the (sort key, _id) index
+- "My rank" is a single _id lookup of the precomputed rank fields
+"""
+import logging
+from datetime import datetime, timezone
+
+from db_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+# sort_by -> (leaderboard field, rank field)
+SORT_KEYS = {
+    "balance": ("balance_ton", "rank_balance"),
+    "income": ("total_income", "rank_income"),
+    "businesses": ("businesses_count", "rank_businesses"),
+    "plots": ("plots_count", "rank_plots"),
+}
+
+MAX_LEADERBOARD_LIMIT = 500
+
+# Stand-in join key for users without an id or wallet, so $lookup never matches missing owners
+_NO_KEY = "__none__"
+
+async def ensure_leaderboard_indexes(db):
+    await ensure_indexes(db, "leaderboard", "businesses", "plots")
+
+
+def _count_lookup(collection: str, key: str, name: str) -> dict:
+    return {"$lookup": {
+        "from": collection, "localField": key, "foreignField": "owner", "as": name,
+        "pipeline": [{"$count": "n"}],
+    }}
+
+
+def _owned_count(by_id: str, by_wallet: str) -> dict:
+    """Matches on id plus matches on wallet, unless both keys are the same"""
+    return {"$add": [
+        {"$ifNull": [{"$first": f"${by_id}.n"}, 0]},
+        {"$cond": [
+            {"$eq": ["$id_key", "$wallet_key"]},
+            0,
+            {"$ifNull": [{"$first": f"${by_wallet}.n"}, 0]},
+        ]},
+    ]}
+
+
+def leaderboard_pipeline(stamp: str) -> list:
+    pipeline = [
+        {"$project": {
+            "_id": 0,
+            "id": 1,
+            "user_id": "$id",
+            "wallet_address": 1,
+            "username": 1,
+            "display_name": 1,
+            "level": 1,
+            "balance_ton": {"$ifNull": ["$balance_ton", 0]},
+            "total_income": {"$ifNull": ["$total_income", 0]},
+            "id_key": {"$ifNull": ["$id", _NO_KEY]},
+            "wallet_key": {"$ifNull": ["$wallet_address", _NO_KEY]},
+        }},
+        _count_lookup("businesses", "id_key", "biz_by_id"),
+        _count_lookup("businesses", "wallet_key", "biz_by_wallet"),
+        _count_lookup("plots", "id_key", "plots_by_id"),
+        _count_lookup("plots", "wallet_key", "plots_by_wallet"),
+        {"$set": {
+            "_id": {"$cond": [{"$ne": ["$id_key", _NO_KEY]}, "$id_key", "$wallet_key"]},
+            "businesses_count": _owned_count("biz_by_id", "biz_by_wallet"),
+            "plots_count": _owned_count("plots_by_id", "plots_by_wallet"),
+            "rebuilt_at": stamp,
+        }},
+        {"$unset": ["id_key", "wallet_key", "biz_by_id", "biz_by_wallet", "plots_by_id", "plots_by_wallet"]},
+    ]
+    for field, rank_field in SORT_KEYS.values():
+        pipeline.append({"$setWindowFields": {
+            "sortBy": {field: -1},
+            "output": {rank_field: {"$rank": {}}},
+        }})
+    pipeline.append({"$merge": {"into": "leaderboard", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}})
+    return pipeline
+
+
+async def rebuild_leaderboard(db) -> int:
+    """Recompute every row, then drop rows of users that no longer exist"""
+    await ensure_leaderboard_indexes(db)
+    stamp = datetime.now(timezone.utc).isoformat()
+    await db.users.aggregate(leaderboard_pipeline(stamp), allowDiskUse=True).to_list(None)
+    await db.leaderboard.delete_many({"rebuilt_at": {"$ne": stamp}})
+    total = await db.leaderboard.count_documents({})
+    logger.info(f"🏆 Leaderboard rebuilt: {total} players")
+    return total
+
+
+async def top_players(db, sort_by: str = "balance", limit: int = 50) -> list:
+    field, rank_field = SORT_KEYS.get(sort_by, SORT_KEYS["balance"])
+    limit = max(1, min(limit, MAX_LEADERBOARD_LIMIT))
+    players = await db.leaderboard.find({}, {"rebuilt_at": 0}).sort(
+        [(field, -1), ("_id", 1)]
+    ).limit(limit).to_list(limit)
+    for player in players:
+        player["rank"] = player.get(rank_field)
+    return players
+
+
+async def player_rank(db, user_id: str, wallet_address: str = None) -> dict:
+    """Precomputed ranks of one player, or None before the next rebuild picks them up"""
+    keys = [k for k in (user_id, wallet_address) if k]
+    if not keys:
+        return None
+    row = await db.leaderboard.find_one({"_id": {"$in": keys}}, {"rebuilt_at": 0})
+    if row is None:
+        return None
+    row["ranks"] = {sort_by: row.pop(rank_field, None) for sort_by, (_, rank_field) in SORT_KEYS.items()}
+    return row
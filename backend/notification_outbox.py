@@ -0,0 +1,212 @@
+"""
+TON-City Notification Outbox
+Durability alerts raised inside the economic tick are appended to
+`notification_outbox` with the tick's other writes; the tick itself never
+calls Telegram. A separate scheduled consumer delivers them through the
+Telegram dispatcher.
+
+- Dedupe keys (owner:level:business_id) live in `notification_dedupe` with a
+  TTL, so all workers share them and stale ones expire on their own
+- A repair (durability back over a threshold) emits a clear event that drops
+  the keys and re-arms the alerts; events apply in _id order, so an alert
+  followed by a clear in the same batch ends up re-armed
+- A failed send stays pending with an attempts counter and is retried by
+  later runs; it is marked failed after OUTBOX_MAX_ATTEMPTS
+- When a batch fails before its statuses are written, the dedupe keys it
+  claimed are released, so its events are retried rather than skipped as
+  duplicates
+- Processed events are kept for OUTBOX_RETENTION_HOURS (TTL on expires_at)
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone, timedelta
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from business_config import BUSINESSES
+from db_indexes import ensure_indexes
+from telegram_dispatcher import resolve_chat_ids
+from telegram_notifications import notify_low_durability, notify_critical_durability, notify_business_stopped
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', '500'))
+OUTBOX_RETENTION_HOURS = int(os.environ.get('OUTBOX_RETENTION_HOURS', '24'))
+NOTIFICATION_DEDUPE_TTL_HOURS = int(os.environ.get('NOTIFICATION_DEDUPE_TTL_HOURS', '168'))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', '5'))
+
+ALERT_SENDERS = {
+    "stopped": lambda chat_id, name, durability: notify_business_stopped(chat_id, name),
+    "critical": notify_critical_durability,
+    "low": notify_low_durability,
+}
+
+
+def dedupe_key(owner: str, level: str, business_id: str) -> str:
+    return f"{owner}:{level}:{business_id}"
+
+
+def durability_alerts(owner: str, business_id: str, business_type: str,
+                      old_durability: float, new_durability: float, now: datetime) -> list:
+    """Outbox events for a business crossing 50/10/0% durability, or recovering from it"""
+    events = []
+    level = None
+    if new_durability <= 0 < old_durability:
+        level = "stopped"
+    elif new_durability < 10 <= old_durability:
+        level = "critical"
+    elif new_durability < 50 <= old_durability:
+        level = "low"
+    if level:
+        events.append({
+            "kind": "durability_alert",
+            "level": level,
+            "owner": owner,
+            "business_id": business_id,
+            "business_type": business_type,
+            "durability": round(new_durability, 2),
+            "status": "pending",
+            "created_at": now.isoformat(),
+        })
+
+    # Clear dedupe state when repaired
+    cleared = []
+    if new_durability >= 50 > old_durability:
+        cleared += ["low", "critical"]
+    if new_durability > 0 >= old_durability:
+        cleared.append("stopped")
+    if cleared:
+        events.append({
+            "kind": "durability_clear",
+            "levels": cleared,
+            "owner": owner,
+            "business_id": business_id,
+            "status": "pending",
+            "created_at": now.isoformat(),
+        })
+    return events
+
+
+async def ensure_outbox_indexes(db):
+    await ensure_indexes(db, "notification_outbox", "notification_dedupe")
+
+
+async def claim_dedupe_keys(db, keys: list, now: datetime) -> set:
+    """Insert dedupe keys; returns the indexes of keys that already existed"""
+    if not keys:
+        return set()
+    expires_at = now + timedelta(hours=NOTIFICATION_DEDUPE_TTL_HOURS)
+    docs = [{"_id": key, "created_at": now.isoformat(), "expires_at": expires_at} for key in keys]
+    try:
+        await db.notification_dedupe.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        return {err["index"] for err in e.details.get("writeErrors", []) if err.get("code") == 11000}
+    return set()
+
+
+def event_runs(batch: list) -> list:
+    """Consecutive runs of alerts and of clears, in _id order: [(kind, events)]"""
+    runs = []
+    for event in batch:
+        kind = event.get("kind")
+        if kind not in ("durability_alert", "durability_clear"):
+            continue
+        if runs and runs[-1][0] == kind:
+            runs[-1][1].append(event)
+        else:
+            runs.append((kind, [event]))
+    return runs
+
+
+async def process_outbox(db) -> dict:
+    """Deliver pending outbox events in _id order, one batch at a time"""
+    await ensure_outbox_indexes(db)
+    totals = {"sent": 0, "duplicate": 0, "no_chat": 0, "retry": 0, "failed": 0, "cleared": 0}
+    last_id = None
+
+    while True:
+        query = {"status": "pending"}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.notification_outbox.find(query).sort("_id", 1).limit(OUTBOX_BATCH_SIZE).to_list(OUTBOX_BATCH_SIZE)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        now = datetime.now(timezone.utc)
+        statuses = {}
+
+        # Clears only re-arm alerts queued before them: dedupe run by run
+        fresh = []
+        try:
+            for kind, events in event_runs(batch):
+                if kind == "durability_clear":
+                    keys = [dedupe_key(e["owner"], level, e["business_id"]) for e in events for level in e.get("levels", [])]
+                    await db.notification_dedupe.delete_many({"_id": {"$in": keys}})
+                    for event in events:
+                        statuses[event["_id"]] = "cleared"
+                    continue
+
+                keys = [dedupe_key(e["owner"], e["level"], e["business_id"]) for e in events]
+                duplicates = await claim_dedupe_keys(db, keys, now)
+                for i, event in enumerate(events):
+                    if i in duplicates:
+                        statuses[event["_id"]] = "duplicate"
+                    else:
+                        fresh.append(event)
+
+            chat_ids = await resolve_chat_ids(db, [e["owner"] for e in fresh])
+
+            async def deliver(event):
+                chat_id = chat_ids.get(event["owner"])
+                if not chat_id:
+                    return "no_chat"
+                config = BUSINESSES.get(event.get("business_type"), {})
+                name = config.get("name", {}).get("ru", event.get("business_type"))
+                try:
+                    ok = await ALERT_SENDERS[event["level"]](chat_id, name, event.get("durability", 0))
+                except Exception as e:
+                    logger.warning(f"⚠️ Outbox alert {event['_id']} not sent: {e}")
+                    ok = False
+                return "sent" if ok else "failed"
+
+            results = await asyncio.gather(*(deliver(e) for e in fresh))
+            failed_keys = []
+            for event, status in zip(fresh, results):
+                if status == "failed":
+                    # Let the retry (or the next crossing) alert again
+                    failed_keys.append(dedupe_key(event["owner"], event["level"], event["business_id"]))
+                    if event.get("attempts", 0) + 1 < OUTBOX_MAX_ATTEMPTS:
+                        status = "retry"
+                statuses[event["_id"]] = status
+            if failed_keys:
+                await db.notification_dedupe.delete_many({"_id": {"$in": failed_keys}})
+
+            stamp = now.isoformat()
+            expires_at = now + timedelta(hours=OUTBOX_RETENTION_HOURS)
+            ops = []
+            for event in batch:
+                status = statuses.get(event["_id"], "skipped")
+                if status in totals:
+                    totals[status] += 1
+                if status == "retry":
+                    # Stays pending for a later run
+                    update = {"$set": {"last_attempt_at": stamp}, "$inc": {"attempts": 1}}
+                elif status == "failed":
+                    update = {"$set": {"status": status, "processed_at": stamp, "expires_at": expires_at},
+                              "$inc": {"attempts": 1}}
+                else:
+                    update = {"$set": {"status": status, "processed_at": stamp, "expires_at": expires_at}}
+                ops.append(UpdateOne({"_id": event["_id"]}, update))
+            await db.notification_outbox.bulk_write(ops, ordered=False)
+        except Exception:
+            # Statuses not written: release this batch's keys so its events retry instead of turning duplicate
+            claimed = [dedupe_key(e["owner"], e["level"], e["business_id"]) for e in fresh]
+            if claimed:
+                await db.notification_dedupe.delete_many({"_id": {"$in": claimed}})
+            raise
+
+    if any(totals.values()):
+        logger.info(f"📬 Notification outbox: {totals}")
+    return totals
@@ -0,0 +1,172 @@
+"""
+TON-City Owner Keys
+Ownership of businesses, plots, listings and credits through one canonical,
+indexed field: `owner_key`, the owning user's `id`.
+
+- Writes that create or transfer ownership set owner_key next to the legacy
+  identity fields (owner / owner_wallet / seller_id / borrower_*), which may
+  hold a user id, a wallet address or an email
+- backfill_owner_keys() fills owner_key in _id-ordered batches (one users
+  lookup and one bulk_write per batch); it runs at startup and on a schedule,
+  and only catches documents written before the migration or by seed scripts
+  that bypass these writes (e.g. populate_db.py)
+- owner_filter() is a single equality on owner_key; the $or over every
+  identifier of the user remains as a compatibility path
+- OWNER_KEY_QUERIES: "auto" (default) switches to owner_key once a backfill
+  pass has completed, "key" always uses it, "or" never does
+
+Usage:
+    python owner_keys.py backfill
+"""
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+OWNER_KEY_QUERIES = os.environ.get('OWNER_KEY_QUERIES', 'auto').lower()
+OWNER_KEY_BATCH_SIZE = int(os.environ.get('OWNER_KEY_BATCH_SIZE', '500'))
+MIGRATION_ID = "owner_key"
+
+# Legacy identity fields per collection, in order of preference
+OWNER_FIELDS = {
+    "businesses": ("owner", "owner_wallet"),
+    "plots": ("owner", "owner_wallet"),
+    "market_listings": ("seller_id", "seller_email"),
+    "land_listings": ("seller_user_id", "seller_id", "seller_wallet"),
+    "credits": ("borrower_id", "borrower_wallet"),
+}
+
+BUSINESS_OWNER_FIELDS = OWNER_FIELDS["businesses"]
+
+# Owners that are not users; they are their own key
+NON_USER_OWNERS = {"government"}
+
+# How often "auto" mode re-reads the migration state until it completes
+READY_RECHECK_SECONDS = 60
+
+_ready = {"value": False, "checked_at": 0.0}
+
+
+async def owner_keys_ready(db) -> bool:
+    if OWNER_KEY_QUERIES == "key":
+        return True
+    if OWNER_KEY_QUERIES == "or":
+        return False
+    if not _ready["value"] and time.monotonic() - _ready["checked_at"] > READY_RECHECK_SECONDS:
+        state = await db.migrations.find_one({"_id": MIGRATION_ID}, {"completed_at": 1})
+        _ready["value"] = bool(state and state.get("completed_at"))
+        _ready["checked_at"] = time.monotonic()
+    return _ready["value"]
+
+
+async def owner_filter(db, user_key: Optional[str], identifiers: Iterable[str],
+                       fields: tuple = BUSINESS_OWNER_FIELDS) -> dict:
+    """Filter for documents owned by a user: owner_key equality, or the legacy $or"""
+    if user_key and await owner_keys_ready(db):
+        return {"owner_key": user_key}
+    ids = sorted({i for i in identifiers if i} | ({user_key} if user_key else set()))
+    return {"$or": [{field: {"$in": ids}} for field in fields]}
+
+
+async def resolve_user_ids(db, identifiers: Iterable[str]) -> dict:
+    """identifier (user id, wallet, raw address or email) -> user id, one query"""
+    wanted = sorted({i for i in identifiers if i and i not in NON_USER_OWNERS})
+    if not wanted:
+        return {}
+    resolved = {}
+    cursor = db.users.find(
+        {"$or": [{field: {"$in": wanted}} for field in ("id", "wallet_address", "raw_address", "email")]},
+        {"_id": 1, "id": 1, "wallet_address": 1, "raw_address": 1, "email": 1},
+    )
+    async for user in cursor:
+        user_id = user.get("id") or str(user["_id"])
+        # A user's own id wins over another user's wallet or email
+        for field in ("email", "raw_address", "wallet_address", "id"):
+            if user.get(field) in wanted:
+                resolved[user[field]] = user_id
+    return resolved
+
+
+async def resolve_owner_key(db, identifier: Optional[str]) -> Optional[str]:
+    if identifier in NON_USER_OWNERS:
+        return identifier
+    return (await resolve_user_ids(db, [identifier])).get(identifier)
+
+
+def _owner_key_of(doc: dict, fields: tuple, resolved: dict) -> Optional[str]:
+    for field in fields:
+        value = doc.get(field)
+        if value in NON_USER_OWNERS:
+            return value
+        if value in resolved:
+            return resolved[value]
+    return None
+
+
+async def backfill_collection(db, collection: str, batch_size: int = OWNER_KEY_BATCH_SIZE) -> dict:
+    fields = OWNER_FIELDS[collection]
+    missing = {"owner_key": None, "$or": [{field: {"$nin": [None, ""]}} for field in fields]}
+    updated = unresolved = 0
+    last_id = None
+    while True:
+        query = missing if last_id is None else {**missing, "_id": {"$gt": last_id}}
+        docs = await db[collection].find(query, {field: 1 for field in fields}).sort("_id", 1).to_list(batch_size)
+        if not docs:
+            break
+        last_id = docs[-1]["_id"]
+        resolved = await resolve_user_ids(db, [doc.get(field) for doc in docs for field in fields])
+
+        ops = []
+        for doc in docs:
+            key = _owner_key_of(doc, fields, resolved)
+            if key is None:
+                unresolved += 1
+                continue
+            # Guarded: a write that set the key meanwhile wins
+            ops.append(UpdateOne({"_id": doc["_id"], "owner_key": None}, {"$set": {"owner_key": key}}))
+        if ops:
+            result = await db[collection].bulk_write(ops, ordered=False)
+            updated += result.modified_count
+        if len(docs) < batch_size:
+            break
+    return {"updated": updated, "unresolved": unresolved}
+
+
+async def backfill_owner_keys(db, batch_size: int = OWNER_KEY_BATCH_SIZE) -> dict:
+    """
+    One pass over every owned collection. Documents whose owner matches no
+    user stay without a key (no user's owner_key query could match them) and
+    are counted as unresolved.
+    """
+    counts = {collection: await backfill_collection(db, collection, batch_size) for collection in OWNER_FIELDS}
+    now = datetime.now(timezone.utc).isoformat()
+    await db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"last_run_at": now, "last_run": counts}, "$setOnInsert": {"completed_at": now}},
+        upsert=True,
+    )
+    _ready["value"] = True
+
+    updated = sum(c["updated"] for c in counts.values())
+    unresolved = sum(c["unresolved"] for c in counts.values())
+    if updated or unresolved:
+        logger.info(f"🔑 Owner keys backfilled: {updated} documents, {unresolved} without a matching user")
+    return counts
+
+
+if __name__ == "__main__":
+    import asyncio
+    import sys
+
+    from job_context import get_job_db, close_job_db
+
+    logging.basicConfig(level=logging.INFO)
+    if sys.argv[1:] != ["backfill"]:
+        sys.exit("usage: python owner_keys.py backfill")
+    print(asyncio.run(backfill_owner_keys(get_job_db())))
+    close_job_db()
@@ -8,6 +8,9 @@ from datetime import datetime, timezone
 import os   
 from tonsdk.utils import Address
 
+from game_counters import bump_counters
+from user_cache import user_cache
+
 def to_raw(address_str):
     try:
         return Address(address_str).to_string(is_user_friendly=False)
@@ -152,6 +155,8 @@ class TONPaymentMonitor:
                     }
                 }
             )
+            await bump_counters(self.db, total_volume_ton=amount_ton)
+            user_cache.invalidate(user.get("id"), user.get("wallet_address"), user.get("email"))
             
             # Record deposit
             await self.db.deposits.insert_one({
@@ -0,0 +1,220 @@
+"""
+TON-City Scheduler Leader Lock
+Mongo-backed lease so that only one process runs the scheduled jobs when
+several uvicorn workers or replicas start the scheduler.
+
+- One lease document per lock in `scheduler_leases` (TTL index on expires_at)
+- Every process heartbeats; the holder renews, others take over once it expires
+- Each acquisition increments a fencing token kept in a separate, non-expiring
+  counter document; job runs are recorded in
+  `scheduler_job_runs` only if their token is not older than the last one,
+  so a stalled ex-leader cannot run a job after it was taken over
+- leader_only() also binds the lease and the token a job started under to the
+  job's context; check_fence() raises LeadershipLost before a write once the
+  lease expired or changed hands, so a job stalled past the TTL stops
+  writing instead of racing the new leader's run of the same job
+- on_acquired() is called whenever this process becomes the leader, so jobs
+  meant to run at startup are not lost to the first heartbeat still pending
+"""
+import contextvars
+import functools
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from db_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+LEASE_TTL_SECONDS = int(os.environ.get('SCHEDULER_LEASE_TTL_SECONDS', '15'))
+LEASE_RENEW_SECONDS = int(os.environ.get('SCHEDULER_LEASE_RENEW_SECONDS', '5'))
+LEADER_ELECTION_ENABLED = os.environ.get('SCHEDULER_LEADER_ELECTION', '1').lower() not in ('0', 'false', 'no')
+
+
+class LeadershipLost(Exception):
+    """The lease a job started under expired or was taken over"""
+
+
+# (lease, token) of the job running in this context, set by leader_only
+_fence = contextvars.ContextVar("scheduler_fence", default=None)
+
+
+def check_fence():
+    """
+    Call before each batch of job writes. No-op outside leader-only jobs
+    (request handlers, CLIs, leader election disabled).
+    """
+    fence = _fence.get()
+    if fence is None:
+        return
+    lease, token = fence
+    if not lease.is_leader() or lease.token != token:
+        raise LeadershipLost(f"lease token {token} no longer held by {lease.worker_id}")
+
+
+class SchedulerLease:
+    """Single-leader lease with heartbeat renewal and fencing tokens"""
+
+    def __init__(self, db, name: str = "scheduler", ttl_seconds: int = LEASE_TTL_SECONDS):
+        self.db = db
+        self.name = name
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.token: Optional[int] = None
+        self.expires_at: Optional[datetime] = None
+        self.acquired_at: Optional[datetime] = None
+        self.last_heartbeat: Optional[datetime] = None
+        self.takeovers = 0
+        self.on_acquired = None
+
+    async def ensure_indexes(self):
+        # TTL only garbage-collects dead leases; expiry is decided by expires_at comparisons
+        await ensure_indexes(self.db, "scheduler_leases")
+
+    def is_leader(self) -> bool:
+        """True while this process holds an unexpired lease (by its own clock)"""
+        if self.token is None or self.expires_at is None:
+            return False
+        return datetime.now(timezone.utc) < self.expires_at
+
+    async def heartbeat(self) -> bool:
+        """Renew the lease if held, otherwise try to take it over. Returns leadership."""
+        try:
+            await self.ensure_indexes()
+            now = datetime.now(timezone.utc)
+            expires_at = now + self.ttl
+
+            # Renew our own live lease
+            lease = await self.db.scheduler_leases.find_one_and_update(
+                {"_id": self.name, "holder": self.worker_id, "token": self.token, "expires_at": {"$gt": now}},
+                {"$set": {"expires_at": expires_at, "renewed_at": now}},
+                return_document=ReturnDocument.AFTER,
+            ) if self.token is not None else None
+
+            if lease is None:
+                # Acquire a missing or expired lease
+                try:
+                    lease = await self.db.scheduler_leases.find_one_and_update(
+                        {"_id": self.name, "expires_at": {"$lte": now}},
+                        {"$set": {
+                            "holder": self.worker_id,
+                            "expires_at": expires_at,
+                            "acquired_at": now,
+                            "renewed_at": now,
+                        }},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER,
+                    )
+                except DuplicateKeyError:
+                    lease = None  # held by another live worker
+
+                if lease is not None:
+                    # The counter has no expires_at, so the TTL monitor never resets it
+                    counter = await self.db.scheduler_leases.find_one_and_update(
+                        {"_id": f"{self.name}:fencing"},
+                        {"$inc": {"token": 1}},
+                        upsert=True,
+                        return_document=ReturnDocument.AFTER,
+                    )
+                    lease["token"] = counter["token"]
+                    await self.db.scheduler_leases.update_one(
+                        {"_id": self.name, "holder": self.worker_id},
+                        {"$set": {"token": lease["token"]}},
+                    )
+
+                if lease is not None:
+                    self.takeovers += 1
+                    self.acquired_at = now
+                    logger.info(f"👑 Scheduler leadership acquired by {self.worker_id} (token {lease['token']})")
+                elif self.token is not None:
+                    logger.warning(f"👑 Scheduler leadership lost by {self.worker_id}")
+
+            self.last_heartbeat = now
+            if lease is None:
+                self.token = None
+                self.expires_at = None
+                return False
+
+            newly_acquired = self.token != lease["token"]
+            self.token = lease["token"]
+            self.expires_at = expires_at
+            if newly_acquired and self.on_acquired:
+                self.on_acquired()
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Scheduler lease heartbeat failed: {e}")
+            return self.is_leader()
+
+    async def release(self):
+        """Give up the lease so another worker can take over immediately"""
+        if self.token is None:
+            return
+        try:
+            await self.db.scheduler_leases.update_one(
+                {"_id": self.name, "holder": self.worker_id, "token": self.token},
+                {"$set": {"expires_at": datetime.now(timezone.utc)}},
+            )
+        except Exception as e:
+            logger.error(f"❌ Scheduler lease release failed: {e}")
+        self.token = None
+        self.expires_at = None
+
+    async def claim_run(self, job_id: str) -> bool:
+        """
+        Record a job run under the current fencing token.
+        Rejected when a newer leader already ran this job.
+        """
+        token = self.token
+        if token is None:
+            return False
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.scheduler_job_runs.update_one(
+                {"_id": job_id, "$or": [{"token": {"$lte": token}}, {"token": {"$exists": False}}]},
+                {"$set": {"token": token, "holder": self.worker_id, "started_at": now.isoformat()}},
+                upsert=True,
+            )
+            return True
+        except DuplicateKeyError:
+            logger.warning(f"⛔ Job {job_id} rejected: stale fencing token {token}")
+            return False
+
+    def status(self) -> dict:
+        return {
+            "enabled": LEADER_ELECTION_ENABLED,
+            "worker_id": self.worker_id,
+            "is_leader": self.is_leader(),
+            "token": self.token,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+            "acquired_at": self.acquired_at.isoformat() if self.acquired_at else None,
+            "last_heartbeat": self.last_heartbeat.isoformat() if self.last_heartbeat else None,
+            "takeovers": self.takeovers,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+        }
+
+
+def leader_only(lease: SchedulerLease, job_id: str, func):
+    """Wrap a scheduled job so it only runs on the lease holder"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not lease.is_leader():
+            logger.debug(f"⏭️ {job_id} skipped: {lease.worker_id} is not the scheduler leader")
+            return None
+        if not await lease.claim_run(job_id):
+            return None
+        fence = _fence.set((lease, lease.token))
+        try:
+            return await func(*args, **kwargs)
+        except LeadershipLost as e:
+            logger.warning(f"⛔ {job_id} aborted: {e}")
+            return None
+        finally:
+            _fence.reset(fence)
+    return wrapper
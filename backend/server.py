@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, BackgroundTasks, WebSocket, WebSocketDisconnect, Query, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -20,8 +20,19 @@ from tonsdk.utils import Address
 from ton_integration import ton_client, init_ton_client, close_ton_client, validate_ton_address
 from background_tasks import (
     init_scheduler, start_scheduler, shutdown_scheduler, 
-    trigger_auto_collection_now
+    trigger_auto_collection_now, release_scheduler_lease, get_scheduler_leader_status,
+    materialize_production, reschedule_business, get_tick_interval_seconds, request_job_run,
 )
+from job_context import get_job_metrics
+from telegram_dispatcher import close_dispatcher
+from economy_snapshots import query_snapshots
+from db_indexes import sync_indexes
+from game_counters import bump_counters, read_game_stats
+from income_collection import CollectionPlan, load_patrons, load_plot_zones, plan_business_collection
+from owner_keys import OWNER_FIELDS, owner_filter
+from user_cache import SAFE_METHODS, user_cache
+from island_map import fetch_island_cell, island_cells, island_map_cache, touch_island_cells
+from leaderboard import SORT_KEYS as LEADERBOARD_SORT_KEYS, top_players, player_rank
 from payment_monitor import init_payment_monitor, stop_payment_monitor
 
 # Import new business system V2.0
@@ -43,7 +54,7 @@ from game_systems import (
     TaxSystem, NPCMarketSystem, InflationSystem, BankruptcySystem,
     EventsSystem, EconomicTickEngine, IncomeCollector, BankingSystem,
 )
-from ton_island import generate_ton_island_map, get_cell_at, get_neighbors, ZONES
+from ton_island import get_cell_at, get_neighbors, ZONES
 
 # Import business financial model
 from business_model import (
@@ -111,15 +122,18 @@ DEMOLISH_COST = 0.05  # 5% of business cost to demolish
 # ==================== OWNERSHIP HELPER ====================
 async def get_user_identifiers(current_user) -> dict:
     """Get all possible user identifiers for ownership checks"""
-    user = None
-    if current_user.wallet_address:
+    entry = user_cache.lookup(current_user.wallet_address, current_user.email, current_user.id)
+    user = entry.user() if entry else None
+    if user is not None:
+        user_cache.record_saved()
+    elif current_user.wallet_address:
         user = await db.users.find_one({"wallet_address": current_user.wallet_address}, {"_id": 0})
     if not user and current_user.email:
         user = await db.users.find_one({"email": current_user.email}, {"_id": 0})
     if not user:
         user = await db.users.find_one({"id": current_user.id}, {"_id": 0})
     if not user:
-        return {"user": None, "ids": set()}
+        return {"user": None, "key": None, "ids": set()}
     
     user_id = user.get("id", str(user.get("_id", "")))
     ids = {user_id, current_user.wallet_address, current_user.id}
@@ -129,13 +143,13 @@ async def get_user_identifiers(current_user) -> dict:
         ids.add(user.get("email"))
     ids.discard(None)
     ids.discard("")
-    return {"user": user, "ids": ids}
+    return {"user": user, "key": user_id, "ids": ids}
 
 def is_owner(business: dict, user_ids: set) -> bool:
     """Check if business belongs to any of user's identifiers"""
     owner = business.get("owner", "")
     owner_wallet = business.get("owner_wallet", "")
-    return owner in user_ids or owner_wallet in user_ids
+    return owner in user_ids or owner_wallet in user_ids or business.get("owner_key") in user_ids
 
 def get_user_filter(user: dict) -> dict:
     """Get MongoDB filter to find user by best available identifier"""
@@ -145,11 +159,21 @@ def get_user_filter(user: dict) -> dict:
         return {"wallet_address": user["wallet_address"]}
     return {"id": user.get("id")}
 
-def get_businesses_query(user_ids: set) -> dict:
-    """Get MongoDB query to find businesses by any user identifier"""
-    or_conditions = [{"owner": uid} for uid in user_ids]
-    or_conditions.extend([{"owner_wallet": uid} for uid in user_ids])
-    return {"$or": or_conditions}
+async def materialize_user_production(current_user):
+    """Accrual mode: bring the user's production and wear up to now before use"""
+    await materialize_production(db, {current_user.id, current_user.wallet_address})
+
+async def get_businesses_query(ui: dict) -> dict:
+    """MongoDB query for the user's businesses: owner_key match, or $or over every identifier"""
+    return await owner_filter(db, ui.get("key"), ui["ids"])
+
+async def get_plots_query(ui: dict) -> dict:
+    """MongoDB query for the user's plots"""
+    return await owner_filter(db, ui.get("key"), ui["ids"], OWNER_FIELDS["plots"])
+
+async def get_credits_query(ui: dict) -> dict:
+    """MongoDB query for credits the user has taken"""
+    return await owner_filter(db, ui.get("key"), ui["ids"], OWNER_FIELDS["credits"])
 TRADE_COMMISSION = 0.0  # No trade commission - income tax applies when user receives money
 RENTAL_COMMISSION = 0.10
 WITHDRAWAL_COMMISSION = 0.03
@@ -459,6 +483,7 @@ class Business(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     plot_id: str
     owner: str
+    owner_key: Optional[str] = None
     business_type: str
     level: int = 1
     xp: int = 0
@@ -580,7 +605,7 @@ class WalletAuth(BaseModel):
     public_key: Optional[str] = None
     username: Optional[str] = None
 
-async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
+async def get_current_user(request: Request, credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)):
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
@@ -589,6 +614,12 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
         if not identifier:
             raise HTTPException(status_code=401, detail="Invalid token")
         
+        # Reads may use a recent copy; writes always check the current balance
+        entry = user_cache.get(identifier) if request.method in SAFE_METHODS else None
+        user_cache.record_request(hit=entry is not None)
+        if entry is not None:
+            return User(**entry.doc)
+        
         # Ищем пользователя по разным полям (wallet_address, email, username)
         user_doc = await db.users.find_one({
             "$or": [
@@ -615,6 +646,7 @@ async def get_current_user(credentials: Optional[HTTPAuthorizationCredentials] =
         if ADMIN_WALLET and wallet_addr and (wallet_addr == ADMIN_WALLET or wallet_addr.lower() == ADMIN_WALLET.lower()):
             user_doc["is_admin"] = True
         
+        user_cache.put(identifier, user_doc)
         return User(**user_doc)
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
@@ -727,6 +759,7 @@ async def verify_wallet(request: WalletVerifyRequest):
             
             try:
                 result = await db.users.insert_one(new_user)
+                await bump_counters(db, total_players=1)
                 print(f"✅ УСПЕШНО ЗАПИСАНО. ID: {result.inserted_id}")
                 user_doc = new_user
             except Exception as db_err:
@@ -775,9 +808,13 @@ async def verify_wallet(request: WalletVerifyRequest):
 @api_router.get("/auth/me")
 async def get_current_user_info(current_user: User = Depends(get_current_user)):
     """Get current user info"""
+    # Документ, загруженный get_current_user в этом же запросе
+    entry = user_cache.lookup(current_user.wallet_address, current_user.email, current_user.username)
+    user_doc = entry.doc if entry else None
+    if user_doc is not None:
+        user_cache.record_saved()
     # Ищем пользователя по разным полям
-    user_doc = None
-    if current_user.wallet_address:
+    elif current_user.wallet_address:
         user_doc = await db.users.find_one({"wallet_address": current_user.wallet_address})
     elif current_user.email:
         user_doc = await db.users.find_one({"email": current_user.email})
@@ -843,9 +880,7 @@ async def get_my_plots(current_user: User = Depends(get_current_user)):
     plots = []
     
     # Ищем участки в старой коллекции plots
-    old_plots = await db.plots.find({
-        "$or": [{"owner": uid} for uid in user_ids]
-    }, {"_id": 0}).to_list(100)
+    old_plots = await db.plots.find(await get_plots_query(ui), {"_id": 0}).to_list(100)
     
     for plot in old_plots:
         city = await db.cities.find_one({"id": plot.get("city_id")}, {"_id": 0, "name": 1})
@@ -882,11 +917,8 @@ async def get_my_plots(current_user: User = Depends(get_current_user)):
 @api_router.get("/users/me/businesses")
 async def get_my_businesses(current_user: User = Depends(get_current_user)):
     """Получить все бизнесы пользователя"""
-    # Search by both user.id and wallet_address for compatibility
-    query = {"$or": [
-        {"owner": current_user.id},
-        {"owner": current_user.wallet_address}
-    ]} if current_user.wallet_address else {"owner": current_user.id}
+    # owner_key, or both user.id and wallet_address for compatibility
+    query = await owner_filter(db, current_user.id, {current_user.wallet_address}, ("owner",))
     
     businesses = await db.businesses.find(query, {"_id": 0}).to_list(100)
     
@@ -902,48 +934,27 @@ async def get_my_businesses(current_user: User = Depends(get_current_user)):
 
 @api_router.get("/leaderboard")
 async def get_leaderboard(sort_by: str = "balance", limit: int = 50):
-    """Получить рейтинг игроков"""
-    sort_field_map = {
-        "balance": "balance_ton",
-        "income": "total_income",
-        "businesses": "businesses_count",
-        "plots": "plots_count"
-    }
-    
-    sort_field = sort_field_map.get(sort_by, "balance_ton")
-    
-    # Получаем всех пользователей
-    users = await db.users.find({}, {"_id": 0, "hashed_password": 0}).to_list(1000)
-    
-    # Добавляем подсчёт бизнесов и участков
-    for user in users:
-        wallet = user.get("wallet_address")
-        user_id = user.get("id")
-        
-        # Считаем бизнесы - по user_id (основной) или owner_wallet (резервный)
-        biz_count = 0
-        if user_id:
-            biz_count = await db.businesses.count_documents({
-                "$or": [
-                    {"owner": user_id},
-                    {"owner_wallet": wallet}
-                ]
-            })
-        user["businesses_count"] = biz_count
-        
-        # Считаем участки
-        plots_count = await db.plots.count_documents({
-            "$or": [
-                {"owner": user_id},
-                {"owner": wallet}
-            ]
-        }) if (user_id or wallet) else 0
-        user["plots_count"] = plots_count
-    
-    # Сортируем
-    users.sort(key=lambda x: x.get(sort_field, 0), reverse=True)
-    
-    return {"players": users[:limit], "total": len(users)}
+    """Получить рейтинг игроков (материализованный, обновляется фоновой задачей)"""
+    if sort_by not in LEADERBOARD_SORT_KEYS:
+        sort_by = "balance"
+    
+    total = await db.leaderboard.estimated_document_count()
+    if not total:
+        # Not built yet; pull the scheduled rebuild forward (it still runs under the scheduler lease)
+        request_job_run("leaderboard_rebuild")
+        return {"players": [], "total": 0}
+    
+    players = await top_players(db, sort_by, limit)
+    return {"players": players, "total": total}
+
+@api_router.get("/leaderboard/me")
+async def get_my_leaderboard_rank(current_user: User = Depends(get_current_user)):
+    """Место текущего игрока по каждому рейтингу"""
+    row = await player_rank(db, current_user.id, current_user.wallet_address)
+    total = await db.leaderboard.estimated_document_count()
+    if row is None:
+        return {"ranks": None, "total": total}
+    return {**row, "total": total}
 
 # ==================== TON ISLAND ROUTES ====================
 
@@ -969,95 +980,23 @@ async def get_app_config():
     }
 
 @api_router.get("/island")
-async def get_ton_island():
-    """Get TON Island map data"""
-    # Check if island exists in DB
-    island = await db.islands.find_one({"id": "ton_island"}, {"_id": 0})
-    
-    if not island:
-        # Generate and store
-        island = generate_ton_island_map()
-        await db.islands.insert_one(island.copy())
-    
-    # Merge ownership data from plots collection
-    plots = await db.plots.find({"island_id": "ton_island"}, {"_id": 0}).to_list(1000)
-    plots_map = {(p["x"], p["y"]): p for p in plots}
-    
-    # Merge businesses data
-    businesses = await db.businesses.find({"island_id": "ton_island"}, {"_id": 0}).to_list(1000)
-    businesses_map = {(b["x"], b["y"]): b for b in businesses}
-    
-    cells = island.get("cells", [])
-    
-    # Collect unique owner IDs to batch load avatars
-    owner_ids = set()
-    for cell in cells:
-        x, y = cell["x"], cell["y"]
-        plot = plots_map.get((x, y))
-        if plot and plot.get("owner"):
-            owner_ids.add(plot.get("owner"))
-    
-    # Load user avatars
-    users_with_avatars = {}
-    if owner_ids:
-        users = await db.users.find(
-            {"$or": [{"id": {"$in": list(owner_ids)}}, {"wallet_address": {"$in": list(owner_ids)}}]},
-            {"_id": 0, "id": 1, "wallet_address": 1, "avatar": 1, "username": 1}
-        ).to_list(100)
-        for u in users:
-            users_with_avatars[u.get("id")] = u
-            if u.get("wallet_address"):
-                users_with_avatars[u.get("wallet_address")] = u
-    
-    for cell in cells:
-        x, y = cell["x"], cell["y"]
-        plot = plots_map.get((x, y))
-        if plot:
-            cell["owner"] = plot.get("owner")
-            cell["owner_username"] = plot.get("owner_username")
-            # Get avatar from user if not in plot
-            owner_user = users_with_avatars.get(plot.get("owner"))
-            cell["owner_avatar"] = plot.get("owner_avatar") or (owner_user.get("avatar") if owner_user else None)
-        
-        business = businesses_map.get((x, y))
-        if business:
-            cell["business"] = {
-                "id": business.get("id"),
-                "type": business.get("business_type"),
-                "level": business.get("level", 1),
-                "tier": BUSINESSES.get(business.get("business_type"), {}).get("tier", 1),
-                "icon": BUSINESSES.get(business.get("business_type"), {}).get("icon", "🏢")
-            }
-    
-    # Count statistics
-    owned = sum(1 for c in cells if c.get("owner"))
-    with_business = sum(1 for c in cells if c.get("business"))
-    
-    island["stats"] = {
-        "total_cells": len(cells),
-        "owned_cells": owned,
-        "available_cells": len(cells) - owned,
-        "businesses": with_business,
-    }
-    
-    return island
+async def get_ton_island(request: Request):
+    """Get TON Island map data (304 when the client's ETag is current)"""
+    cache = await island_map_cache.refresh(db)
+    headers = {"ETag": cache.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == cache.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=cache.payload, media_type="application/json", headers=headers)
+
+@api_router.get("/island/changes")
+async def get_ton_island_changes(since: int = Query(..., ge=0)):
+    """Cells changed since a map version; `full: true` means reload GET /island"""
+    return await island_map_cache.changes_since(db, since)
 
 @api_router.post("/island/buy/{x}/{y}")
 async def buy_island_plot(x: int, y: int, current_user: User = Depends(get_current_user)):
     """Buy a plot on TON Island"""
-    # Get island
-    island = await db.islands.find_one({"id": "ton_island"}, {"_id": 0})
-    if not island:
-        island = generate_ton_island_map()
-        await db.islands.insert_one(island.copy())
-    
-    # Find cell
-    cell = None
-    for c in island["cells"]:
-        if c["x"] == x and c["y"] == y:
-            cell = c
-            break
-    
+    cell = await fetch_island_cell(db, x, y)
     if not cell:
         raise HTTPException(status_code=404, detail="Участок не найден")
     
@@ -1083,13 +1022,9 @@ async def buy_island_plot(x: int, y: int, current_user: User = Depends(get_curre
     if not is_admin and not is_bank:
         # Count current plots owned by this user
         user_id = user.get("id", str(user.get("_id")))
-        current_plots = await db.plots.count_documents({
-            "$or": [
-                {"owner": user_id},
-                {"owner": current_user.wallet_address},
-                {"owner": current_user.email}
-            ]
-        })
+        current_plots = await db.plots.count_documents(await owner_filter(
+            db, user_id, {current_user.wallet_address, current_user.email}, ("owner",)
+        ))
         max_plots = 3  # Fixed limit of 3 plots for all regular users
         if current_plots >= max_plots:
             raise HTTPException(status_code=400, detail="max_plots_reached")
@@ -1111,6 +1046,7 @@ async def buy_island_plot(x: int, y: int, current_user: User = Depends(get_curre
         "zone": cell["zone"],
         "price": price,
         "owner": user_id,
+        "owner_key": user_id,
         "owner_username": user.get("username"),
         "owner_avatar": user.get("avatar"),
         "business": None,
@@ -1119,6 +1055,8 @@ async def buy_island_plot(x: int, y: int, current_user: User = Depends(get_curre
     }
     
     await db.plots.insert_one(plot.copy())
+    await touch_island_cells(db, [(x, y)])
+    await bump_counters(db, owned_plots=1)
     
     # Deduct balance - search by email or wallet_address
     user_filter = {"email": user.get("email")} if user.get("email") else {"wallet_address": current_user.wallet_address}
@@ -1195,12 +1133,9 @@ async def build_on_island(x: int, y: int, request: dict, current_user: User = De
         raise HTTPException(status_code=400, detail="Неизвестный тип бизнеса")
     
     # Check zone restrictions
-    island = await db.islands.find_one({"id": "ton_island"}, {"_id": 0})
-    cell = None
-    for c in island["cells"]:
-        if c["x"] == x and c["y"] == y:
-            cell = c
-            break
+    cell = await fetch_island_cell(db, x, y)
+    if not cell:
+        raise HTTPException(status_code=404, detail="Участок не найден")
     
     zone_config = ZONES.get(cell["zone"], {})
     if biz_config["tier"] not in zone_config.get("tier_allowed", [1, 2, 3]):
@@ -1235,6 +1170,7 @@ async def build_on_island(x: int, y: int, request: dict, current_user: User = De
         "durability": 100.0,  # 100% health
         "xp": 0,
         "owner": user_id,  # Use consistent user ID
+        "owner_key": user_id,
         "owner_wallet": current_user.wallet_address,
         "owner_username": user.get("username"),
         "patron": None,  # No patron initially
@@ -1262,6 +1198,8 @@ async def build_on_island(x: int, y: int, request: dict, current_user: User = De
         {"id": plot["id"]},
         {"$set": {"business": business_type}}
     )
+    await touch_island_cells(db, [(x, y)])
+    await bump_counters(db, total_businesses=1)
     
     # Deduct cost - search by email or id
     user_filter = {"email": user.get("email")} if user.get("email") else {"id": user_id}
@@ -1368,6 +1306,7 @@ async def get_business_details(business_id: str, current_user: User = Depends(ge
 @api_router.post("/business/{business_id}/upgrade")
 async def upgrade_business(business_id: str, current_user: User = Depends(get_current_user)):
     """Upgrade business to next level"""
+    await materialize_user_production(current_user)
     business = await db.businesses.find_one({"id": business_id}, {"_id": 0})
     if not business:
         raise HTTPException(status_code=404, detail="Бизнес не найден")
@@ -1401,6 +1340,8 @@ async def upgrade_business(business_id: str, current_user: User = Depends(get_cu
         {"id": business_id},
         {"$set": upgrade_data}
     )
+    await reschedule_business(db, business_id)
+    await touch_island_cells(db, island_cells(business))
     
     # Deduct cost
     await db.users.update_one(
@@ -1458,6 +1399,7 @@ async def get_upgrade_cost(business_id: str, current_user: User = Depends(get_cu
 @api_router.post("/business/{business_id}/repair")
 async def repair_business(business_id: str, current_user: User = Depends(get_current_user)):
     """Repair business to full durability"""
+    await materialize_user_production(current_user)
     business = await db.businesses.find_one({"id": business_id}, {"_id": 0})
     if not business:
         raise HTTPException(status_code=404, detail="Бизнес не найден")
@@ -1486,6 +1428,7 @@ async def repair_business(business_id: str, current_user: User = Depends(get_cur
             "last_repair": datetime.now(timezone.utc).isoformat()
         }}
     )
+    await reschedule_business(db, business_id)
     
     # Deduct cost
     await db.users.update_one(
@@ -1505,6 +1448,7 @@ async def repair_business(business_id: str, current_user: User = Depends(get_cur
 @api_router.post("/business/{business_id}/collect")
 async def collect_business_income(business_id: str, current_user: User = Depends(get_current_user)):
     """Collect accumulated income from business"""
+    await materialize_user_production(current_user)
     business = await db.businesses.find_one({"id": business_id}, {"_id": 0})
     if not business:
         raise HTTPException(status_code=404, detail="Бизнес не найден")
@@ -1827,10 +1771,8 @@ async def instant_withdrawal(
         raise HTTPException(status_code=400, detail="Недостаточно средств")
     
     # Check credit restriction
-    or_conds = [{"borrower_id": uid} for uid in ui["ids"]]
-    or_conds.extend([{"borrower_wallet": uid} for uid in ui["ids"]])
     active_credits = await db.credits.find(
-        {"$or": or_conds, "status": {"$in": ["active", "overdue"]}},
+        {**await get_credits_query(ui), "status": {"$in": ["active", "overdue"]}},
         {"_id": 0}
     ).to_list(20)
     
@@ -1916,12 +1858,13 @@ async def get_withdrawal_queue(current_user: User = Depends(get_current_user)):
 @api_router.get("/my/businesses")
 async def get_my_businesses_full(current_user: User = Depends(get_current_user)):
     """Get all user's businesses with full details"""
+    await materialize_user_production(current_user)
     # Search using unified helper
     ui = await get_user_identifiers(current_user)
     if not ui["user"]:
         return {"businesses": [], "summary": {"total_businesses": 0, "total_pending_income": 0, "total_hourly_income": 0, "total_daily_income": 0}}
     
-    query = get_businesses_query(ui["ids"])
+    query = await get_businesses_query(ui)
     businesses = await db.businesses.find(query, {"_id": 0}).to_list(50)
     
     # Calculate shared warehouse totals
@@ -1931,6 +1874,7 @@ async def get_my_businesses_full(current_user: User = Depends(get_current_user))
     result = []
     total_pending = 0
     total_hourly = 0
+    patrons = await load_patrons(db, businesses)
     
     for biz in businesses:
         config = BUSINESSES.get(biz.get("business_type"), {})
@@ -1939,7 +1883,7 @@ async def get_my_businesses_full(current_user: User = Depends(get_current_user))
         patron_bonus = 1.0
         patron_info = None
         if biz.get("patron_id"):
-            patron = await db.businesses.find_one({"id": biz["patron_id"]}, {"_id": 0})
+            patron = patrons.get(biz["patron_id"])
             if patron:
                 patron_type = PatronageSystem.get_patron_type(patron.get("business_type"))
                 patron_bonus = PatronageSystem.get_patron_bonus_multiplier(
@@ -1949,7 +1893,7 @@ async def get_my_businesses_full(current_user: User = Depends(get_current_user))
         
         # Calculate production
         production = BusinessEconomics.calculate_effective_production(biz, patron_bonus)
-        pending = IncomeCollector.calculate_pending_income(biz, patron_bonus)
+        pending = IncomeCollector.calculate_pending_income(biz, patron_bonus=patron_bonus)
         
         total_pending += pending.get("pending", 0)
         total_hourly += production.get("income_after_tax", 0)
@@ -2013,58 +1957,23 @@ async def get_my_businesses_full(current_user: User = Depends(get_current_user))
 @api_router.post("/my/collect-all")
 async def collect_all_income(current_user: User = Depends(get_current_user)):
     """Collect income from all businesses"""
-    # Search by both user.id and wallet_address for compatibility
-    query = {"$or": [
-        {"owner": current_user.id},
-        {"owner": current_user.wallet_address}
-    ]} if current_user.wallet_address else {"owner": current_user.id}
+    await materialize_user_production(current_user)
+    # owner_key, or both user.id and wallet_address for compatibility
+    query = await owner_filter(db, current_user.id, {current_user.wallet_address}, ("owner",))
     
     businesses = await db.businesses.find(query, {"_id": 0}).to_list(50)
     
-    total_collected = 0
-    total_tax = 0
-    total_patron = 0
-    collected_count = 0
-    
-    for biz in businesses:
-        patron_wallet = None
-        if biz.get("patron_id"):
-            patron = await db.businesses.find_one({"id": biz["patron_id"]}, {"_id": 0})
-            if patron:
-                patron_wallet = patron.get("owner")
-        
-        collection = IncomeCollector.collect_income(biz, patron_wallet)
-        
-        if collection.get("halted") or collection["collected"] <= 0:
-            continue
-        
-        total_collected += collection["player_receives"]
-        total_tax += collection["treasury_receives"]
-        total_patron += collection["patron_receives"]
-        collected_count += 1
-        
-        # Update business
-        await db.businesses.update_one(
-            {"id": biz["id"]},
-            {"$set": {"last_collection": datetime.now(timezone.utc).isoformat()}}
-        )
-        
-        # Pay patron
-        if patron_wallet and collection["patron_receives"] > 0:
-            await db.users.update_one(
-                {"wallet_address": patron_wallet},
-                {"$inc": {"balance_ton": collection["patron_receives"]}}
-            )
+    # One businesses and one users bulk_write; patrons are paid once per owner
+    plan = CollectionPlan()
+    totals = plan_business_collection(plan, businesses, await load_patrons(db, businesses))
+    plan.pay(totals["collected"], current_user.id, current_user.wallet_address, income=True)
+    await plan.commit(db)
+    user_cache.invalidate(*plan.paid())
     
-    # Update user - search by id or wallet_address
-    if total_collected > 0:
-        user_query = {"$or": [{"id": current_user.id}]}
-        if current_user.wallet_address:
-            user_query["$or"].append({"wallet_address": current_user.wallet_address})
-        await db.users.update_one(
-            user_query,
-            {"$inc": {"balance_ton": total_collected, "total_income": total_collected}}
-        )
+    total_collected = totals["collected"]
+    total_tax = totals["tax"]
+    total_patron = totals["patron"]
+    collected_count = totals["count"]
     
     # Update treasury
     if total_tax > 0:
@@ -2084,58 +1993,42 @@ async def collect_all_income(current_user: User = Depends(get_current_user)):
 
 # ==================== CITIES ROUTES ====================
 
-from city_generator import create_demo_cities, calculate_plot_price_in_city
+from city_generator import create_demo_cities, calculate_plot_price_in_city, ensure_price_grid
+from city_list import city_list_cache, invalidate_city_list
+
+# Derived pricing data stays server-side; clients get prices per plot
+CITY_PRICING_PROJECTION = {"_id": 0, "price_grid": 0, "pricing_key": 0}
+
+
+async def load_priced_city(city_id: str):
+    """City document with a current price grid; a missing or stale grid is rebuilt and stored once"""
+    city = await db.cities.find_one({"id": city_id}, {"_id": 0})
+    if city:
+        fields = ensure_price_grid(city)
+        if fields:
+            await db.cities.update_one({"id": city_id}, {"$set": fields})
+            logger.info(f"🏙️ Price grid rebuilt for city {city_id}")
+    return city
 
 @api_router.get("/cities")
 async def get_all_cities():
     """Get all cities with basic info for map view"""
-    cities = await db.cities.find({}, {"_id": 0}).to_list(100)
+    result = await city_list_cache.get(db)
     
-    if not cities:
+    if not result["cities"]:
         # Seed demo cities if none exist
         demo_cities = create_demo_cities()
         for city in demo_cities:
             await db.cities.insert_one(city.copy())
-        cities = demo_cities
+        city_list_cache.invalidate()
+        result = await city_list_cache.get(db, demo_cities)
     
-    # Return lightweight version for list view
-    result = []
-    for city in cities:
-        # Update stats from actual data
-        owned_plots = await db.plots.count_documents({"city_id": city["id"], "owner": {"$ne": None}})
-        total_businesses = await db.businesses.count_documents({"city_id": city["id"]})
-        
-        # Handle localized name - convert to string
-        city_name = city.get("name", "Unknown")
-        if isinstance(city_name, dict):
-            city_name = city_name.get("ru") or city_name.get("en") or "Unknown"
-        
-        city_desc = city.get("description", "")
-        if isinstance(city_desc, dict):
-            city_desc = city_desc.get("ru") or city_desc.get("en") or ""
-        
-        result.append({
-            "id": city["id"],
-            "name": city_name,
-            "description": city_desc,
-            "style": city["style"],
-            "base_price": city["base_price"],
-            "grid_preview": city["grid"],  # For silhouette rendering
-            "stats": {
-                "total_plots": city["stats"]["total_plots"],
-                "owned_plots": owned_plots,
-                "total_businesses": total_businesses,
-                "monthly_volume": city["stats"].get("monthly_volume", 0),
-                "active_players": city["stats"].get("active_players", 0)
-            }
-        })
-    
-    return {"cities": result, "total": len(result)}
+    return result
 
 @api_router.get("/cities/{city_id}")
 async def get_city(city_id: str):
     """Get full city data including grid"""
-    city = await db.cities.find_one({"id": city_id}, {"_id": 0})
+    city = await db.cities.find_one({"id": city_id}, CITY_PRICING_PROJECTION)
     
     if not city:
         raise HTTPException(status_code=404, detail="Город не найден")
@@ -2145,7 +2038,7 @@ async def get_city(city_id: str):
 @api_router.get("/cities/{city_id}/plots")
 async def get_city_plots(city_id: str):
     """Get all plots for a specific city"""
-    city = await db.cities.find_one({"id": city_id}, {"_id": 0})
+    city = await load_priced_city(city_id)
     if not city:
         raise HTTPException(status_code=404, detail="Город не найден")
     
@@ -2159,6 +2052,7 @@ async def get_city_plots(city_id: str):
     
     # Generate full plot list from grid
     grid = city["grid"]
+    price_grid = city["price_grid"]
     result = []
     
     for y, row in enumerate(grid):
@@ -2176,7 +2070,7 @@ async def get_city_plots(city_id: str):
                         "y": y,
                         "city_id": city_id,
                         "owner": existing_plot.get("owner"),
-                        "price": existing_plot.get("price", calculate_plot_price_in_city(city, x, y)),
+                        "price": existing_plot.get("price", price_grid[y][x]),
                         "is_available": existing_plot.get("is_available", True),
                         "business_id": existing_plot.get("business_id"),
                         "business_type": business["business_type"] if business else None,
@@ -2191,7 +2085,7 @@ async def get_city_plots(city_id: str):
                         "y": y,
                         "city_id": city_id,
                         "owner": None,
-                        "price": calculate_plot_price_in_city(city, x, y),
+                        "price": price_grid[y][x],
                         "is_available": True,
                         "business_id": None,
                         "business_type": None,
@@ -2204,7 +2098,7 @@ async def get_city_plots(city_id: str):
 @api_router.post("/cities/{city_id}/plots/{x}/{y}/buy")
 async def buy_city_plot(city_id: str, x: int, y: int, current_user: User = Depends(get_current_user)):
     """Buy a plot in a specific city"""
-    city = await db.cities.find_one({"id": city_id}, {"_id": 0})
+    city = await load_priced_city(city_id)
     if not city:
         raise HTTPException(status_code=404, detail="Город не найден")
     
@@ -2256,6 +2150,7 @@ async def buy_city_plot(city_id: str, x: int, y: int, current_user: User = Depen
         "y": y,
         "price": price,
         "owner": user_id,
+        "owner_key": user_id,
         "owner_username": user.get("username"),
         "owner_avatar": user.get("avatar"),
         "is_available": False,
@@ -2267,6 +2162,8 @@ async def buy_city_plot(city_id: str, x: int, y: int, current_user: User = Depen
         {"$set": plot_data},
         upsert=True
     )
+    invalidate_city_list()
+    await bump_counters(db, owned_plots=1)
     
     # Update user by id field
     new_balance = user.get("balance_ton", 0) - price
@@ -2346,6 +2243,7 @@ async def build_business_in_city(city_id: str, x: int, y: int, request: dict, cu
         "plot_y": y,
         "business_type": business_type,
         "owner": user_id,  # Use consistent user ID
+        "owner_key": user_id,
         "owner_username": user.get("username"),
         "level": 1,
         "built_at": datetime.now(timezone.utc).isoformat(),
@@ -2355,6 +2253,8 @@ async def build_business_in_city(city_id: str, x: int, y: int, request: dict, cu
     }
     
     await db.businesses.insert_one(business_data.copy())
+    invalidate_city_list()
+    await bump_counters(db, total_businesses=1)
     
     # Update plot
     await db.plots.update_one(
@@ -2511,6 +2411,7 @@ async def purchase_plot(request: PurchasePlotRequest, current_user: User = Depen
             "$set": {
                 "owner": current_user.wallet_address,
                 "owner_id": current_user.id,
+                "owner_key": current_user.id,
                 "owner_avatar": current_user.avatar,
                 "owner_username": current_user.username,
                 "is_available": False,
@@ -2518,6 +2419,7 @@ async def purchase_plot(request: PurchasePlotRequest, current_user: User = Depen
             }
         }
     )
+    await bump_counters(db, owned_plots=1)
     
     # Update user plots
     await db.users.update_one(
@@ -2599,7 +2501,7 @@ async def confirm_plot_purchase(request: ConfirmTransactionRequest, current_user
     # Update plot
     await db.plots.update_one(
         {"id": tx["plot_id"]},
-        {"$set": {"owner": current_user.wallet_address, "is_available": False,
+        {"$set": {"owner": current_user.wallet_address, "owner_key": current_user.id, "is_available": False,
                   "purchased_at": datetime.now(timezone.utc).isoformat()}}
     )
     
@@ -2705,11 +2607,13 @@ async def buy_resale_plot(plot_id: str, current_user: User = Depends(get_current
         {"id": plot_id},
         {"$set": {
             "owner": current_user.wallet_address,
+            "owner_key": current_user.id,
             "is_available": False,
             "is_resale": False,
             "price": plot.get("original_price", price)  # Reset to original price
         }}
     )
+    await touch_island_cells(db, island_cells(plot))
     
     # Update buyer balance
     await db.users.update_one(
@@ -2727,7 +2631,7 @@ async def buy_resale_plot(plot_id: str, current_user: User = Depends(get_current
     if plot.get("business_id"):
         await db.businesses.update_one(
             {"id": plot["business_id"]},
-            {"$set": {"owner": current_user.wallet_address}}
+            {"$set": {"owner": current_user.wallet_address, "owner_key": current_user.id}}
         )
         
         # Update business ownership lists
@@ -2894,6 +2798,7 @@ async def build_business(request: BuildBusinessRequest, current_user: User = Dep
     business = Business(
         plot_id=request.plot_id,
         owner=current_user.wallet_address,
+        owner_key=current_user.id,
         business_type=request.business_type,
         level=1,
         building_progress=100,  # Instant build for now
@@ -2904,6 +2809,7 @@ async def build_business(request: BuildBusinessRequest, current_user: User = Dep
     business_dict['created_at'] = business_dict['created_at'].isoformat()
     business_dict['last_collection'] = business_dict['last_collection']
     await db.businesses.insert_one(business_dict.copy())
+    await bump_counters(db, total_businesses=1)
     
     # Update plot
     await db.plots.update_one(
@@ -2977,6 +2883,7 @@ async def confirm_business_build(request: ConfirmTransactionRequest, current_use
     business = Business(
         plot_id=tx["plot_id"],
         owner=current_user.wallet_address,
+        owner_key=current_user.id,
         business_type=build_order["business_type"],
         income_rate=bt["base_income"],
         production_rate=bt.get("production_rate", 0),
@@ -2986,6 +2893,7 @@ async def confirm_business_build(request: ConfirmTransactionRequest, current_use
     business_dict['created_at'] = business_dict['created_at'].isoformat()
     business_dict['last_collection'] = business_dict['last_collection'].isoformat()
     await db.businesses.insert_one(business_dict.copy())
+    await bump_counters(db, total_businesses=1)
     
     # Update plot
     await db.plots.update_one(
@@ -3074,6 +2982,10 @@ async def demolish_business(business_id: str, current_user: User = Depends(get_c
     
     # Delete business
     await db.businesses.delete_one({"id": business_id})
+    await touch_island_cells(db, island_cells(business, plot))
+    await bump_counters(db, total_businesses=-1)
+    if business.get("city_id"):
+        invalidate_city_list()
     
     # Remove from user's businesses list
     await db.users.update_one(
@@ -3157,6 +3069,7 @@ async def connect_businesses(business_id: str, business_type: str, x: int, y: in
 @api_router.post("/businesses/collect/{business_id}")
 async def collect_income(business_id: str, current_user: User = Depends(get_current_user)):
     """Collect accumulated income from business"""
+    await materialize_user_production(current_user)
     business = await db.businesses.find_one({"id": business_id}, {"_id": 0})
     
     if not business:
@@ -3296,6 +3209,7 @@ async def accept_contract(contract_id: str, current_user: User = Depends(get_cur
 @api_router.post("/trade/spot")
 async def spot_trade(request: TradeResourceRequest, current_user: User = Depends(get_current_user)):
     """Execute spot trade between businesses"""
+    await materialize_user_production(current_user)
     seller_biz = await db.businesses.find_one({"id": request.seller_business_id}, {"_id": 0})
     buyer_biz = await db.businesses.find_one({"id": request.buyer_business_id}, {"_id": 0})
     
@@ -3426,6 +3340,7 @@ async def create_market_listing(data: MarketListing, current_user: User = Depend
     listing = {
         "id": str(uuid.uuid4()),
         "seller_id": user_id,  # Use user_id instead of wallet_address
+        "owner_key": user_id,
         "seller_email": user.get("email"),
         "seller_username": user.get("username") or current_user.display_name,
         "business_id": data.business_id,
@@ -3594,7 +3509,8 @@ async def get_my_listings(current_user: User = Depends(get_current_user)):
     user_id = user.get("id", str(user.get("_id")))
     
     listings = await db.market_listings.find(
-        {"$or": [{"seller_id": user_id}, {"seller_id": current_user.wallet_address}, {"seller_email": user.get("email")}], "status": "active"},
+        {**await owner_filter(db, user_id, {current_user.wallet_address, user.get("email")},
+                              OWNER_FIELDS["market_listings"]), "status": "active"},
         {"_id": 0}
     ).sort("created_at", -1).to_list(50)
     
@@ -3618,7 +3534,7 @@ async def get_my_resources(current_user: User = Depends(get_current_user)):
     user_ids = ui["ids"]
     
     businesses = await db.businesses.find(
-        {"$or": [{"owner": uid} for uid in user_ids]},
+        await owner_filter(db, ui["key"], user_ids, ("owner",)),
         {"_id": 0, "storage": 1}
     ).to_list(100)
     
@@ -3649,7 +3565,7 @@ async def get_my_trade_operations(current_user: User = Depends(get_current_user)
     
     # Get all businesses to calculate shared warehouse
     businesses = await db.businesses.find(
-        get_businesses_query(ui["ids"]),
+        await get_businesses_query(ui),
         {"_id": 0}
     ).to_list(100)
     
@@ -3735,6 +3651,7 @@ class ResourceListingRequest(BaseModel):
 @api_router.post("/market/list-resource")
 async def list_resource_for_sale(data: ResourceListingRequest, current_user: User = Depends(get_current_user)):
     """Выставить ресурсы на продажу (из складов бизнесов)"""
+    await materialize_user_production(current_user)
     # Validate integer amount
     amount = int(data.amount)
     if amount <= 0:
@@ -3759,7 +3676,7 @@ async def list_resource_for_sale(data: ResourceListingRequest, current_user: Use
     
     # Get businesses with this resource
     businesses = await db.businesses.find(
-        {"$or": [{"owner": user_id}, {"owner": current_user.wallet_address}]},
+        await owner_filter(db, user_id, {current_user.wallet_address}, ("owner",)),
         {"_id": 0}
     ).to_list(100)
     
@@ -3797,6 +3714,7 @@ async def list_resource_for_sale(data: ResourceListingRequest, current_user: Use
     listing = {
         "id": str(uuid.uuid4()),
         "seller_id": user_id,
+        "owner_key": user_id,
         "seller_email": user.get("email"),
         "seller_username": user.get("username") or current_user.display_name,
         "business_id": None,  # Sold from user storage
@@ -3841,7 +3759,7 @@ async def cancel_listing(listing_id: str, current_user: User = Depends(get_curre
     
     # Return resources to first business (simplified)
     first_business = await db.businesses.find_one(
-        {"$or": [{"owner": user_id}, {"owner": current_user.wallet_address}]},
+        await owner_filter(db, user_id, {current_user.wallet_address}, ("owner",)),
         {"_id": 0}
     )
     
@@ -3890,15 +3808,20 @@ async def create_land_listing(data: LandListingRequest, current_user: User = Dep
     if existing:
         raise HTTPException(status_code=400, detail="Этот участок уже выставлен на продажу. Сначала отмените текущий листинг.")
     
+    # Получаем информацию о городе/острова
+    city_id = plot.get("city_id") or plot.get("island_id") or "ton_island"
+    city = await load_priced_city(city_id) if plot.get("city_id") else None
+    
+    # Цена участка: уплаченная, иначе текущая цена клетки в сетке города
+    plot_price = plot.get("price")
+    if plot_price is None and city and plot.get("x") is not None:
+        plot_price = calculate_plot_price_in_city(city, plot["x"], plot["y"])
+    
     # Минимальная цена - 50% от изначальной
-    min_price = plot.get("price", 0.1) * 0.5
+    min_price = (plot_price if plot_price is not None else 0.1) * 0.5
     if data.price < min_price:
         raise HTTPException(status_code=400, detail=f"Price too low. Minimum: {min_price:.4f} TON")
     
-    # Получаем информацию о городе/острова
-    city_id = plot.get("city_id") or plot.get("island_id") or "ton_island"
-    city = await db.cities.find_one({"id": city_id}, {"_id": 0, "name": 1})
-    
     # Handle localized name - default to TON Island for island plots
     city_name = "TON Island"
     if city:
@@ -3938,9 +3861,10 @@ async def create_land_listing(data: LandListingRequest, current_user: User = Dep
         "x": plot.get("x"),
         "y": plot.get("y"),
         "seller_id": user.get("id") or current_user.id,
+        "owner_key": user.get("id") or current_user.id,
         "seller_wallet": current_user.wallet_address,
         "seller_username": user.get("username") or user.get("display_name", "Anonymous"),
-        "original_price": plot.get("price", 0),
+        "original_price": plot_price or 0,
         "price": data.price,
         "business": business_info,
         "status": "active",
@@ -4022,7 +3946,7 @@ async def buy_land_from_market(data: BuyLandRequest, current_user: User = Depend
     
     # Count owned plots
     owned_plots_count = await db.plots.count_documents({
-        "$or": [{"owner": uid} for uid in buyer_ids],
+        **await owner_filter(db, buyer_id, buyer_ids, ("owner",)),
         "on_sale": {"$ne": True}
     })
     
@@ -4064,6 +3988,7 @@ async def buy_land_from_market(data: BuyLandRequest, current_user: User = Depend
         {"id": listing["plot_id"]},
         {"$set": {
             "owner": buyer_id,
+            "owner_key": buyer_id,
             "owner_username": buyer.get("username"),
             "owner_avatar": buyer.get("avatar"),
             "purchased_at": datetime.now(timezone.utc).isoformat(),
@@ -4083,12 +4008,16 @@ async def buy_land_from_market(data: BuyLandRequest, current_user: User = Depend
             ]},
             {"$set": {
                 "owner": buyer_id,
+                "owner_key": buyer_id,
                 "owner_wallet": current_user.wallet_address,
                 "owner_username": buyer.get("username")
             },
             "$unset": {"on_sale": "", "listing_id": ""}}
         )
     
+    if listing.get("city_id") == "ton_island" and listing.get("x") is not None:
+        await touch_island_cells(db, [(listing.get("x"), listing.get("y"))])
+    
     # Закрываем листинг
     await db.land_listings.update_one(
         {"id": data.listing_id},
@@ -4262,16 +4191,9 @@ async def get_my_land_listings(current_user: User = Depends(get_current_user)):
     
     user_id = user.get("id") if user else current_user.id
     
-    # Ищем листинги по всем возможным идентификаторам продавца
-    or_conditions = [{"seller_id": user_id}]
-    if current_user.wallet_address:
-        or_conditions.append({"seller_id": current_user.wallet_address})
-        or_conditions.append({"seller_wallet": current_user.wallet_address})
-    if user and user.get("id"):
-        or_conditions.append({"seller_user_id": user.get("id")})
-    
+    # owner_key, или все возможные идентификаторы продавца
     listings = await db.land_listings.find(
-        {"$or": or_conditions},
+        await owner_filter(db, user_id, {current_user.wallet_address}, OWNER_FIELDS["land_listings"]),
         {"_id": 0}
     ).sort("created_at", -1).to_list(50)
     
@@ -4377,6 +4299,7 @@ async def sell_business(business_id: str, data: SellBusinessRequest, current_use
         "y": plot.get("y"),
         "seller_id": current_user.wallet_address,
         "seller_user_id": user_id,
+        "owner_key": user_id,
         "seller_username": user.get("username", "Anonymous"),
         "price": data.price,
         "tax_amount": round(tax, 4),
@@ -4591,49 +4514,7 @@ async def reject_withdrawal(
 @api_router.get("/stats")
 async def get_game_stats():
     """Get overall game statistics"""
-    # Count from old collections
-    owned_plots_old = await db.plots.count_documents({"is_available": False})
-    total_businesses_old = await db.businesses.count_documents({})
-    
-    # Also count from island cells (TON Island)
-    island = await db.islands.find_one({"id": "ton_island"})
-    owned_plots_island = 0
-    businesses_island = 0
-    
-    if island and 'cells' in island:
-        for cell in island['cells']:
-            if cell.get('owner'):
-                owned_plots_island += 1
-            if cell.get('business'):
-                businesses_island += 1
-    
-    # Combine counts
-    owned_plots = owned_plots_old + owned_plots_island
-    total_businesses = total_businesses_old + businesses_island
-    
-    total_users = await db.users.count_documents({})
-    
-    # Calculate TON in circulation - sum of all positive user balances
-    pipeline = [
-        {"$match": {"balance_ton": {"$gt": 0}}},
-        {"$group": {"_id": None, "total": {"$sum": "$balance_ton"}}}
-    ]
-    balance_result = await db.users.aggregate(pipeline).to_list(1)
-    total_balance = balance_result[0]["total"] if balance_result else 0
-    
-    admin_stats = await db.admin_stats.find_one({"type": "treasury"}, {"_id": 0})
-    
-    total_plots = max(10000, len(island.get('cells', [])) if island else 0)
-    
-    return {
-        "total_plots": total_plots,
-        "owned_plots": owned_plots,
-        "available_plots": total_plots - owned_plots,
-        "total_businesses": total_businesses,
-        "total_players": total_users,
-        "total_volume_ton": max(0, round(total_balance, 2)),  # TON in circulation - only positive
-        "treasury": admin_stats or {}
-    }
+    return await read_game_stats(db)
 
 
 # ==================== SPRITE GENERATION ====================
@@ -4852,13 +4733,21 @@ async def get_market_prices():
 
 
 @api_router.get("/economy/snapshots")
-async def get_economy_snapshots(limit: int = 24):
-    """Get recent economic tick snapshots"""
-    snapshots = await db.economic_snapshots.find(
-        {"type": "tick_snapshot"},
-        {"_id": 0}
-    ).sort("timestamp", -1).limit(limit).to_list(length=limit)
-    return {"snapshots": snapshots}
+async def get_economy_snapshots(
+    limit: int = 24,
+    resolution: str = "raw",
+    from_: Optional[str] = Query(None, alias="from"),
+    to: Optional[str] = None,
+):
+    """
+    Economic tick snapshots, newest first.
+    resolution: raw (one per tick), 5m, 1h or 1d rollups; from/to are ISO timestamps.
+    """
+    try:
+        snapshots = await query_snapshots(db, resolution, from_, to, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"snapshots": snapshots, "resolution": resolution}
 
 
 @api_router.get("/economy/my-resources")
@@ -4902,6 +4791,7 @@ async def trade_resource(
     current_user: User = Depends(get_current_user)
 ):
     """Trade resources on the market with turnover tax"""
+    await materialize_user_production(current_user)
     if resource not in RESOURCE_TYPES:
         raise HTTPException(status_code=400, detail="Invalid resource type")
     if amount <= 0:
@@ -5140,28 +5030,6 @@ async def get_income_table_endpoint(lang: str = "en"):
     """Get income table for all 21 businesses at all 10 levels (V2.0)"""
     return await get_income_table(lang)
 
-@api_router.get("/leaderboard")
-async def get_leaderboard():
-    """Get top players"""
-    pipeline = [
-        {"$sort": {"total_income": -1}},
-        {"$limit": 20},
-        {"$project": {
-            "_id": 0,
-            "wallet_address": 1,
-            "display_name": 1,
-            "level": 1,
-            "total_income": 1,
-            "total_turnover": 1,
-            "plots_count": {"$size": {"$ifNull": ["$plots_owned", []]}},
-            "businesses_count": {"$size": {"$ifNull": ["$businesses_owned", []]}}
-        }}
-    ]
-    leaders = await db.users.aggregate(pipeline).to_list(20)
-    return {"leaderboard": leaders}
-
-
-
 @api_router.get("/wallet-settings/public")
 async def get_public_wallet_settings():
     """Get public wallet settings (receiver address for deposits)"""
@@ -5245,6 +5113,7 @@ async def get_ton_transaction_history(address: str, limit: int = 10):
 @api_router.post("/income/collect-all")
 async def collect_all_income(current_user: User = Depends(get_current_user)):
     """Collect income from all user's businesses"""
+    await materialize_user_production(current_user)
     try:
         businesses = await db.businesses.find({
             "owner": current_user.wallet_address,
@@ -5254,6 +5123,9 @@ async def collect_all_income(current_user: User = Depends(get_current_user)):
         
         total_collected = 0
         collected_businesses = []
+        zones = await load_plot_zones(db, businesses)
+        plan = CollectionPlan()
+        now = plan.now
         
         for business in businesses:
             business_id = business["id"]
@@ -5269,31 +5141,21 @@ async def collect_all_income(current_user: User = Depends(get_current_user)):
                 last_collection = last_collection_str
             
             # Calculate income
-            hours_passed = (datetime.now(timezone.utc) - last_collection).total_seconds() / 3600
+            hours_passed = (now - last_collection).total_seconds() / 3600
             days_passed = hours_passed / 24
             
             # Skip if less than 1 hour
             if hours_passed < 1:
                 continue
             
-            # Get plot zone
-            plot = await db.plots.find_one({"id": business["plot_id"]}, {"_id": 0})
-            zone = plot.get("zone", "outskirts") if plot else "outskirts"
-            
+            zone = zones.get(business["plot_id"], "outskirts")
             income_data = calculate_business_income(business_type, level, zone, connections)
             
             gross_income = income_data["gross"] * days_passed
             tax = income_data["tax"] * days_passed
             net_income = income_data["net"] * days_passed
             
-            # Update business
-            await db.businesses.update_one(
-                {"id": business_id},
-                {
-                    "$set": {"last_collection": datetime.now(timezone.utc).isoformat()},
-                    "$inc": {"xp": int(gross_income * 10)}
-                }
-            )
+            plan.collect(business_id, {"xp": int(gross_income * 10)})
             
             total_collected += net_income
             collected_businesses.append({
@@ -5304,16 +5166,8 @@ async def collect_all_income(current_user: User = Depends(get_current_user)):
             })
         
         # Update user balance
-        if total_collected > 0:
-            await db.users.update_one(
-                {"wallet_address": current_user.wallet_address},
-                {
-                    "$inc": {
-                        "balance_ton": total_collected,
-                        "total_income": total_collected
-                    }
-                }
-            )
+        plan.pay(total_collected, current_user.wallet_address, income=True)
+        await plan.commit(db)
         
         return {
             "total_collected": round(total_collected, 4),
@@ -5327,6 +5181,7 @@ async def collect_all_income(current_user: User = Depends(get_current_user)):
 @api_router.get("/income/pending")
 async def get_pending_income(current_user: User = Depends(get_current_user)):
     """Get pending income from all user's businesses without collecting"""
+    await materialize_user_production(current_user)
     try:
         businesses = await db.businesses.find({
             "owner": current_user.wallet_address,
@@ -5336,6 +5191,8 @@ async def get_pending_income(current_user: User = Depends(get_current_user)):
         
         total_pending = 0
         pending_businesses = []
+        zones = await load_plot_zones(db, businesses)
+        now = datetime.now(timezone.utc)
         
         for business in businesses:
             business_type = business["business_type"]
@@ -5350,13 +5207,10 @@ async def get_pending_income(current_user: User = Depends(get_current_user)):
                 last_collection = last_collection_str
             
             # Calculate pending income
-            hours_passed = (datetime.now(timezone.utc) - last_collection).total_seconds() / 3600
+            hours_passed = (now - last_collection).total_seconds() / 3600
             days_passed = hours_passed / 24
             
-            # Get plot zone
-            plot = await db.plots.find_one({"id": business["plot_id"]}, {"_id": 0})
-            zone = plot.get("zone", "outskirts") if plot else "outskirts"
-            
+            zone = zones.get(business["plot_id"], "outskirts")
             income_data = calculate_business_income(business_type, level, zone, connections)
             pending = income_data["net"] * days_passed
             
@@ -5781,6 +5635,39 @@ async def admin_get_system_events(limit: int = 50, admin: User = Depends(get_adm
     events = await db.system_events.find({}, {"_id": 0}).sort("timestamp", -1).limit(limit).to_list(limit)
     return {"events": events, "total": len(events)}
 
+@admin_router.get("/cache/users")
+async def admin_get_user_cache_metrics(admin: User = Depends(get_admin_user)):
+    """Authenticated-user cache of this process: hit rate, DB lookups saved"""
+    return user_cache.metrics()
+
+@admin_router.get("/jobs/metrics")
+async def admin_get_job_metrics(admin: User = Depends(get_admin_user)):
+    """Scheduled job run timings, job Mongo pool saturation and scheduler leadership"""
+    return {**get_job_metrics(), "leader": get_scheduler_leader_status()}
+
+@admin_router.get("/economy/tick-timings")
+async def admin_get_tick_timings(limit: int = 30, admin: User = Depends(get_admin_user)):
+    """Per-step timings of recent economic ticks plus scheduler lag and missed runs"""
+    snapshots = await db.economic_snapshots.find(
+        {"type": "tick_snapshot"},
+        {"_id": 0, "timestamp": 1, "businesses_processed": 1, "timings": 1, "tick_total_ms": 1,
+         "tick_lag_s": 1, "tick_interval_s": 1, "write_round_trips": 1, "peak_rss_mb": 1}
+    ).sort("timestamp", -1).limit(min(limit, 500)).to_list(500)
+    
+    tick = get_job_metrics()["jobs"].get("economic_tick", {})
+    return {
+        "ticks": snapshots,
+        "scheduler": {
+            "interval_s": get_tick_interval_seconds(),
+            "missed": tick.get("missed", 0),
+            "coalesced": tick.get("coalesced", 0),
+            "skipped_overlap": tick.get("skipped_overlap", 0),
+            "last_lag_s": tick.get("last_lag_s"),
+            "max_lag_s": tick.get("max_lag_s", 0.0),
+            "last_duration_s": tick.get("last_duration_s"),
+        },
+    }
+
 @admin_router.get("/withdrawals")
 async def admin_get_withdrawals(skip: int = 0, limit: int = 100, status: str = None, admin: User = Depends(get_admin_user)):
     """Get withdrawal requests for admin"""
@@ -5935,6 +5822,7 @@ async def admin_manual_credit_deposit(
             }
         }
     )
+    await bump_counters(db, total_volume_ton=amount_ton)
     
     # Update or create deposit record
     if existing:
@@ -6560,7 +6448,7 @@ async def apply_for_credit(data: CreditSystemRequest, current_user: User = Depen
     
     # Check existing active loans
     active_loans = await db.credits.count_documents({
-        "$or": [{"borrower_id": uid} for uid in ui["ids"]],
+        **await get_credits_query(ui),
         "status": {"$in": ["active", "overdue"]}
     })
     if active_loans >= 3:
@@ -6630,6 +6518,7 @@ async def apply_for_credit(data: CreditSystemRequest, current_user: User = Depen
         "id": str(uuid.uuid4()),
         "borrower_id": user.get("id", ""),
         "borrower_wallet": user.get("wallet_address", ""),
+        "owner_key": ui["key"],
         "lender_type": "bank" if is_bank else "government",
         "lender_id": lender_id,
         "lender_bank_id": data.lender_type if is_bank else None,
@@ -6680,11 +6569,8 @@ async def get_my_loans(current_user: User = Depends(get_current_user)):
     if not ui["user"]:
         return {"loans": [], "total_debt": 0}
     
-    or_conds = [{"borrower_id": uid} for uid in ui["ids"]]
-    or_conds.extend([{"borrower_wallet": uid} for uid in ui["ids"]])
-    
     loans = await db.credits.find(
-        {"$or": or_conds},
+        await get_credits_query(ui),
         {"_id": 0}
     ).sort("created_at", -1).to_list(50)
     
@@ -6975,9 +6861,7 @@ async def admin_get_user_details(user_id: str, admin: User = Depends(get_admin_u
     wallet = user.get("wallet_address", "")
     
     # Get businesses
-    biz_query = {"$or": [{"owner": uid}]}
-    if wallet:
-        biz_query["$or"].append({"owner": wallet})
+    biz_query = await owner_filter(db, uid, {wallet}, ("owner",))
     businesses = await db.businesses.find(biz_query, {"_id": 0}).to_list(50)
     
     total_biz_value = 0
@@ -6992,9 +6876,7 @@ async def admin_get_user_details(user_id: str, admin: User = Depends(get_admin_u
         total_biz_value += val
     
     # Get credits
-    credit_query = {"$or": [{"borrower_id": uid}]}
-    if wallet:
-        credit_query["$or"].append({"borrower_wallet": wallet})
+    credit_query = await owner_filter(db, uid, {wallet}, OWNER_FIELDS["credits"])
     credits = await db.credits.find(credit_query, {"_id": 0}).to_list(20)
     
     active_debt = sum(c.get("remaining", 0) for c in credits if c.get("status") in ["active", "overdue"])
@@ -7271,6 +7153,22 @@ async def websocket_chat_endpoint(websocket: WebSocket, token: str = None):
         return
     await chat_websocket_handler(websocket, token)
 
+@app.middleware("http")
+async def invalidate_cached_users(request: Request, call_next):
+    """Drop cached users a write request may have changed"""
+    response = await call_next(request)
+    if request.method not in SAFE_METHODS:
+        if request.url.path.startswith("/api/admin"):
+            user_cache.clear()
+        else:
+            auth = request.headers.get("authorization", "")
+            if auth[:7].lower() == "bearer ":
+                try:
+                    user_cache.invalidate(jwt.get_unverified_claims(auth[7:]).get("sub"))
+                except JWTError:
+                    pass
+    return response
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -7292,6 +7190,13 @@ async def startup_event():
     except Exception as e:
         logger.error(f"❌ Failed to initialize TON client: {e}")
     
+    # Create missing indexes before the scheduler starts querying
+    try:
+        await sync_indexes(db)
+        logger.info("✅ Database indexes synced")
+    except Exception as e:
+        logger.error(f"❌ Failed to sync database indexes: {e}")
+    
     # Initialize and start scheduler
     try:
         init_scheduler()
@@ -7328,11 +7233,18 @@ async def shutdown_db_client():
     
     # Shutdown scheduler
     try:
+        await release_scheduler_lease()
         shutdown_scheduler()
         logger.info("✅ Scheduler stopped")
     except Exception as e:
         logger.error(f"❌ Error stopping scheduler: {e}")
     
+    # Close Telegram HTTP pool
+    try:
+        await close_dispatcher()
+    except Exception as e:
+        logger.error(f"❌ Error closing Telegram dispatcher: {e}")
+    
     # Close MongoDB
     client.close()
     logger.info("✅ MongoDB connection closed")
@@ -0,0 +1,291 @@
+"""
+TON-City Telegram Dispatcher
+Delivers queued notifications through one pooled HTTP client.
+
+- Chat ids for a batch of notifications are resolved with one aggregation
+  (users + telegram_mappings), falling back to users.telegram_chat_id
+- Sends run with bounded concurrency under a global token bucket (~30 msg/s)
+  and a per-chat throttle (~1 msg/s), Telegram's documented limits
+- 429 responses pause the chat for `retry_after`, 5xx/network errors back off;
+  both are retried up to TELEGRAM_MAX_RETRIES
+- Results are acknowledged with one bulk_write by _id per batch
+
+TELEGRAM_API_BASE can point at benchmarks/fake_telegram.py for throughput tests.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+import httpx
+from pymongo import UpdateOne
+
+from db_indexes import ensure_indexes
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_BASE = os.environ.get('TELEGRAM_API_BASE', 'https://api.telegram.org')
+TELEGRAM_GLOBAL_RATE = float(os.environ.get('TELEGRAM_GLOBAL_RATE', '30'))
+TELEGRAM_CHAT_RATE = float(os.environ.get('TELEGRAM_CHAT_RATE', '1'))
+TELEGRAM_CONCURRENCY = int(os.environ.get('TELEGRAM_CONCURRENCY', '16'))
+TELEGRAM_MAX_RETRIES = int(os.environ.get('TELEGRAM_MAX_RETRIES', '3'))
+TELEGRAM_TIMEOUT_SECONDS = float(os.environ.get('TELEGRAM_TIMEOUT_SECONDS', '10'))
+
+# Notifications read, resolved and acknowledged together
+NOTIFICATION_BATCH_SIZE = int(os.environ.get('NOTIFICATION_BATCH_SIZE', '500'))
+# Upper bound per run; at 30 msg/s a 5 minute run delivers about 9000
+NOTIFICATION_MAX_PER_RUN = int(os.environ.get('NOTIFICATION_MAX_PER_RUN', '10000'))
+
+# Idle per-chat throttles are dropped beyond this many
+MAX_CHAT_THROTTLES = 10_000
+
+PENDING_NOTIFICATIONS = {"read": False, "telegram_sent": {"$ne": True}, "telegram_status": {"$exists": False}}
+
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `capacity`; acquire() waits for one"""
+
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ChatThrottle:
+    """
+    Serializes messages to one chat and spaces them 1/rate apart,
+    measured from the completion of the previous request, so the
+    gap holds on Telegram's side regardless of connection jitter.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def sent(self):
+        self.next_at = max(self.next_at, time.monotonic() + self.interval)
+
+    def pause(self, seconds: float):
+        """Honor a 429 retry_after"""
+        self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        return not self.lock.locked() and time.monotonic() >= self.next_at
+
+
+class TelegramDispatcher:
+    """Pooled, rate-limited sendMessage client"""
+
+    def __init__(self, api_base: str = TELEGRAM_API_BASE, global_rate: float = TELEGRAM_GLOBAL_RATE,
+                 chat_rate: float = TELEGRAM_CHAT_RATE, concurrency: int = TELEGRAM_CONCURRENCY,
+                 max_retries: int = TELEGRAM_MAX_RETRIES):
+        self.api_base = api_base.rstrip("/")
+        self.chat_rate = chat_rate
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self.global_bucket = TokenBucket(global_rate)
+        self.chats = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.stats = {"sent": 0, "failed": 0, "rate_limited": 0, "retries": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=TELEGRAM_TIMEOUT_SECONDS,
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+            )
+        return self._client
+
+    def _chat(self, chat_id) -> ChatThrottle:
+        throttle = self.chats.get(chat_id)
+        if throttle is None:
+            if len(self.chats) >= MAX_CHAT_THROTTLES:
+                self.chats = {k: t for k, t in self.chats.items() if not t.is_idle()}
+            throttle = self.chats[chat_id] = ChatThrottle(self.chat_rate)
+        return throttle
+
+    async def send(self, chat_id, text: str, parse_mode: str = "HTML") -> bool:
+        """Send one message, retrying 429/5xx; True when Telegram accepted it"""
+        bot_token = os.environ.get("TELEGRAM_BOT_TOKEN", "")
+        if not bot_token or not chat_id:
+            return False
+
+        url = f"{self.api_base}/bot{bot_token}/sendMessage"
+        payload = {"chat_id": chat_id, "text": text, "parse_mode": parse_mode}
+        throttle = self._chat(chat_id)
+
+        async with throttle.lock:
+            for attempt in range(self.max_retries + 1):
+                if attempt:
+                    self.stats["retries"] += 1
+                await throttle.wait()
+                try:
+                    async with self._semaphore:
+                        await self.global_bucket.acquire()
+                        response = await self.client.post(url, json=payload)
+                except httpx.HTTPError as e:
+                    logger.warning(f"Telegram send to {chat_id} failed: {e}")
+                    throttle.pause(min(2 ** attempt, 30))
+                    continue
+                finally:
+                    throttle.sent()
+
+                if response.status_code == 200:
+                    self.stats["sent"] += 1
+                    return True
+                if response.status_code == 429:
+                    self.stats["rate_limited"] += 1
+                    try:
+                        retry_after = float(response.json().get("parameters", {}).get("retry_after", 1))
+                    except ValueError:
+                        retry_after = 1.0
+                    throttle.pause(retry_after)
+                    continue
+                if response.status_code >= 500:
+                    throttle.pause(min(2 ** attempt, 30))
+                    continue
+
+                # 400/403: bad chat, bot blocked by the user - not retryable
+                logger.error(f"Failed to send Telegram message to {chat_id}: {response.status_code} {response.text[:200]}")
+                break
+
+        self.stats["failed"] += 1
+        return False
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_dispatcher: Optional[TelegramDispatcher] = None
+
+
+def get_dispatcher() -> TelegramDispatcher:
+    """Process-wide dispatcher, created on first use"""
+    global _dispatcher
+    if _dispatcher is None:
+        _dispatcher = TelegramDispatcher()
+    return _dispatcher
+
+
+async def close_dispatcher():
+    global _dispatcher
+    if _dispatcher is not None:
+        await _dispatcher.close()
+        _dispatcher = None
+
+
+# ==================== CHAT ID RESOLUTION ====================
+
+def chat_id_pipeline(user_keys: list) -> list:
+    """Users by id or wallet, joined to their telegram_mappings chat id"""
+    return [
+        {"$match": {"$or": [{"id": {"$in": user_keys}}, {"wallet_address": {"$in": user_keys}}]}},
+        {"$project": {"_id": 0, "id": 1, "wallet_address": 1, "telegram_username": 1, "telegram_chat_id": 1}},
+        {"$lookup": {"from": "telegram_mappings", "localField": "telegram_username", "foreignField": "username",
+                     "as": "mapping", "pipeline": [{"$project": {"_id": 0, "chat_id": 1}}]}},
+        {"$project": {
+            "id": 1,
+            "wallet_address": 1,
+            "chat_id": {"$ifNull": [{"$first": "$mapping.chat_id"}, "$telegram_chat_id"]},
+        }},
+        {"$match": {"chat_id": {"$nin": [None, ""]}}},
+    ]
+
+
+async def resolve_chat_ids(db, user_keys: list) -> dict:
+    """{user id or wallet: chat_id} for all keys in one round trip"""
+    keys = [k for k in set(user_keys) if k]
+    if not keys:
+        return {}
+    chat_ids = {}
+    async for user in db.users.aggregate(chat_id_pipeline(keys)):
+        for key in (user.get("id"), user.get("wallet_address")):
+            if key:
+                chat_ids.setdefault(key, user["chat_id"])
+    return chat_ids
+
+
+# ==================== PENDING NOTIFICATIONS ====================
+
+async def ensure_dispatch_indexes(db):
+    await ensure_indexes(db, "telegram_mappings", "notifications")
+
+
+async def dispatch_pending_notifications(db, dispatcher: TelegramDispatcher = None) -> dict:
+    """
+    Deliver unread notifications in _id order, one batch at a time.
+    Each notification ends up `sent`, `no_chat` (user has no linked Telegram)
+    or `failed`, so it is not picked up again.
+    """
+    dispatcher = dispatcher or get_dispatcher()
+    totals = {"sent": 0, "no_chat": 0, "failed": 0, "batches": 0}
+    if not os.environ.get("TELEGRAM_BOT_TOKEN", ""):
+        return totals
+
+    await ensure_dispatch_indexes(db)
+    last_id = None
+    processed = 0
+
+    while processed < NOTIFICATION_MAX_PER_RUN:
+        query = dict(PENDING_NOTIFICATIONS)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        limit = min(NOTIFICATION_BATCH_SIZE, NOTIFICATION_MAX_PER_RUN - processed)
+        batch = await db.notifications.find(
+            query, {"_id": 1, "user_id": 1, "message": 1}
+        ).sort("_id", 1).limit(limit).to_list(limit)
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        processed += len(batch)
+
+        chat_ids = await resolve_chat_ids(db, [n.get("user_id", "") for n in batch])
+
+        async def deliver(notif):
+            chat_id = chat_ids.get(notif.get("user_id", ""))
+            if not chat_id:
+                return "no_chat"
+            ok = await dispatcher.send(chat_id, f"🏙️ TON City\n\n{notif.get('message', '')}")
+            return "sent" if ok else "failed"
+
+        statuses = await asyncio.gather(*(deliver(n) for n in batch))
+
+        stamp = datetime.now(timezone.utc).isoformat()
+        ops = []
+        for notif, status in zip(batch, statuses):
+            fields = {"telegram_status": status}
+            if status == "sent":
+                fields.update(telegram_sent=True, telegram_sent_at=stamp)
+            ops.append(UpdateOne({"_id": notif["_id"]}, {"$set": fields}))
+            totals[status] += 1
+        await db.notifications.bulk_write(ops, ordered=False)
+        totals["batches"] += 1
+
+    if processed:
+        logger.info(f"📨 Telegram notifications: {totals}")
+    return totals
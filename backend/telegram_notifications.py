@@ -4,40 +4,24 @@ Sends notifications about business status, resources, etc.
 """
 
 import os
-import asyncio
 import logging
 from typing import Optional
-import httpx
 
-logger = logging.getLogger(__name__)
+from telegram_dispatcher import get_dispatcher
 
-TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
-TELEGRAM_API_URL = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}"
+logger = logging.getLogger(__name__)
 
 async def send_telegram_message(chat_id: str, text: str, parse_mode: str = "HTML") -> bool:
-    """Send a message via Telegram bot"""
-    if not TELEGRAM_BOT_TOKEN or not chat_id:
+    """Send a message via Telegram bot (pooled, rate-limited dispatcher)"""
+    if not os.environ.get("TELEGRAM_BOT_TOKEN", "") or not chat_id:
         logger.warning("Telegram bot token or chat_id not configured")
         return False
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{TELEGRAM_API_URL}/sendMessage",
-                json={
-                    "chat_id": chat_id,
-                    "text": text,
-                    "parse_mode": parse_mode
-                },
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                logger.info(f"Telegram message sent to {chat_id}")
-                return True
-            else:
-                logger.error(f"Failed to send Telegram message: {response.text}")
-                return False
+        if await get_dispatcher().send(chat_id, text, parse_mode):
+            logger.info(f"Telegram message sent to {chat_id}")
+            return True
+        return False
     except Exception as e:
         logger.error(f"Error sending Telegram message: {e}")
         return False
@@ -135,19 +119,3 @@ async def get_user_telegram_chat_id(db, user_id: str) -> Optional[str]:
 
 # Threshold for resource notification (100 units)
 RESOURCE_NOTIFICATION_THRESHOLD = 100
-
-# Track notified states to avoid spam
-_notified_states = {}
-
-def should_notify(user_id: str, notification_type: str, key: str = "") -> bool:
-    """Check if we should send notification (to avoid spam)"""
-    state_key = f"{user_id}:{notification_type}:{key}"
-    if state_key in _notified_states:
-        return False
-    _notified_states[state_key] = True
-    return True
-
-def clear_notification_state(user_id: str, notification_type: str, key: str = ""):
-    """Clear notification state when condition is resolved"""
-    state_key = f"{user_id}:{notification_type}:{key}"
-    _notified_states.pop(state_key, None)
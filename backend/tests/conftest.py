@@ -0,0 +1,199 @@
+"""
+Shared Motor fakes for the offline suites
+FakeDB hands out a FakeCollection per attribute; collections keep their
+documents in memory, apply the query operators the backend uses and record
+finds, updates and bulk_writes for assertions.
+"""
+import copy
+
+from pymongo import IndexModel, UpdateOne
+from pymongo.errors import BulkWriteError
+
+OPERATORS = {
+    "$in": lambda value, arg: value in arg,
+    "$nin": lambda value, arg: value not in arg,
+    "$ne": lambda value, arg: value != arg,
+    "$gt": lambda value, arg: value is not None and value > arg,
+    "$gte": lambda value, arg: value is not None and value >= arg,
+    "$lt": lambda value, arg: value is not None and value < arg,
+    "$lte": lambda value, arg: value is not None and value <= arg,
+}
+
+MISSING = object()
+
+
+def get_field(doc: dict, path: str):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+def matches(doc: dict, query: dict) -> bool:
+    for field, condition in (query or {}).items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+            continue
+        if field == "$and":
+            if not all(matches(doc, q) for q in condition):
+                return False
+            continue
+        value = get_field(doc, field)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, arg in condition.items():
+                if op == "$exists":
+                    if (value is not MISSING) != bool(arg):
+                        return False
+                elif not OPERATORS[op](None if value is MISSING else value, arg):
+                    return False
+        elif value is MISSING or value != condition:
+            return False
+    return True
+
+
+def project(doc: dict, projection: dict) -> dict:
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    included = {k for k, v in projection.items() if v and k != "_id"}
+    if included:
+        doc = {k: v for k, v in doc.items() if k in included or (k == "_id" and projection.get("_id", 1))}
+    else:
+        doc = {k: v for k, v in doc.items() if projection.get(k, 1)}
+    return doc
+
+
+def apply_update(doc: dict, update: dict):
+    for field, value in update.get("$set", {}).items():
+        doc[field] = value
+    for field, amount in update.get("$inc", {}).items():
+        doc[field] = doc.get(field, 0) + amount
+    for field in update.get("$unset", {}):
+        doc.pop(field, None)
+
+
+class FakeCursor:
+    def __init__(self, docs: list):
+        self.docs = docs
+
+    def sort(self, key, direction: int = 1):
+        keys = [(key, direction)] if isinstance(key, str) else list(key)
+        for field, order in reversed(keys):
+            self.docs.sort(key=lambda d: get_field(d, field), reverse=order < 0)
+        return self
+
+    def limit(self, n: int):
+        if n:
+            self.docs = self.docs[:n]
+        return self
+
+    def batch_size(self, n: int):
+        return self
+
+    async def to_list(self, length=None):
+        return self.docs[:length] if length else self.docs
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+
+class FakeCollection:
+    """One in-memory collection; `docs` is kept by reference, so tests can read back the documents they seeded"""
+
+    def __init__(self, docs=(), name: str = "collection"):
+        self.name = name
+        self.docs = docs if isinstance(docs, list) else list(docs)
+        self.indexes = {"_id_": {"name": "_id_", "key": {"_id": 1}}}
+        self.finds = []
+        self.reads = 0
+        self.updates = []
+        self.bulk_writes = []
+
+    def find(self, query=None, projection=None):
+        self.finds.append(query)
+        return FakeCursor([project(d, projection) for d in self.docs if matches(d, query)])
+
+    async def find_one(self, query=None, projection=None):
+        self.reads += 1
+        for doc in self.docs:
+            if matches(doc, query):
+                return project(doc, projection)
+        return None
+
+    async def update_one(self, query, update, upsert=False):
+        self.updates.append((query, update))
+        self._update(query, update, upsert)
+
+    def _update(self, query, update, upsert):
+        for doc in self.docs:
+            if matches(doc, query):
+                apply_update(doc, update)
+                return
+        if upsert:
+            doc = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            apply_update(doc, update)
+            self.docs.append(doc)
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+        for op in ops:
+            if isinstance(op, UpdateOne):
+                self._update(op._filter, op._doc, bool(op._upsert))
+
+    async def insert_many(self, docs, ordered=True):
+        """Inserts every document with a new _id; raises like Mongo for the duplicates"""
+        ids = {d.get("_id") for d in self.docs}
+        errors = []
+        for i, doc in enumerate(docs):
+            if doc.get("_id") in ids:
+                errors.append({"index": i, "code": 11000})
+                continue
+            ids.add(doc.get("_id"))
+            self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    async def delete_many(self, query):
+        self.docs[:] = [d for d in self.docs if not matches(d, query)]
+
+    async def count_documents(self, query):
+        return sum(1 for d in self.docs if matches(d, query))
+
+    async def estimated_document_count(self):
+        return len(self.docs)
+
+    async def list_indexes(self):
+        for ix in list(self.indexes.values()):
+            yield ix
+
+    async def create_indexes(self, models):
+        for model in models:
+            self.indexes[model.document["name"]] = dict(model.document)
+
+    async def create_index(self, keys, **kwargs):
+        await self.create_indexes([IndexModel(keys, **kwargs)])
+
+    async def drop_index(self, name):
+        del self.indexes[name]
+
+
+class FakeDB(dict):
+    """db.<name> / db["<name>"] is a FakeCollection, created empty on first use"""
+
+    def __init__(self, **collections):
+        super().__init__({name: FakeCollection(docs, name) for name, docs in collections.items()})
+
+    def __missing__(self, name):
+        self[name] = FakeCollection(name=name)
+        return self[name]
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return self[name]
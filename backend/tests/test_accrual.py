@@ -0,0 +1,103 @@
+"""
+Accrual Mode - Scheduling Tests
+Tests: rates and next state change stored by AccrualSchedule, exact spans
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+from background_tasks import (
+    AccrualSchedule, ACCRUAL_MAX_SPAN_HOURS, TickWriteBatch, process_businesses_loop, process_businesses_vector,
+)
+from business_config import get_consumption_breakdown, get_daily_wear
+
+NOW = datetime(2026, 3, 7, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def hours_until(iso: str) -> float:
+    return (datetime.fromisoformat(iso) - NOW).total_seconds() / 3600
+
+
+def schedule_for(business: dict, resources: dict = None) -> dict:
+    users = {business["owner"]: {"resources": resources or {}}}
+    fields = {"durability": business["durability"], "last_tick": NOW.isoformat(), "last_collection": NOW.isoformat()}
+    AccrualSchedule([business], users, NOW)(business["id"], fields)
+    return fields
+
+
+class TestAccrualSchedule:
+
+    def test_next_threshold_crossing(self):
+        business = {"id": "b1", "owner": "w1", "business_type": "helios", "level": 1, "durability": 51}
+        fields = schedule_for(business)
+        wear_rate = get_daily_wear("helios", 1) * 100 / 24.0
+        assert fields["wear_rate"] == pytest.approx(wear_rate, abs=1e-6)
+        assert hours_until(fields["next_state_change_at"]) == pytest.approx(1 / wear_rate + 1 / 60, abs=1e-4)
+
+    def test_collection_anchor_untouched(self):
+        business = {"id": "b1", "owner": "w1", "business_type": "helios", "level": 1, "durability": 100}
+        fields = schedule_for(business)
+        assert "last_collection" not in fields
+        assert fields["production_rate"] > 0
+
+    def test_stopped_business_not_scheduled(self):
+        business = {"id": "b1", "owner": "w1", "business_type": "helios", "level": 1, "durability": 0}
+        fields = schedule_for(business)
+        assert fields["next_state_change_at"] is None
+        assert fields["production_rate"] == 0
+
+    def test_input_starvation(self):
+        resource, daily = next(iter(get_consumption_breakdown("nano_dc", 1).items()))
+        business = {"id": "b1", "owner": "w1", "business_type": "nano_dc", "level": 1, "durability": 100}
+        fields = schedule_for(business, {resource: daily / 24.0})  # one hour of input
+        assert hours_until(fields["next_state_change_at"]) == pytest.approx(1.0, abs=1e-4)
+
+    def test_span_is_capped(self):
+        business = {"id": "b1", "owner": "w1", "business_type": "unknown", "level": 1, "durability": 100}
+        fields = schedule_for(business)
+        assert hours_until(fields["next_state_change_at"]) <= ACCRUAL_MAX_SPAN_HOURS
+
+
+def materialize(process, business: dict, user: dict, now: datetime):
+    """One accrual-mode pass, applied back to the documents like the bulk writes would"""
+    writes = TickWriteBatch(db=None, bulk=True, chunk_size=10 ** 9)
+    asyncio.run(process(None, [business], {business["owner"]: user}, {}, now, writes, exact=True))
+    for op in writes.business_ops:
+        business.update(op._doc["$set"])
+    for field, amount in writes.user_incs.get(business["owner"], {}).items():
+        resource = field.split(".", 1)[1]
+        user["resources"][resource] = user["resources"].get(resource, 0) + amount
+
+
+@pytest.mark.parametrize("process", [process_businesses_loop, process_businesses_vector])
+class TestExactSpans:
+    """Many short materializations add up to one span of the same length"""
+
+    def run(self, process, steps: int, hours: float = 2.0):
+        business = {"id": "b1", "owner": "w1", "business_type": "nano_dc", "level": 1,
+                    "durability": 100, "last_tick": NOW.isoformat()}
+        user = {"wallet_address": "w1", "resources": {"energy": 1000}}
+        for i in range(1, steps + 1):
+            materialize(process, business, user, NOW + timedelta(hours=hours * i / steps))
+        return business, user["resources"]
+
+    def test_short_spans_match_one_span(self, process):
+        one_business, one = self.run(process, 1)
+        many_business, many = self.run(process, 120)  # a read every minute
+        daily = get_consumption_breakdown("nano_dc", 1)["energy"]
+        assert one["energy"] == many["energy"] == 1000 - int(daily * 2 / 24)
+        assert many["cu"] == pytest.approx(one["cu"], rel=1e-5)
+        assert many_business["durability"] == pytest.approx(one_business["durability"], abs=1e-4)
+        assert many_business["durability"] < 100
+
+    def test_no_floor_on_short_spans(self, process):
+        _, one = self.run(process, 1, hours=0.05)
+        _, many = self.run(process, 5, hours=0.05)
+        assert many["cu"] == pytest.approx(one["cu"], rel=1e-5)
+
+    def test_fraction_carried(self, process):
+        business, resources = self.run(process, 1, hours=1.0)
+        daily = get_consumption_breakdown("nano_dc", 1)["energy"]
+        assert business["consumption_carry"]["energy"] == pytest.approx(daily / 24 - int(daily / 24), abs=1e-9)
+        assert resources["energy"] == 1000 - int(daily / 24)
@@ -0,0 +1,42 @@
+"""
+City List - Silhouette and Count Pipeline Tests
+Tests: RLE silhouettes round-trip and stay small, one grouped count per city
+"""
+from city_generator import generate_archipelago_shape
+from city_list import city_counts_pipeline, city_list_entry, compact_silhouette, expand_silhouette
+
+
+class TestSilhouette:
+
+    def test_small_grid_round_trips(self):
+        grid = generate_archipelago_shape(300, 3)
+        silhouette = compact_silhouette(grid)
+        assert expand_silhouette(silhouette) == grid
+        assert sum(silhouette["rle"]) == len(grid) * len(grid[0])
+
+    def test_large_grid_is_downsampled(self):
+        grid = [[1 if (x - 100) ** 2 + (y - 100) ** 2 < 90 ** 2 else 0 for x in range(200)] for y in range(200)]
+        silhouette = compact_silhouette(grid, max_side=40)
+        assert (silhouette["w"], silhouette["h"]) == (40, 40)
+        preview = expand_silhouette(silhouette)
+        assert preview[20][20] == 1 and preview[0][0] == 0
+
+    def test_empty_grid(self):
+        assert compact_silhouette([]) == {"w": 0, "h": 0, "rle": [0]}
+
+
+class TestCityCounts:
+
+    def test_one_union_group(self):
+        pipeline = city_counts_pipeline(["a", "b"])
+        assert pipeline[0]["$match"]["city_id"] == {"$in": ["a", "b"]}
+        assert pipeline[2]["$unionWith"]["coll"] == "businesses"
+        assert pipeline[-1]["$group"]["_id"] == "$_id"
+
+    def test_entry_uses_counts_and_drops_grid(self):
+        city = {"id": "a", "name": {"en": "A"}, "style": "neon", "base_price": 5.0,
+                "grid": [[0, 1], [1, 1]], "stats": {"total_plots": 3}}
+        entry = city_list_entry(city, {"owned_plots": 2, "total_businesses": 1})
+        assert "grid" not in entry and "grid_preview" not in entry
+        assert entry["name"] == "A"
+        assert entry["stats"]["owned_plots"] == 2 and entry["stats"]["total_businesses"] == 1
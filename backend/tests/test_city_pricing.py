@@ -0,0 +1,37 @@
+"""
+City Pricing - Price Grid Tests
+Tests: grid matches the per-cell scan, recompute only on pricing input changes
+"""
+from city_generator import (
+    calculate_plot_price_in_city, compute_plot_price, ensure_price_grid, generate_crescent_shape,
+)
+
+
+def make_city(grid=None) -> dict:
+    return {"id": "c1", "grid": grid or generate_crescent_shape(200), "base_price": 8.0, "price_multiplier": 1.0}
+
+
+class TestPriceGrid:
+
+    def test_matches_per_cell_scan(self):
+        city = make_city()
+        ensure_price_grid(city)
+        grid = city["grid"]
+        for y in range(len(grid)):
+            for x in range(len(grid[0])):
+                assert city["price_grid"][y][x] == compute_plot_price(city, x, y)
+
+    def test_recomputed_only_when_inputs_change(self):
+        city = make_city()
+        assert ensure_price_grid(city)
+        assert ensure_price_grid(city) == {}
+
+        city["price_multiplier"] = 2.0
+        assert ensure_price_grid(city)
+        assert calculate_plot_price_in_city(city, 5, 5) == compute_plot_price(city, 5, 5)
+
+    def test_city_without_land_uses_base_price(self):
+        city = make_city([[0, 0], [0, 0]])
+        ensure_price_grid(city)
+        assert city["center_of_mass"] is None
+        assert calculate_plot_price_in_city(city, 1, 1) == 8.0
@@ -0,0 +1,85 @@
+"""
+Credit Processing - Page Planning Tests
+Tests: payments against shared borrower balance, overdue transition, seizure writes
+"""
+from datetime import datetime, timezone, timedelta
+
+from background_tasks import CreditPlan
+
+NOW = datetime(2026, 3, 7, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def days_ago(days: int) -> str:
+    return (NOW - timedelta(days=days)).isoformat()
+
+
+def make_credit(credit_id: str, **fields) -> dict:
+    credit = {
+        "id": credit_id, "borrower_id": "u1", "borrower_wallet": "0:u1",
+        "lender_type": "government", "lender_id": "government",
+        "remaining": 100.0, "paid": 0.0, "status": "active", "created_at": days_ago(1),
+    }
+    credit.update(fields)
+    return credit
+
+
+def plan_page(credits: list, borrower: dict, lender: dict = None, businesses: dict = None, plots: dict = None) -> CreditPlan:
+    users = [u for u in (borrower, lender) if u]
+    by_id = {u["id"]: u for u in users}
+    by_wallet = {u["wallet_address"]: u for u in users}
+    plan = CreditPlan(NOW)
+    for credit in credits:
+        plan.add_credit(credit, by_id, by_wallet, businesses or {}, plots or {})
+    return plan
+
+
+class TestCreditPlan:
+
+    def test_payments_share_borrower_balance(self):
+        borrower = {"_id": 1, "id": "u1", "wallet_address": "0:u1", "balance_ton": 1.5,
+                    "total_income": 100.0, "created_at": days_ago(10)}
+        lender = {"_id": 2, "id": "bank-1", "wallet_address": "0:bank1", "balance_ton": 0.0}
+        credits = [make_credit("c1", lender_type="bank", lender_id="bank-1"), make_credit("c2")]
+        plan = plan_page(credits, borrower, lender)
+
+        # Daily payment is 1.0 each; the second credit only gets what is left
+        assert plan.credit_sets["c1"]["paid"] == 1.0
+        assert plan.credit_sets["c2"]["paid"] == 0.5
+        assert plan.user_incs == {1: -1.5, 2: 1.0}
+        assert borrower["balance_ton"] == 0
+
+    def test_overdue_doubles_rate(self):
+        borrower = {"_id": 1, "id": "u1", "wallet_address": "0:u1", "balance_ton": 0.0,
+                    "total_income": 100.0, "created_at": days_ago(10)}
+        plan = plan_page([make_credit("c1", created_at=days_ago(5))], borrower)
+
+        assert plan.credit_sets["c1"]["status"] == "overdue"
+        assert plan.credit_sets["c1"]["is_doubled_rate"] is True
+        assert [n["type"] for n in plan.notifications] == ["credit_overdue"]
+
+    def test_government_seizure_lists_plot(self):
+        borrower = {"_id": 1, "id": "u1", "wallet_address": "0:u1", "balance_ton": 0.0,
+                    "total_income": 0.0, "created_at": days_ago(30)}
+        credit = make_credit("c1", status="overdue", is_doubled_rate=True, overdue_since=days_ago(8),
+                             collateral_business_id="b1", collateral_value=50.0)
+        businesses = {"b1": {"id": "b1", "type": "helios", "plot_id": "p1"}}
+        plots = {"p1": {"id": "p1", "x": 3, "y": 4}}
+        plan = plan_page([credit], borrower, businesses=businesses, plots=plots)
+
+        assert plan.credit_sets["c1"]["status"] == "seized"
+        assert plan.business_sets["b1"]["owner"] == "government"
+        assert plan.business_sets["b1"]["sale_price"] == 40.0
+        assert plan.plot_sets["p1"]["owner"] == "government"
+        assert len(plan.listings) == 1 and plan.listings[0]["price"] == 40.0
+        assert plan.stats["seized"] == 1
+
+    def test_bank_seizure_keys_business_to_lender(self):
+        borrower = {"_id": 1, "id": "u1", "wallet_address": "0:u1", "balance_ton": 0.0,
+                    "total_income": 0.0, "created_at": days_ago(30)}
+        lender = {"_id": 2, "id": "bank-1", "wallet_address": "0:bank1", "balance_ton": 0.0}
+        credit = make_credit("c1", lender_type="bank", lender_id="0:bank1", status="overdue",
+                             is_doubled_rate=True, overdue_since=days_ago(8), collateral_business_id="b1")
+        plan = plan_page([credit], borrower, lender, businesses={"b1": {"id": "b1", "type": "helios"}})
+
+        assert plan.business_sets["b1"]["owner"] == "0:bank1"
+        assert plan.business_sets["b1"]["owner_key"] == "bank-1"
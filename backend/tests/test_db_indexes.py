@@ -0,0 +1,119 @@
+"""
+Database Indexes - Declaration, Sync and Query Plan Tests
+Tests: module helpers agree with INDEXES, sync is idempotent and reports
+conflicts, hot queries don't COLLSCAN (needs a reachable MONGO_URL)
+"""
+import asyncio
+import os
+import uuid
+
+import pytest
+
+import background_tasks
+import city_list
+import db_indexes
+import economy_snapshots
+import island_map
+import leaderboard
+import notification_outbox
+import telegram_dispatcher
+from conftest import FakeDB
+from db_indexes import INDEXES, _same_index, check_query_plans, sync_indexes
+from scheduler_lock import SchedulerLease
+
+
+class TestDeclarations:
+
+    def test_names_unique_per_collection(self):
+        for collection, models in INDEXES.items():
+            names = [m.document["name"] for m in models]
+            assert len(names) == len(set(names)), collection
+
+    def test_coordinate_indexes_are_unique_and_partial(self):
+        plots = {m.document["name"]: m.document for m in INDEXES["plots"]}
+        for name in ("island_id_1_x_1_y_1", "city_id_1_x_1_y_1"):
+            assert plots[name]["unique"] is True
+            assert "partialFilterExpression" in plots[name]
+
+    def test_module_helpers_create_declared_indexes(self):
+        db = FakeDB()
+        db_indexes._ensured.clear()
+        for ensure in [
+            background_tasks.ensure_tick_indexes,
+            city_list.ensure_city_list_indexes,
+            island_map.ensure_map_indexes,
+            leaderboard.ensure_leaderboard_indexes,
+            notification_outbox.ensure_outbox_indexes,
+            economy_snapshots.ensure_snapshot_indexes,
+            telegram_dispatcher.ensure_dispatch_indexes,
+            lambda db: SchedulerLease(db).ensure_indexes(),
+        ]:
+            asyncio.run(ensure(db))
+
+        assert "scheduler_leases" in db and "accrual_claims" in db
+        for collection, coll in db.items():
+            declared = {m.document["name"]: m.document for m in INDEXES[collection]}
+            assert coll.indexes.keys() - {"_id_"} == declared.keys(), collection
+            for name, spec in declared.items():
+                assert _same_index(spec, coll.indexes[name]), f"{collection}.{name} differs"
+
+    def test_helpers_skip_collections_synced_at_startup(self):
+        db = FakeDB()
+        asyncio.run(sync_indexes(db))
+        del db.leaderboard.indexes["rebuilt_at_1"]
+        asyncio.run(leaderboard.ensure_leaderboard_indexes(db))
+        assert "rebuilt_at_1" not in db.leaderboard.indexes
+
+
+class TestSync:
+
+    def test_creates_missing_then_idempotent(self):
+        db = FakeDB()
+        first = asyncio.run(sync_indexes(db))
+        assert len(first["created"]) == sum(len(models) for models in INDEXES.values())
+        second = asyncio.run(sync_indexes(db))
+        assert second["created"] == [] and second["ok"] == len(first["created"])
+
+    def test_conflict_reported_then_rebuilt(self):
+        db = FakeDB()
+        asyncio.run(db.plots.create_index([("island_id", 1), ("x", 1), ("y", 1)]))
+        report = asyncio.run(sync_indexes(db))
+        assert report["conflicts"] == ["plots.island_id_1_x_1_y_1"]
+        assert "unique" not in db.plots.indexes["island_id_1_x_1_y_1"]
+
+        report = asyncio.run(sync_indexes(db, rebuild=True))
+        assert report["dropped"] == ["plots.island_id_1_x_1_y_1"]
+        assert db.plots.indexes["island_id_1_x_1_y_1"]["unique"] is True
+
+    def test_drop_unknown(self):
+        db = FakeDB()
+        asyncio.run(db.users.create_index("legacy_field"))
+        report = asyncio.run(sync_indexes(db, drop_unknown=True))
+        assert "users.legacy_field_1" in report["dropped"]
+        assert "_id_" in db.users.indexes
+
+
+def test_hot_queries_use_indexes():
+    motor_asyncio = pytest.importorskip("motor.motor_asyncio")
+    url = os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+
+    async def run():
+        # One event loop for the whole client lifetime
+        client = motor_asyncio.AsyncIOMotorClient(url, serverSelectionTimeoutMS=1000)
+        try:
+            await client.admin.command("ping")
+        except Exception:
+            client.close()
+            return None
+        db = client[f"ton_city_index_test_{uuid.uuid4().hex[:8]}"]
+        try:
+            await sync_indexes(db)
+            return await check_query_plans(db)
+        finally:
+            await client.drop_database(db.name)
+            client.close()
+
+    collscans = asyncio.run(run())
+    if collscans is None:
+        pytest.skip(f"MongoDB not reachable at {url}")
+    assert collscans == []
@@ -0,0 +1,58 @@
+"""
+Economic Snapshots - Rollup Tests
+Tests: bucket alignment, per-resolution upserts and retention, range queries
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+from conftest import FakeDB
+from economy_snapshots import bucket_start, query_snapshots, rollup_updates, ROLLUP_RESOLUTIONS
+
+NOW = datetime(2026, 3, 7, 12, 34, 56, tzinfo=timezone.utc)
+
+SNAPSHOT = {
+    "businesses_processed": 10,
+    "total_tax_collected": 1.5,
+    "inflation_factor": 1.02,
+    "total_production": {"energy": 4.0},
+    "market_prices": {"energy": 0.1},
+}
+
+
+class TestRollups:
+
+    def test_bucket_alignment(self):
+        assert bucket_start(NOW, 300) == datetime(2026, 3, 7, 12, 30, tzinfo=timezone.utc)
+        assert bucket_start(NOW, 3600) == datetime(2026, 3, 7, 12, 0, tzinfo=timezone.utc)
+        assert bucket_start(NOW, 86400) == datetime(2026, 3, 7, tzinfo=timezone.utc)
+
+    def test_one_upsert_per_resolution(self):
+        ops = rollup_updates(SNAPSHOT, NOW)
+        assert [op._filter["_id"] for op in ops] == [
+            "5m:2026-03-07T12:30:00+00:00", "1h:2026-03-07T12:00:00+00:00", "1d:2026-03-07T00:00:00+00:00",
+        ]
+        assert all(op._upsert for op in ops)
+        inc = ops[0]._doc["$inc"]
+        assert inc["ticks"] == 1 and inc["businesses_processed"] == 10
+        assert inc["total_production.energy"] == 4.0 and inc["inflation_sum"] == 1.02
+        assert ops[0]._doc["$set"]["market_prices"] == {"energy": 0.1}
+
+    def test_retention_per_resolution(self):
+        ops = {op._doc["$setOnInsert"]["resolution"]: op._doc["$set"] for op in rollup_updates(SNAPSHOT, NOW)}
+        days_5m = ROLLUP_RESOLUTIONS["5m"][1]
+        assert ops["5m"]["expires_at"] == datetime(2026, 3, 7, 12, 35, tzinfo=timezone.utc) + timedelta(days=days_5m)
+        assert "expires_at" not in ops["1d"]
+
+
+class TestQuery:
+
+    def test_raw_range_normalized_to_utc(self):
+        db = FakeDB()
+        asyncio.run(query_snapshots(db, "raw", start="2026-03-07T15:00:00+03:00", end="2026-03-07T08:00:00-05:00"))
+        assert db.economic_snapshots.finds[0]["timestamp"] == {
+            "$gte": "2026-03-07T12:00:00+00:00", "$lte": "2026-03-07T13:00:00+00:00",
+        }
+
+    def test_naive_timestamps_are_utc(self):
+        db = FakeDB()
+        asyncio.run(query_snapshots(db, "raw", start="2026-03-07T12:00:00"))
+        assert db.economic_snapshots.finds[0]["timestamp"] == {"$gte": "2026-03-07T12:00:00+00:00"}
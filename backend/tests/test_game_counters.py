@@ -0,0 +1,40 @@
+"""
+Game Counters - /stats Read Path Tests
+Tests: stats come from the counters document, cached until a bump invalidates them
+"""
+import asyncio
+
+import game_counters
+from conftest import FakeDB
+
+
+def fake_db():
+    counters = {"_id": "global", "reconciled_at": "t", "owned_plots": 40, "total_businesses": 7,
+                "total_players": 12, "total_volume_ton": 123.456, "island_cells": 528}
+    return FakeDB(game_counters=[counters], admin_stats=[{"type": "treasury", "total_tax": 1.0}])
+
+
+class TestReadGameStats:
+
+    def setup_method(self):
+        game_counters.invalidate_stats()
+
+    def test_payload_from_counters(self):
+        stats = asyncio.run(game_counters.read_game_stats(fake_db()))
+        assert stats["owned_plots"] == 40 and stats["available_plots"] == 10000 - 40
+        assert stats["total_volume_ton"] == 123.46
+        assert stats["treasury"] == {"type": "treasury", "total_tax": 1.0}
+
+    def test_cached_until_bumped(self):
+        db = fake_db()
+
+        async def run():
+            await game_counters.read_game_stats(db)
+            await game_counters.read_game_stats(db)
+            reads = db.game_counters.reads
+            await game_counters.bump_counters(db, total_businesses=1)
+            return reads, await game_counters.read_game_stats(db)
+
+        reads, stats = asyncio.run(run())
+        assert reads == 1
+        assert stats["total_businesses"] == 8
@@ -0,0 +1,77 @@
+"""
+Income Collection - Collect-All Batching Tests
+Tests: one businesses and one users bulk_write, patron fees summed per patron owner
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+import pytest
+
+from conftest import FakeDB
+from income_collection import CollectionPlan, load_patrons, plan_business_collection
+
+NOW = datetime.now(timezone.utc)
+
+
+def business(business_id: str, patron_id: str = None) -> dict:
+    return {"id": business_id, "owner": "u1", "business_type": "nano_dc", "level": 1, "durability": 100,
+            "patron_id": patron_id, "last_collection": (NOW - timedelta(hours=10)).isoformat()}
+
+
+def collect_all(businesses: list, patrons: list) -> FakeDB:
+    db = FakeDB(businesses=patrons, users=[])
+
+    async def run():
+        plan = CollectionPlan(NOW)
+        totals = plan_business_collection(plan, businesses, await load_patrons(db, businesses))
+        plan.pay(totals["collected"], "u1", "EQcollector", income=True)
+        await plan.commit(db)
+        return totals
+
+    db.totals = asyncio.run(run())
+    return db
+
+
+class TestCollectAll:
+
+    def test_one_bulk_write_per_collection(self):
+        db = collect_all([business(f"b{i}") for i in range(5)], [])
+        assert db.totals["count"] == 5
+        assert len(db.businesses.bulk_writes) == 1 and len(db.businesses.bulk_writes[0]) == 5
+        assert len(db.users.bulk_writes) == 1
+        [collector] = db.users.bulk_writes[0]
+        assert collector._doc["$inc"]["balance_ton"] == collector._doc["$inc"]["total_income"] == db.totals["collected"]
+
+    def test_patron_fees_summed_per_owner(self):
+        patrons = [
+            {"id": "bank", "owner": "patron-user-id"},   # patron owner stored as a user id
+            {"id": "bank2", "owner": "patron-user-id"},
+            {"id": "dex", "owner": "EQpatron"},          # and as a wallet
+        ]
+        businesses = [business("b1", "bank"), business("b2", "bank2"), business("b3", "dex"), business("b4")]
+        db = collect_all(businesses, patrons)
+
+        assert len(db.businesses.finds) == 1
+        [ops] = db.users.bulk_writes
+        updates = {tuple(op._filter["$or"][0]["id"]["$in"]): op for op in ops}
+        assert len(ops) == 3  # two patron owners and the collector
+        fee = db.totals["patron"] / 3
+        assert updates[("patron-user-id",)]._doc["$inc"] == {"balance_ton": pytest.approx(fee * 2)}
+        assert updates[("EQpatron",)]._doc["$inc"] == {"balance_ton": pytest.approx(fee)}
+        # Either identifier field may hold the patron owner
+        assert updates[("patron-user-id",)]._filter == {"$or": [
+            {"id": {"$in": ["patron-user-id"]}}, {"wallet_address": {"$in": ["patron-user-id"]}},
+        ]}
+
+    def test_nothing_to_collect_writes_nothing(self):
+        db = collect_all([{**business("b1"), "durability": 0}], [])
+        assert db.businesses.bulk_writes == [] and db.users.bulk_writes == []
+
+    def test_collect_with_increment(self):
+        plan = CollectionPlan(NOW)
+        plan.collect("b1", {"xp": 12})
+        plan.pay(1.5, "EQw", income=True)
+        plan.pay(0.5, "EQw", income=True)
+        [op] = plan.business_ops
+        assert op._doc == {"$set": {"last_collection": NOW.isoformat()}, "$inc": {"xp": 12}}
+        assert plan.user_incs == {("EQw",): {"balance_ton": 2.0, "total_income": 2.0}}
+        assert plan.paid() == ["EQw"]
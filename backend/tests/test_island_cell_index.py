@@ -0,0 +1,38 @@
+"""
+TON Island - Cell Index Tests
+Tests: indexed lookups match a linear scan, neighbor table, islands stored before the index
+"""
+import pytest
+
+import ton_island
+from ton_island import NEIGHBOR_OFFSETS, generate_ton_island_map, get_cell_at, get_neighbors
+
+
+def scan(island: dict, x: int, y: int):
+    return next((c for c in island["cells"] if c["x"] == x and c["y"] == y), None)
+
+
+@pytest.fixture
+def island():
+    ton_island._island_indexes.clear()
+    return generate_ton_island_map()
+
+
+class TestCellIndex:
+
+    def test_lookup_matches_scan(self, island):
+        for y in range(-1, island["height"] + 1):
+            for x in range(-1, island["width"] + 1):
+                assert get_cell_at(island, x, y) is scan(island, x, y)
+
+    def test_neighbors_match_scan(self, island):
+        for cell in island["cells"][::7]:
+            x, y = cell["x"], cell["y"]
+            expected = [scan(island, x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS]
+            assert get_neighbors(island, x, y) == [c for c in expected if c]
+
+    def test_island_stored_without_index(self, island):
+        legacy = {k: v for k, v in island.items() if k not in ton_island.INDEX_FIELDS}
+        cell = island["cells"][100]
+        assert get_cell_at(legacy, cell["x"], cell["y"]) is legacy["cells"][100]
+        assert get_neighbors(legacy, cell["x"], cell["y"]) == get_neighbors(island, cell["x"], cell["y"])
@@ -0,0 +1,51 @@
+"""
+Island Map Cache - Cell Merge Tests
+Tests: island cell filtering, per-cell refresh resets stale owners, ETag per version
+"""
+from island_map import IslandMapCache, island_cells
+
+
+def cache_with_cells(n: int = 3) -> IslandMapCache:
+    cache = IslandMapCache()
+    cells = [{"x": i, "y": 0, "zone": "outer", "owner": None, "business": None} for i in range(n)]
+    cache.island = {"id": "ton_island", "cells": [dict(c) for c in cells]}
+    cache.base_cells = {(c["x"], c["y"]): c for c in cells}
+    cache.positions = {(c["x"], c["y"]): i for i, c in enumerate(cells)}
+    return cache
+
+
+class TestIslandCells:
+
+    def test_only_island_docs_with_coords(self):
+        docs = [
+            {"island_id": "ton_island", "x": 1, "y": 2},
+            {"city_id": "c1", "x": 3, "y": 4},
+            {"island_id": "ton_island", "x": None, "y": 2},
+            None,
+        ]
+        assert island_cells(*docs) == [(1, 2)]
+
+
+class TestIslandMapCache:
+
+    def test_refreshed_cell_drops_stale_owner(self):
+        cache = cache_with_cells()
+        plots = {(1, 0): {"owner": "u1", "owner_username": "bob"}}
+        businesses = {(1, 0): {"id": "b1", "business_type": "farm", "level": 2}}
+        cache._apply([(1, 0)], plots, businesses, {"u1": "a.png"})
+        cache._finish(1)
+        assert cache.island["cells"][1]["owner_avatar"] == "a.png"
+        assert cache.island["cells"][1]["business"]["level"] == 2
+        assert cache.island["stats"]["owned_cells"] == 1
+
+        cache._apply([(1, 0), (99, 99)], {}, {}, {})
+        cache._finish(2)
+        assert cache.island["cells"][1]["owner"] is None
+        assert cache.island["cells"][1]["business"] is None
+        assert cache.island["stats"] == {"total_cells": 3, "owned_cells": 0, "available_cells": 3, "businesses": 0}
+
+    def test_etag_and_payload_follow_version(self):
+        cache = cache_with_cells()
+        cache._finish(7)
+        assert cache.etag == 'W/"island-7"'
+        assert b'"version": 7' in cache.payload
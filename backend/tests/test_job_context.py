@@ -0,0 +1,92 @@
+"""
+Job Context - Step Timer and Scheduler Event Tests
+Tests: per-span DB round trips, scheduler lag/coalesce metrics, adaptive tick interval
+"""
+import asyncio
+import contextvars
+from types import SimpleNamespace
+
+import background_tasks
+import job_context
+from job_context import StepTimer, record_scheduler_event, get_job_metric
+
+
+def send_command(name: str = "find"):
+    job_context._JobCommandListener().started(SimpleNamespace(command_name=name))
+
+
+class TestStepTimer:
+
+    def test_round_trips_per_span(self):
+        timer = StepTimer()
+        with timer.span("load"):
+            send_command()
+            send_command()
+        with timer.span("snapshot"):
+            send_command("insert")
+        with timer.span("load"):
+            send_command()
+        send_command()  # outside any span
+
+        assert timer.spans["load"]["db_round_trips"] == 3
+        assert timer.spans["load"]["calls"] == 2
+        assert timer.spans["snapshot"]["db_round_trips"] == 1
+        assert timer.total_ms >= 0
+
+    def test_counts_commands_from_executor_threads(self):
+        async def run():
+            timer = StepTimer()
+            with timer.span("business_writes"):
+                loop = asyncio.get_running_loop()
+                ctx = contextvars.copy_context()
+                await loop.run_in_executor(None, ctx.run, send_command)
+            return timer.spans["business_writes"]["db_round_trips"]
+
+        assert asyncio.run(run()) == 1
+
+
+class TestSchedulerEvents:
+
+    def test_lag_and_coalesced_runs(self):
+        record_scheduler_event("test_job", coalesced=2, lag_s=1.5)
+        record_scheduler_event("test_job", missed=1, lag_s=0.25)
+        assert get_job_metric("test_job", "coalesced") == 2
+        assert get_job_metric("test_job", "missed") == 1
+        assert get_job_metric("test_job", "last_lag_s") == 0.25
+        assert get_job_metric("test_job", "max_lag_s") == 1.5
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.rescheduled = []
+
+    def reschedule_job(self, job_id, trigger):
+        self.rescheduled.append(trigger.interval.total_seconds())
+
+
+class TestAdaptiveInterval:
+
+    def run_with_duration(self, monkeypatch, duration: float, interval: int):
+        fake = FakeScheduler()
+        monkeypatch.setattr(background_tasks, "scheduler", fake)
+        monkeypatch.setattr(background_tasks, "tick_interval_seconds", interval)
+        monkeypatch.setitem(job_context.job_metrics, "economic_tick",
+                            {**job_context._new_job_metrics(), "last_duration_s": duration})
+        background_tasks.adapt_tick_interval()
+        return fake.rescheduled, background_tasks.tick_interval_seconds
+
+    def test_stretches_after_overrun(self, monkeypatch):
+        rescheduled, interval = self.run_with_duration(monkeypatch, 90, 60)
+        assert interval == 113 and rescheduled == [113]
+
+    def test_capped_at_max(self, monkeypatch):
+        _, interval = self.run_with_duration(monkeypatch, 10_000, 60)
+        assert interval == background_tasks.TICK_MAX_INTERVAL_SECONDS
+
+    def test_steps_back_when_fast(self, monkeypatch):
+        rescheduled, interval = self.run_with_duration(monkeypatch, 5, 240)
+        assert interval == 120 and rescheduled == [120]
+
+    def test_within_budget_unchanged(self, monkeypatch):
+        rescheduled, interval = self.run_with_duration(monkeypatch, 30, 60)
+        assert interval == 60 and rescheduled == []
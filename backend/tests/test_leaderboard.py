@@ -0,0 +1,53 @@
+"""
+Leaderboard - Row Tests
+Tests: rows carry the fields LeaderboardPage reads, top players ranked per sort key
+"""
+import asyncio
+
+from conftest import FakeDB
+from leaderboard import SORT_KEYS, leaderboard_pipeline, top_players
+
+# Fields of a leaderboard row read by frontend/src/pages/LeaderboardPage.jsx
+FRONTEND_FIELDS = {"id", "username", "balance_ton", "total_income", "businesses_count", "plots_count"}
+
+
+def row_fields(pipeline: list) -> set:
+    """Top-level fields of the documents the pipeline $merges"""
+    fields = set()
+    for stage in pipeline:
+        if "$project" in stage:
+            fields = {k for k, v in stage["$project"].items() if v != 0}
+        elif "$lookup" in stage:
+            fields.add(stage["$lookup"]["as"])
+        elif "$set" in stage:
+            fields |= set(stage["$set"])
+        elif "$unset" in stage:
+            fields -= set(stage["$unset"])
+        elif "$setWindowFields" in stage:
+            fields |= set(stage["$setWindowFields"]["output"])
+    return fields
+
+
+class TestLeaderboardRows:
+
+    def test_rows_have_frontend_fields(self):
+        fields = row_fields(leaderboard_pipeline("stamp"))
+        assert FRONTEND_FIELDS <= fields
+        assert {rank for _, rank in SORT_KEYS.values()} <= fields
+        assert not {"id_key", "wallet_key", "biz_by_id", "plots_by_wallet"} & fields
+
+    def test_id_is_the_user_id(self):
+        project = leaderboard_pipeline("stamp")[0]["$project"]
+        assert project["id"] in (1, "$id")
+
+    def test_top_players_ranked_by_sort_key(self):
+        rows = [
+            {"_id": "u1", "id": "u1", "username": "a", "balance_ton": 5, "plots_count": 1,
+             "rank_balance": 2, "rank_plots": 1, "rebuilt_at": "t"},
+            {"_id": "u2", "id": "u2", "username": "b", "balance_ton": 9, "plots_count": 0,
+             "rank_balance": 1, "rank_plots": 2, "rebuilt_at": "t"},
+        ]
+        db = FakeDB(leaderboard=rows)
+        players = asyncio.run(top_players(db, "plots", limit=10))
+        assert [(p["id"], p["rank"]) for p in players] == [("u1", 1), ("u2", 2)]
+        assert all("rebuilt_at" not in p for p in players)
@@ -0,0 +1,116 @@
+"""
+Notification Outbox - Delivery Tests
+Tests: dedupe across batches, clears applied in _id order, failed sends retried,
+claimed keys released when a batch fails
+"""
+import asyncio
+
+import pytest
+
+import notification_outbox
+from conftest import FakeDB
+
+
+def alert(_id, level="low", business_id="b1"):
+    return {"_id": _id, "kind": "durability_alert", "level": level, "owner": "u1",
+            "business_id": business_id, "business_type": "helios", "durability": 40, "status": "pending"}
+
+
+def clear(_id, levels=("low", "critical"), business_id="b1"):
+    return {"_id": _id, "kind": "durability_clear", "levels": list(levels), "owner": "u1",
+            "business_id": business_id, "status": "pending"}
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    delivered = []
+
+    async def send(chat_id, name, durability):
+        delivered.append(chat_id)
+        return chat_id != "broken"
+
+    async def chat_ids(db, owners):
+        return {owner: "chat" for owner in owners}
+
+    async def no_indexes(db):
+        pass
+
+    monkeypatch.setattr(notification_outbox, "ensure_outbox_indexes", no_indexes)
+    monkeypatch.setattr(notification_outbox, "resolve_chat_ids", chat_ids)
+    monkeypatch.setattr(notification_outbox, "ALERT_SENDERS", {"low": send, "critical": send, "stopped": send})
+    return delivered
+
+
+def dedupe_keys(db) -> set:
+    return {doc["_id"] for doc in db.notification_dedupe.docs}
+
+
+def run(events, dedupe=()):
+    db = FakeDB(notification_outbox=events, notification_dedupe=[{"_id": key} for key in dedupe])
+    totals = asyncio.run(notification_outbox.process_outbox(db))
+    return totals, db
+
+
+class TestProcessOutbox:
+
+    def test_alert_then_clear_leaves_alert_rearmed(self, sent):
+        totals, db = run([alert(1), clear(2)])
+        assert totals["sent"] == 1 and totals["cleared"] == 1
+        assert dedupe_keys(db) == set()
+
+    def test_clear_then_alert_sends_once(self, sent):
+        totals, db = run([clear(1), alert(2), alert(3)], dedupe={"u1:low:b1"})
+        assert totals["sent"] == 1 and totals["duplicate"] == 1
+        assert dedupe_keys(db) == {"u1:low:b1"}
+
+    def test_alert_clear_alert_sends_twice(self, sent):
+        totals, db = run([alert(1), clear(2), alert(3)])
+        assert totals["sent"] == 2 and len(sent) == 2
+        assert [e["status"] for e in db.notification_outbox.docs] == ["sent", "cleared", "sent"]
+
+    def test_order_holds_across_batches(self, sent, monkeypatch):
+        monkeypatch.setattr(notification_outbox, "OUTBOX_BATCH_SIZE", 1)
+        totals, db = run([alert(1), clear(2), alert(3, business_id="b2")])
+        assert totals["sent"] == 2 and totals["cleared"] == 1
+        assert dedupe_keys(db) == {"u1:low:b2"}
+
+    def test_failed_send_is_retried(self, sent, monkeypatch):
+        async def chat_ids(db, owners):
+            return {owner: "broken" for owner in owners}
+        monkeypatch.setattr(notification_outbox, "resolve_chat_ids", chat_ids)
+        monkeypatch.setattr(notification_outbox, "OUTBOX_MAX_ATTEMPTS", 2)
+        events = [alert(1)]
+        totals, db = run(events)
+        assert totals["retry"] == 1 and dedupe_keys(db) == set()
+        assert events[0]["status"] == "pending" and events[0]["attempts"] == 1
+
+        totals, db = run(events)
+        assert totals["failed"] == 1 and dedupe_keys(db) == set()
+        assert events[0]["status"] == "failed" and events[0]["attempts"] == 2
+
+    def test_raising_send_is_retried(self, sent, monkeypatch):
+        async def send(chat_id, name, durability):
+            raise RuntimeError("telegram down")
+        monkeypatch.setattr(notification_outbox, "ALERT_SENDERS", {"low": send})
+        events = [alert(1)]
+        totals, db = run(events)
+        assert totals["retry"] == 1 and events[0]["status"] == "pending"
+        assert dedupe_keys(db) == set()
+
+    def test_keys_released_when_batch_fails(self, sent, monkeypatch):
+        down = [True]
+
+        async def chat_ids(db, owners):
+            if down[0]:
+                raise RuntimeError("mongo down")
+            return {owner: "chat" for owner in owners}
+        monkeypatch.setattr(notification_outbox, "resolve_chat_ids", chat_ids)
+        events = [alert(1)]
+        db = FakeDB(notification_outbox=events)
+        with pytest.raises(RuntimeError):
+            asyncio.run(notification_outbox.process_outbox(db))
+        assert dedupe_keys(db) == set() and events[0]["status"] == "pending"
+
+        down[0] = False
+        totals = asyncio.run(notification_outbox.process_outbox(db))
+        assert totals["sent"] == 1 and totals["duplicate"] == 0
@@ -0,0 +1,70 @@
+"""
+Owner Keys - Ownership Filter Tests
+Tests: owner_key equality once backfilled, legacy $or otherwise, identifier resolution
+"""
+import asyncio
+from types import SimpleNamespace
+
+import owner_keys
+
+
+class FakeUsers:
+    def __init__(self, users):
+        self.users = users
+
+    async def find(self, *args, **kwargs):
+        for user in self.users:
+            yield user
+
+
+class FakeMigrations:
+    def __init__(self, doc=None):
+        self.doc = doc
+
+    async def find_one(self, *args, **kwargs):
+        return self.doc
+
+
+def fake_db(migration=None, users=()):
+    return SimpleNamespace(migrations=FakeMigrations(migration), users=FakeUsers(list(users)))
+
+
+class TestOwnerFilter:
+
+    def setup_method(self):
+        owner_keys._ready.update(value=False, checked_at=0.0)
+
+    def test_legacy_or_until_backfilled(self, monkeypatch):
+        monkeypatch.setattr(owner_keys, "OWNER_KEY_QUERIES", "auto")
+        query = asyncio.run(owner_keys.owner_filter(fake_db(), "u1", {"0:w", None}))
+        assert query == {"$or": [{"owner": {"$in": ["0:w", "u1"]}}, {"owner_wallet": {"$in": ["0:w", "u1"]}}]}
+
+    def test_single_equality_after_backfill(self, monkeypatch):
+        monkeypatch.setattr(owner_keys, "OWNER_KEY_QUERIES", "auto")
+        db = fake_db({"_id": "owner_key", "completed_at": "t"})
+        assert asyncio.run(owner_keys.owner_filter(db, "u1", {"0:w"})) == {"owner_key": "u1"}
+
+    def test_compat_flag_forces_or(self, monkeypatch):
+        monkeypatch.setattr(owner_keys, "OWNER_KEY_QUERIES", "or")
+        db = fake_db({"_id": "owner_key", "completed_at": "t"})
+        query = asyncio.run(owner_keys.owner_filter(db, "u1", set(), ("borrower_id",)))
+        assert query == {"$or": [{"borrower_id": {"$in": ["u1"]}}]}
+
+
+class TestResolution:
+
+    def test_identifiers_map_to_user_id(self):
+        db = fake_db(users=[
+            {"_id": 1, "id": "u1", "wallet_address": "EQw", "raw_address": "0:w", "email": "a@b.c"},
+            {"_id": 2, "wallet_address": "EQx"},
+        ])
+        resolved = asyncio.run(owner_keys.resolve_user_ids(db, ["EQw", "0:w", "a@b.c", "EQx", "government"]))
+        assert resolved == {"EQw": "u1", "0:w": "u1", "a@b.c": "u1", "EQx": "2"}
+
+    def test_owner_key_prefers_first_field_and_keeps_non_users(self):
+        fields = owner_keys.OWNER_FIELDS["businesses"]
+        resolved = {"EQw": "u1", "EQx": "u2"}
+        assert owner_keys._owner_key_of({"owner": "EQx", "owner_wallet": "EQw"}, fields, resolved) == "u2"
+        assert owner_keys._owner_key_of({"owner": "gone", "owner_wallet": "EQw"}, fields, resolved) == "u1"
+        assert owner_keys._owner_key_of({"owner": "government"}, fields, resolved) == "government"
+        assert owner_keys._owner_key_of({"owner": "gone"}, fields, resolved) is None
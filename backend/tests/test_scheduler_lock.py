@@ -0,0 +1,162 @@
+"""
+Scheduler Lock - Leader Lease Tests
+Tests: acquisition callback, startup jobs run once the first heartbeat wins the lease,
+job writes fenced by the token the job started under
+"""
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.triggers.interval import IntervalTrigger
+
+import background_tasks
+import db_indexes
+from background_tasks import TickWriteBatch
+from scheduler_lock import SchedulerLease, check_fence, leader_only
+
+
+class FakeLeases:
+    """scheduler_leases with the lease semantics heartbeat() relies on; every call waits on "Mongo" """
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await asyncio.sleep(0.02)
+        doc = self.docs.get(query["_id"])
+        if "$inc" in update:
+            doc = self.docs.setdefault(query["_id"], {"_id": query["_id"], "token": 0})
+            doc["token"] += 1
+            return dict(doc)
+        if "holder" in query:
+            live = doc and doc["holder"] == query["holder"] and doc["expires_at"] > query["expires_at"]["$gt"]
+            if not live:
+                return None
+        elif doc and doc["expires_at"] > query["expires_at"]["$lte"]:
+            return None
+        doc = self.docs.setdefault(query["_id"], {"_id": query["_id"]})
+        doc.update(update["$set"])
+        return dict(doc)
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is not None:
+            doc.update(update["$set"])
+
+
+class FakeRuns:
+    async def update_one(self, *args, **kwargs):
+        pass
+
+
+class FakeDB(dict):
+    def __init__(self):
+        super().__init__(scheduler_leases=FakeLeases(), scheduler_job_runs=FakeRuns())
+
+    __getattr__ = dict.__getitem__
+
+
+def fake_db(monkeypatch) -> FakeDB:
+    monkeypatch.setattr(db_indexes, "_ensured", {"scheduler_leases"})
+    return FakeDB()
+
+
+class TestLease:
+
+    def test_on_acquired_only_when_newly_leader(self, monkeypatch):
+        lease = SchedulerLease(fake_db(monkeypatch))
+        acquired = []
+        lease.on_acquired = lambda: acquired.append(lease.token)
+
+        async def beats():
+            for _ in range(3):
+                assert await lease.heartbeat()
+
+        asyncio.run(beats())
+        assert acquired == [1]
+
+    def test_startup_job_runs_after_first_heartbeat(self, monkeypatch):
+        lease = SchedulerLease(fake_db(monkeypatch))
+        lease.on_acquired = background_tasks.run_startup_jobs
+        ran = []
+
+        async def rebuild():
+            ran.append(lease.token)
+
+        async def run():
+            scheduler = AsyncIOScheduler()
+            monkeypatch.setattr(background_tasks, "scheduler", scheduler)
+            now = datetime.now(timezone.utc)
+            scheduler.add_job(lease.heartbeat, IntervalTrigger(seconds=30), id="heartbeat", next_run_time=now)
+            scheduler.add_job(leader_only(lease, "leaderboard_rebuild", rebuild), IntervalTrigger(minutes=5),
+                              id="leaderboard_rebuild", next_run_time=now)
+            scheduler.start()
+            await asyncio.sleep(0.5)
+            scheduler.shutdown(wait=False)
+
+        asyncio.run(run())
+        assert ran == [1]
+
+    def test_request_job_run(self, monkeypatch):
+        monkeypatch.setattr(background_tasks, "scheduler", None)
+        assert not background_tasks.request_job_run("leaderboard_rebuild")
+
+        async def run():
+            scheduler = AsyncIOScheduler()
+            monkeypatch.setattr(background_tasks, "scheduler", scheduler)
+            scheduler.add_job(lambda: None, IntervalTrigger(minutes=5), id="leaderboard_rebuild")
+            scheduler.start(paused=True)
+            later = scheduler.get_job("leaderboard_rebuild").next_run_time
+            assert background_tasks.request_job_run("leaderboard_rebuild")
+            assert not background_tasks.request_job_run("missing")
+            assert scheduler.get_job("leaderboard_rebuild").next_run_time < later
+            scheduler.shutdown(wait=False)
+
+        asyncio.run(run())
+
+
+class RecordingUsers:
+    name = "users"
+
+    def __init__(self):
+        self.bulk_writes = []
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+
+
+class TestFence:
+
+    def test_no_fence_outside_jobs(self):
+        check_fence()
+
+    def test_stalled_job_stops_writing(self, monkeypatch):
+        db = fake_db(monkeypatch)
+        db["users"] = RecordingUsers()
+        lease = SchedulerLease(db)
+        asyncio.run(lease.heartbeat())
+
+        async def tick():
+            writes = TickWriteBatch(db)
+            await writes.inc_user("w1", {"resources.energy": 1})
+            await writes.flush()
+            # Event loop stalls past the TTL; a new leader takes over
+            lease.expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+            await writes.inc_user("w1", {"resources.energy": 1})
+            await writes.flush()
+            return "finished"
+
+        assert asyncio.run(leader_only(lease, "economic_tick", tick)()) is None
+        assert len(db.users.bulk_writes) == 1
+
+    def test_token_change_stops_writing(self, monkeypatch):
+        db = fake_db(monkeypatch)
+        lease = SchedulerLease(db)
+        asyncio.run(lease.heartbeat())
+
+        async def job():
+            lease.token += 1  # lost and re-acquired while stalled
+            check_fence()
+            return "finished"
+
+        assert asyncio.run(leader_only(lease, "process_credits", job)()) is None
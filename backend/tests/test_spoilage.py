@@ -0,0 +1,25 @@
+"""
+Warehouse Spoilage - Distribution Tests
+Tests: largest stacks destroyed first, decrements merged per business
+"""
+from background_tasks import plan_spoilage
+
+
+class TestPlanSpoilage:
+
+    def test_largest_stacks_first(self):
+        businesses = [
+            {"id": "b1", "storage": {"items": {"wood": 10, "ore": 3}}},
+            {"id": "b2", "storage": {"items": {"grain": 6}}},
+        ]
+        assert plan_spoilage(businesses, 12) == {
+            "b1": {"storage.items.wood": -10},
+            "b2": {"storage.items.grain": -2},
+        }
+
+    def test_merges_per_business_and_skips_empty(self):
+        businesses = [{"id": "b1", "storage": {"items": {"wood": 4, "ore": 4, "sand": 0, "bad": "x"}}}]
+        assert plan_spoilage(businesses, 6) == {"b1": {"storage.items.wood": -4, "storage.items.ore": -2}}
+
+    def test_nothing_to_destroy(self):
+        assert plan_spoilage([{"id": "b1", "storage": {}}], 5) == {}
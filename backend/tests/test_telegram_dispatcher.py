@@ -0,0 +1,61 @@
+"""
+Telegram Dispatcher - Rate Limit Tests
+Tests: token bucket pacing, per-chat spacing, 429 retry_after, against the local fake endpoint
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+from fake_telegram import FakeTelegram, start_fake_telegram  # noqa: E402
+from telegram_dispatcher import TelegramDispatcher, TokenBucket  # noqa: E402
+
+
+async def send_all(fake: FakeTelegram, chat_ids: list, **dispatcher_args) -> tuple:
+    runner, base_url = await start_fake_telegram(fake)
+    dispatcher = TelegramDispatcher(api_base=base_url, **dispatcher_args)
+    started = time.monotonic()
+    try:
+        results = await asyncio.gather(*(dispatcher.send(c, f"msg {i}") for i, c in enumerate(chat_ids)))
+    finally:
+        await dispatcher.close()
+        await runner.cleanup()
+    return results, dispatcher.stats, time.monotonic() - started
+
+
+class TestTelegramDispatcher:
+
+    def setup_method(self):
+        os.environ["TELEGRAM_BOT_TOKEN"] = "test-token"
+
+    def test_token_bucket_paces_acquisitions(self):
+        async def run():
+            bucket = TokenBucket(50)
+            started = time.monotonic()
+            for _ in range(11):
+                await bucket.acquire()
+            return time.monotonic() - started
+
+        assert asyncio.run(run()) >= 0.19
+
+    def test_per_chat_spacing_avoids_429(self):
+        fake = FakeTelegram(global_rate=1000, chat_rate=20)
+        results, stats, elapsed = asyncio.run(send_all(fake, [1] * 5, global_rate=1000, chat_rate=20))
+        assert all(results)
+        assert fake.throttled == 0
+        assert elapsed >= 0.19
+
+    def test_retries_after_429(self):
+        fake = FakeTelegram(global_rate=1000, chat_rate=10, integer_retry_after=False)
+        results, stats, _ = asyncio.run(send_all(fake, [7] * 3, global_rate=1000, chat_rate=1000))
+        assert all(results)
+        assert stats["rate_limited"] > 0
+        assert fake.per_chat[7] == 3
+
+    def test_no_token_no_request(self):
+        os.environ["TELEGRAM_BOT_TOKEN"] = ""
+        fake = FakeTelegram()
+        results, _, _ = asyncio.run(send_all(fake, [1]))
+        assert results == [False] and fake.accepted == 0
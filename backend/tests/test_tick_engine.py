@@ -0,0 +1,165 @@
+"""
+Vectorized Tick Engine - Golden Dataset Tests
+Tests: NumPy engine (steps 1-6) matches the per-business loop exactly
+"""
+import asyncio
+import random
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+import pytest
+
+from background_tasks import TickWriteBatch, process_businesses_loop, process_businesses_vector
+from business_config import BUSINESSES, RESOURCE_TYPES
+from tick_engine import round_like_python
+
+NOW = datetime(2026, 3, 7, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def build_golden_dataset(seed: int = 20260307, n_businesses: int = 3000):
+    """Deterministic businesses/users covering every branch of the tick"""
+    rng = random.Random(seed)
+    types = list(BUSINESSES.keys())
+    owners = [f"0:owner{i:04d}" for i in range(120)]
+
+    users = {}
+    for i, owner in enumerate(owners):
+        if i % 17 == 0:
+            continue  # owner without a user document
+        if i % 5 == 0:
+            resources = {}  # empty inventory - consumers cannot operate
+        elif i % 7 == 0:
+            resources = {r: rng.choice([0, 3, 10, 50]) for r in RESOURCE_TYPES}  # scarce
+        else:
+            resources = {r: rng.uniform(0, 5000) for r in RESOURCE_TYPES}
+        users[owner] = {"id": f"user-{i}", "wallet_address": owner, "resources": resources}
+
+    businesses = []
+    for i in range(n_businesses):
+        business = {
+            "id": f"biz-{i:05d}",
+            "owner": rng.choice(owners),
+            "business_type": rng.choice(types),
+            "level": rng.randint(1, 10),
+            "durability": rng.choice([
+                100, 0, 0.5, 9.99, 10, 10.01, 49.9, 50, 50.02, rng.uniform(0, 100), rng.uniform(40, 60),
+            ]),
+        }
+        roll = rng.random()
+        if roll < 0.05:
+            pass  # no last_tick / last_collection -> 1 hour default
+        elif roll < 0.10:
+            business["last_collection"] = (NOW - timedelta(hours=rng.uniform(0, 48))).isoformat()
+        elif roll < 0.12:
+            business["last_tick"] = "not-a-date"
+        elif roll < 0.15:
+            business["last_tick"] = (NOW - timedelta(seconds=rng.uniform(0, 20))).isoformat()
+        else:
+            business["last_tick"] = (NOW - timedelta(minutes=rng.uniform(1, 600))).isoformat().replace("+00:00", "Z")
+
+        patron = rng.random()
+        if patron < 0.2:
+            business["patron_id"] = f"patron-{i}"
+        elif patron < 0.25:
+            business["patron_id"] = ""
+        elif patron < 0.3:
+            business["patron_id"] = None
+
+        special = rng.random()
+        if special < 0.02:
+            business["on_sale"] = True
+        elif special < 0.04:
+            business["status"] = "on_sale"
+        elif special < 0.05:
+            business["business_type"] = "unknown_type"
+        elif special < 0.06:
+            business["level"] = rng.choice([0, 11, 12])
+        elif special < 0.065:
+            business.pop("durability")
+
+        businesses.append(business)
+
+    market_prices = {r: d["base_price"] * rng.uniform(0.5, 1.6) for r, d in RESOURCE_TYPES.items()}
+    market_prices.pop("chips")  # a produced resource without a market price
+    market_prices["quartz"] = 0.001  # below the 0.01 minimum
+    return businesses, users, market_prices
+
+
+def run_engine(process, businesses, users, market_prices, exact=False):
+    writes = TickWriteBatch(db=None, bulk=True, chunk_size=10 ** 9)
+    totals = asyncio.run(process(None, businesses, users, market_prices, NOW, writes, exact))
+    business_sets = {op._filter["id"]: op._doc["$set"] for op in writes.business_ops}
+    return totals, business_sets, writes.user_incs, writes.alerts
+
+
+@pytest.fixture(scope="module")
+def results():
+    businesses, users, market_prices = build_golden_dataset()
+    loop = run_engine(process_businesses_loop, businesses, users, market_prices)
+    vector = run_engine(process_businesses_vector, businesses, users, market_prices)
+    return loop, vector
+
+
+class TestGoldenDataset:
+    """Vector engine output equals the loop output value for value"""
+
+    def test_totals_match(self, results):
+        (loop_totals, *_), (vector_totals, *_) = results
+        assert loop_totals["businesses_processed"] > 1000
+        assert vector_totals == loop_totals
+
+    def test_business_updates_match(self, results):
+        (_, loop_sets, *_), (_, vector_sets, *_) = results
+        assert vector_sets.keys() == loop_sets.keys()
+        stopped = [b for b, s in loop_sets.items() if s.get("status") == "stopped"]
+        assert stopped, "dataset should contain stopped businesses"
+        for business_id, fields in loop_sets.items():
+            assert vector_sets[business_id] == fields, business_id
+
+    def test_user_increments_match(self, results):
+        (_, _, loop_incs, _), (_, _, vector_incs, _) = results
+        assert vector_incs.keys() == loop_incs.keys()
+        for owner, inc in loop_incs.items():
+            assert vector_incs[owner] == inc, owner
+
+    def test_durability_alerts_match(self, results):
+        (*_, loop_alerts), (*_, vector_alerts) = results
+        assert loop_alerts, "dataset should cross durability thresholds"
+        assert {a["level"] for a in loop_alerts} >= {"low", "critical", "stopped"}
+        assert vector_alerts == loop_alerts
+
+    def test_empty_input(self):
+        totals, sets, incs, alerts = run_engine(process_businesses_vector, [], {}, {})
+        assert totals["businesses_processed"] == 0
+        assert sets == {} and incs == {}
+
+
+class TestExactSpans:
+    """Accrual-mode spans: both engines agree, including the consumption carry"""
+
+    def test_engines_match(self):
+        businesses, users, market_prices = build_golden_dataset(n_businesses=1000)
+        for i, business in enumerate(businesses[::3]):
+            business["consumption_carry"] = {"energy": (i % 10) / 10, "traffic": 0.95}
+        loop = run_engine(process_businesses_loop, businesses, users, market_prices, exact=True)
+        vector = run_engine(process_businesses_vector, businesses, users, market_prices, exact=True)
+        assert vector[0] == loop[0]
+        assert vector[1] == loop[1]
+        assert vector[2] == loop[2]
+        assert any(fields.get("consumption_carry") for fields in loop[1].values())
+
+
+class TestRounding:
+    """round_like_python reproduces Python's round()"""
+
+    def test_half_boundaries(self):
+        values = np.array([0.125, 0.375, 2.675, 1.005, 49.995, 0.285, 1e-7, 99.99499999, 12.345, 0.0])
+        for decimals in (2, 6):
+            expected = [round(float(v), decimals) for v in values]
+            assert round_like_python(values, decimals).tolist() == expected
+
+    def test_random_values(self):
+        rng = np.random.default_rng(7)
+        values = rng.uniform(0, 100, 100_000)
+        expected = [round(v, 2) for v in values.tolist()]
+        assert round_like_python(values, 2).tolist() == expected
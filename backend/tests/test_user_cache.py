@@ -0,0 +1,57 @@
+"""
+User Cache - Authenticated User Cache Tests
+Tests: lookups by any identity, TTL, invalidation by identifier, metrics
+"""
+import time
+
+from user_cache import UserCache
+
+USER = {"_id": "oid1", "id": "u1", "wallet_address": "EQw", "email": "a@b.c", "username": "alice",
+        "balance_ton": 5.0, "resources": {"energy": 3}}
+
+
+class TestUserCache:
+
+    def test_lookup_by_subject_and_identity(self):
+        cache = UserCache(ttl=60)
+        entry = cache.put("alice", USER)
+        assert entry.ids == {"u1", "EQw", "a@b.c"}
+        assert cache.get("alice") is entry
+        assert cache.lookup(None, "a@b.c") is entry
+        assert cache.lookup("nobody") is None
+
+    def test_handed_out_copies_are_isolated(self):
+        cache = UserCache(ttl=60)
+        user = cache.put("alice", USER).user()
+        assert "_id" not in user
+        user["resources"]["energy"] = 0
+        assert cache.get("alice").doc["resources"]["energy"] == 3
+
+    def test_expired_entries_miss(self):
+        cache = UserCache(ttl=0.01)
+        cache.put("alice", USER)
+        time.sleep(0.02)
+        assert cache.get("alice") is None and cache.lookup("u1") is None
+
+    def test_invalidate_by_any_identifier(self):
+        cache = UserCache(ttl=60)
+        cache.put("alice", USER)
+        cache.put("bob", {"id": "u2", "wallet_address": "EQx"})
+        cache.invalidate("EQw")
+        assert cache.get("alice") is None and cache.get("bob") is not None
+        assert cache.metrics()["invalidations"] == 1
+
+    def test_eviction_keeps_index_consistent(self):
+        cache = UserCache(ttl=60, max_entries=1)
+        cache.put("alice", USER)
+        cache.put("bob", {"id": "u2"})
+        assert cache.lookup("u1") is None and cache.lookup("u2") is not None
+
+    def test_metrics(self):
+        cache = UserCache(ttl=60)
+        cache.record_request(hit=False)
+        cache.record_request(hit=True)
+        cache.record_saved(2)
+        metrics = cache.metrics()
+        assert metrics["hit_rate"] == 0.5
+        assert metrics["lookups_saved"] == 3 and metrics["lookups_saved_per_request"] == 1.5
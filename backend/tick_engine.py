@@ -0,0 +1,460 @@
+"""
+TON-City Vectorized Tick Engine
+Runs steps 1-6 of the economic tick (wear, production, consumption,
+maintenance, income tax, patron tax) over columnar business state with
+NumPy, using lookup tables built from BUSINESS_LEVELS, MAINTENANCE_COSTS
+and TIER_TAXES.
+
+Results are identical to the per-business loop in background_tasks:
+same operation order on float64, sequential accumulation for totals and
+Python round() semantics for every rounded value.
+
+Exact spans (accrual mode, exact=True): no 0.1h floor on the elapsed time,
+production at the span's mean durability, durability and produced amounts
+kept to EXACT_DECIMALS, and the fractional
+part of each input's consumption carried to the next span in the
+business's consumption_carry, so many short spans add up to one long span.
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from business_config import (
+    BUSINESSES, BUSINESS_LEVELS, MAINTENANCE_COSTS, TIER_TAXES, RESOURCE_TYPES,
+    get_production, get_consumption_breakdown,
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_LEVEL = 10
+PATRON_PRODUCTION_BONUS = 1.1  # Simplified patron bonus used by the tick
+PATRON_TAX_SHARE = 0.01
+TON_OUTPUTS = ("ton", "profit_ton")
+
+HOURS_FLOOR = 0.1
+EXACT_DECIMALS = 6
+CARRY_DECIMALS = 9
+# Absorbs float error in carried consumption (0.1 + 0.2 + ... one unit short)
+CARRY_EPSILON = 1e-9
+
+# ==================== LOOKUP TABLES ====================
+# Level axis: index 0 holds the fallback used for levels outside 1..MAX_LEVEL,
+# indexes 1..MAX_LEVEL hold the per-level values.
+
+TYPE_NAMES: List[str] = list(BUSINESSES.keys())
+TYPE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(TYPE_NAMES)}
+
+RESOURCE_NAMES: List[str] = list(RESOURCE_TYPES.keys())
+for _config in BUSINESSES.values():
+    for _resource in [_config.get("produces"), *_config.get("consumes", {})]:
+        if _resource and _resource not in RESOURCE_NAMES:
+            RESOURCE_NAMES.append(_resource)
+RESOURCE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(RESOURCE_NAMES)}
+
+CONSUMPTION_SLOTS = max(len(c.get("consumes", {})) for c in BUSINESSES.values()) or 1
+
+
+def _build_tables():
+    n_types = len(TYPE_NAMES)
+    levels = MAX_LEVEL + 1
+
+    production = np.zeros((n_types, levels), dtype=np.float64)
+    maintenance = np.zeros((n_types, levels), dtype=np.float64)
+    tax_rate = np.zeros(n_types, dtype=np.float64)
+    wear_min = np.zeros(n_types, dtype=np.float64)
+    wear_max = np.zeros(n_types, dtype=np.float64)
+    produces = np.full(n_types, -1, dtype=np.int64)
+    produces_ton = np.zeros(n_types, dtype=bool)
+    consume_res = np.full((n_types, CONSUMPTION_SLOTS), -1, dtype=np.int64)
+    consume_amt = np.zeros((n_types, levels, CONSUMPTION_SLOTS), dtype=np.int64)
+    consume_present = np.zeros((n_types, levels, CONSUMPTION_SLOTS), dtype=bool)
+
+    for t, name in enumerate(TYPE_NAMES):
+        config = BUSINESSES[name]
+        tier = config.get("tier", 1)
+        tier_maintenance = MAINTENANCE_COSTS.get(tier, {})
+        prod_levels = BUSINESS_LEVELS.get(name, {}).get("production", {})
+
+        production[t, 0] = prod_levels.get(1, 0)
+        maintenance[t, 0] = 0.05
+        for level in range(1, levels):
+            production[t, level] = get_production(name, level)
+            maintenance[t, level] = tier_maintenance.get(level, 0.05)
+
+        tax_rate[t] = TIER_TAXES.get(tier, 0.15)
+        wear_min[t], wear_max[t] = config.get("daily_wear_range", (0.03, 0.05))
+
+        output = config.get("produces")
+        if output:
+            produces[t] = RESOURCE_INDEX[output]
+            produces_ton[t] = output in TON_OUTPUTS
+
+        slots = list(config.get("consumes", {}).keys())
+        for s, resource in enumerate(slots):
+            consume_res[t, s] = RESOURCE_INDEX[resource]
+        for level in range(levels):
+            # get_consumption falls back to level 1 for unknown levels
+            breakdown = get_consumption_breakdown(name, level if level else 1)
+            for s, resource in enumerate(slots):
+                if resource in breakdown:
+                    consume_amt[t, level, s] = breakdown[resource]
+                    consume_present[t, level, s] = True
+
+    return {
+        "production": production,
+        "production_flat": production.ravel(),
+        "maintenance": maintenance,
+        "maintenance_flat": maintenance.ravel(),
+        "tax_rate": tax_rate,
+        "wear_min": wear_min,
+        "wear_max": wear_max,
+        "produces": produces,
+        "produces_ton": produces_ton,
+        "consume_res": consume_res,
+        "consume_amt": consume_amt,
+        "consume_amt_flat": consume_amt.reshape(-1, CONSUMPTION_SLOTS),
+        "consume_present": consume_present,
+        "consume_present_flat": consume_present.reshape(-1, CONSUMPTION_SLOTS),
+    }
+
+
+TABLES = _build_tables()
+
+
+# ==================== HELPERS ====================
+
+def round_like_python(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    np.round with the result of Python's round() for every element.
+    The two only disagree when the scaled value sits on a .5 boundary,
+    so those few elements are re-rounded in Python.
+    """
+    out = np.round(values, decimals)
+    scaled = values * (10 ** decimals)
+    near_half = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_half):
+        out[i] = round(float(values[i]), decimals)
+    return out
+
+
+def sequential_sum(values: np.ndarray) -> float:
+    """Left-to-right sum, identical to accumulating in a Python loop"""
+    if values.size == 0:
+        return 0
+    return float(np.cumsum(values)[-1])
+
+
+def parse_hours_passed(last_tick, now: datetime, floor: float = HOURS_FLOOR) -> float:
+    """Hours since the last tick, with the loop's defaults and floor (0.1h unless exact)"""
+    if not last_tick:
+        return 1.0
+    try:
+        last_dt = datetime.fromisoformat(str(last_tick).replace('Z', '+00:00'))
+        return max(floor, (now - last_dt).total_seconds() / 3600)
+    except (ValueError, TypeError):
+        return 1.0
+
+
+# ==================== COLUMNAR STATE ====================
+
+class BusinessColumns:
+    """Columnar view of the businesses processed in one tick"""
+
+    def __init__(self, ids: list, owners: list, type_idx, level, durability,
+                 hours_passed, patron_bonus, has_patron, owner_idx, owner_keys: list,
+                 business_types: list, consumption_carry=None, exact: bool = False):
+        self.ids = ids
+        self.owners = owners
+        self.business_types = business_types
+        self.type_idx = type_idx
+        self.level = level
+        self.durability = durability
+        self.hours_passed = hours_passed
+        self.patron_bonus = patron_bonus
+        self.has_patron = has_patron
+        self.owner_idx = owner_idx
+        self.owner_keys = owner_keys
+        self.consumption_carry = consumption_carry
+        self.exact = exact
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_documents(cls, businesses: list, now: datetime, exact: bool = False) -> "BusinessColumns":
+        """
+        Load tick input from business documents.
+        Applies the same skips as the loop: unknown type, on sale,
+        ticked less than ~30 seconds ago, non-numeric level/durability.
+        """
+        ids, owners, types = [], [], []
+        type_idx, level, durability, hours, bonus, has_patron, carry = [], [], [], [], [], [], []
+        owner_index: Dict[str, int] = {}
+        owner_idx = []
+
+        for business in businesses:
+            business_type = business.get("business_type")
+            t = TYPE_INDEX.get(business_type) if isinstance(business_type, str) else None
+            if t is None:
+                continue
+
+            hours_passed = parse_hours_passed(
+                business.get("last_tick") or business.get("last_collection"), now, 0.0 if exact else HOURS_FLOOR
+            )
+            if hours_passed < 0.008:
+                continue
+            if business.get("on_sale") or business.get("status") == "on_sale":
+                continue
+
+            lvl = business.get("level", 1)
+            dur = business.get("durability", 100)
+            if isinstance(lvl, bool) or not isinstance(lvl, int):
+                logger.error(f"❌ Tick error for business {business.get('id')}: invalid level {lvl!r}")
+                continue
+            if isinstance(dur, bool) or not isinstance(dur, (int, float)):
+                logger.error(f"❌ Tick error for business {business.get('id')}: invalid durability {dur!r}")
+                continue
+
+            owner = business.get("owner")
+            if owner not in owner_index:
+                owner_index[owner] = len(owner_index)
+
+            ids.append(business.get("id"))
+            owners.append(owner)
+            types.append(business_type)
+            type_idx.append(t)
+            level.append(lvl)
+            durability.append(dur)
+            hours.append(hours_passed)
+            bonus.append(bool(business.get("patron_id")))
+            has_patron.append(business.get("patron_id") is not None)
+            owner_idx.append(owner_index[owner])
+            if exact:
+                stored = business.get("consumption_carry") or {}
+                carry.append([
+                    stored.get(RESOURCE_NAMES[r], 0) if r >= 0 else 0 for r in TABLES["consume_res"][t].tolist()
+                ])
+
+        return cls(
+            ids=ids,
+            owners=owners,
+            business_types=types,
+            type_idx=np.array(type_idx, dtype=np.int64),
+            level=np.array(level, dtype=np.int64),
+            durability=np.array(durability, dtype=np.float64),
+            hours_passed=np.array(hours, dtype=np.float64),
+            patron_bonus=np.array(bonus, dtype=bool),
+            has_patron=np.array(has_patron, dtype=bool),
+            owner_idx=np.array(owner_idx, dtype=np.int64),
+            owner_keys=list(owner_index.keys()),
+            consumption_carry=np.array(carry, dtype=np.float64).reshape(-1, CONSUMPTION_SLOTS) if exact else None,
+            exact=exact,
+        )
+
+
+def owner_resource_matrix(owner_keys: list, users: dict) -> np.ndarray:
+    """Inventory of every owner in the tick as an [owners, resources] matrix"""
+    matrix = np.zeros((len(owner_keys), len(RESOURCE_NAMES)), dtype=np.float64)
+    for o, owner in enumerate(owner_keys):
+        resources = (users.get(owner) or {}).get("resources") or {}
+        for resource, amount in resources.items():
+            r = RESOURCE_INDEX.get(resource)
+            if r is not None and isinstance(amount, (int, float)) and not isinstance(amount, bool):
+                matrix[o, r] = amount
+    return matrix
+
+
+def price_factors(market_prices: dict) -> np.ndarray:
+    """TON value of one produced unit, per business type"""
+    factors = np.zeros(len(TYPE_NAMES), dtype=np.float64)
+    for t, name in enumerate(TYPE_NAMES):
+        output = BUSINESSES[name].get("produces")
+        if output in TON_OUTPUTS:
+            factors[t] = 0.01
+        elif output and output in market_prices:
+            factors[t] = max(0.01, market_prices.get(output, 0.01))
+    return factors
+
+
+# ==================== ENGINE ====================
+
+class VectorTickEngine:
+    """Array implementation of tick steps 1-6"""
+
+    @staticmethod
+    def compute(columns: BusinessColumns, owner_resources: np.ndarray, market_prices: dict) -> dict:
+        """
+        Compute one tick for all businesses in `columns`.
+        Returns per-business arrays, per-owner resource increments and tick totals.
+        """
+        tables = TABLES
+        n_res = len(RESOURCE_NAMES)
+        t = columns.type_idx
+        level = columns.level
+        # Row into the flattened (type, level) tables
+        tl = t * (MAX_LEVEL + 1) + np.where((level >= 1) & (level <= MAX_LEVEL), level, 0)
+
+        # --- Step 1: Durability wear ---
+        level_factor = (level - 1) / 9.0
+        wear_min = tables["wear_min"][t]
+        daily_wear = np.minimum(wear_min + (tables["wear_max"][t] - wear_min) * level_factor, 0.10)
+        wear = daily_wear * 100 * (columns.hours_passed / 24.0)
+        decimals = EXACT_DECIMALS if columns.exact else 2
+        new_durability = round_like_python(np.maximum(0, columns.durability - wear), decimals)
+
+        durability_mult = np.where(new_durability <= 0, 0.0, np.where(new_durability < 50, 0.7, 1.0))
+        stopped = durability_mult == 0
+        active = ~stopped
+
+        # --- Step 1b: Production ---
+        patron_bonus = np.where(columns.patron_bonus, PATRON_PRODUCTION_BONUS, 1.0)
+        production_durability = (columns.durability + new_durability) / 2 if columns.exact else new_durability
+        effective = tables["production_flat"][tl] * (production_durability / 100.0) * patron_bonus
+        effective = effective * durability_mult
+        hourly_fraction = columns.hours_passed / 24.0
+        production = effective * hourly_fraction
+
+        # --- Step 2: Consumption ---
+        slot_res = tables["consume_res"][t]                     # [n, slots], -1 = unused slot
+        slot_present = tables["consume_present_flat"][tl]        # [n, slots]
+        owed = tables["consume_amt_flat"][tl] * hourly_fraction[:, None]
+        if columns.exact:
+            owed = owed + columns.consumption_carry
+            scaled = np.trunc(owed + CARRY_EPSILON).astype(np.int64)
+        else:
+            scaled = np.trunc(owed).astype(np.int64)
+        slot_res_safe = np.maximum(slot_res, 0)
+
+        owner_row = columns.owner_idx * n_res
+        available = owner_resources.ravel()[owner_row[:, None] + slot_res_safe]
+        can_operate = ~(slot_present & (available < scaled)).any(axis=1)
+        production = np.where(can_operate, production, 0.0)
+
+        # --- Step 3: Maintenance ---
+        maintenance_cost = tables["maintenance_flat"][tl] * hourly_fraction
+
+        # --- Step 4: Profit ---
+        gross_profit = production * price_factors(market_prices)[t]
+
+        # --- Step 5: Income tax ---
+        income_tax = gross_profit * tables["tax_rate"][t]
+
+        # --- Step 6: Patron tax ---
+        patron_tax = np.where(columns.has_patron, (gross_profit - income_tax) * PATRON_TAX_SHARE, 0.0)
+
+        net_income = gross_profit - income_tax - patron_tax - maintenance_cost
+
+        # --- Totals (only businesses that kept running) ---
+        # bincount adds weights in input order, like the loop's running totals
+        tax_total = sequential_sum((income_tax + patron_tax)[active])
+        maintenance_total = sequential_sum(maintenance_cost[active])
+        net_rounded = round_like_python(net_income[active], 6)
+        ton_produced = sequential_sum(net_rounded[net_rounded > 0])
+
+        produces = tables["produces"][t]
+        produced_mask = active & (production > 0) & (produces >= 0)
+        produced_res = produces[produced_mask]
+        production_totals = np.bincount(produced_res, weights=production[produced_mask], minlength=n_res)
+        production_seen = np.bincount(produced_res, minlength=n_res)
+        total_production = {
+            RESOURCE_NAMES[r]: float(production_totals[r]) for r in np.flatnonzero(production_seen)
+        }
+
+        consumed_mask = (active & can_operate)[:, None] & slot_present
+        consumed_res = slot_res[consumed_mask]
+        consumption_totals = np.bincount(consumed_res, weights=scaled[consumed_mask], minlength=n_res)
+        consumption_seen = np.bincount(consumed_res, minlength=n_res)
+        total_consumption = {
+            RESOURCE_NAMES[r]: int(consumption_totals[r]) for r in np.flatnonzero(consumption_seen)
+        }
+
+        # --- Per-owner inventory increments, accumulated in business order ---
+        n_cells = len(columns.owner_keys) * n_res
+        inventory_prod = produced_mask & ~tables["produces_ton"][t]
+        prod_amount = round_like_python(production, decimals)
+        cons_mask = consumed_mask & (scaled > 0)
+
+        # One entry per (business, produced resource) followed by its consumption slots
+        entry_mask = np.concatenate([inventory_prod[:, None], cons_mask], axis=1).ravel()
+        entry_cell = (owner_row[:, None] + np.concatenate(
+            [np.maximum(produces, 0)[:, None], slot_res_safe], axis=1
+        )).ravel()[entry_mask]
+        entry_amt = np.concatenate(
+            [prod_amount[:, None], -scaled.astype(np.float64)], axis=1
+        ).ravel()[entry_mask]
+
+        owner_inc = np.bincount(entry_cell, weights=entry_amt, minlength=n_cells)
+        owner_touched = np.bincount(entry_cell, minlength=n_cells) > 0
+        owner_float = np.bincount(
+            owner_row[inventory_prod] + produces[inventory_prod], minlength=n_cells
+        ) > 0
+
+        # Unconsumed fractions move to the next span; idle businesses keep theirs
+        consumption_carry = None
+        if columns.exact:
+            consumption_carry = np.where(consumed_mask, owed - scaled, columns.consumption_carry)
+
+        return {
+            "new_durability": new_durability,
+            "stopped": stopped,
+            "can_operate": can_operate,
+            "production": production,
+            "maintenance": maintenance_cost,
+            "income_tax": income_tax,
+            "patron_tax": patron_tax,
+            "net_income": net_income,
+            "owner_inc": owner_inc,
+            "owner_touched": owner_touched,
+            "owner_float": owner_float,
+            "consumption_carry": consumption_carry,
+            "totals": {
+                "businesses_processed": int(active.sum()),
+                "total_tax_collected": tax_total,
+                "total_maintenance_collected": maintenance_total,
+                "total_production": total_production,
+                "total_consumption": total_consumption,
+                "total_ton_produced": ton_produced,
+            },
+        }
+
+    @staticmethod
+    def carry_documents(columns: BusinessColumns, result: dict) -> List[dict]:
+        """Per-business consumption_carry fields ({resource: fraction}), exact spans only"""
+        carry = result["consumption_carry"].tolist()
+        documents = []
+        for i, t in enumerate(columns.type_idx.tolist()):
+            present = TABLES["consume_present"][t, columns.level[i] if 1 <= columns.level[i] <= MAX_LEVEL else 0]
+            documents.append({
+                RESOURCE_NAMES[r]: round(carry[i][s], CARRY_DECIMALS)
+                for s, r in enumerate(TABLES["consume_res"][t].tolist()) if r >= 0 and present[s]
+            })
+        return documents
+
+    @staticmethod
+    def owner_increments(columns: BusinessColumns, result: dict) -> Dict[str, dict]:
+        """Per-owner $inc documents ({owner: {"resources.x": amount}})"""
+        increments = {}
+        owner_inc = result["owner_inc"]
+        owner_float = result["owner_float"]
+        n_res = len(RESOURCE_NAMES)
+        for cell in np.flatnonzero(result["owner_touched"]).tolist():
+            o, r = divmod(cell, n_res)
+            amount = float(owner_inc[cell])
+            if not owner_float[cell]:
+                amount = int(amount)
+            increments.setdefault(columns.owner_keys[o], {})[f"resources.{RESOURCE_NAMES[r]}"] = amount
+        return increments
+
+
+def durability_transitions(old: np.ndarray, new: np.ndarray) -> np.ndarray:
+    """Indexes of businesses that crossed a notification threshold (0, 10, 50)"""
+    crossed = (
+        ((new <= 0) & (old > 0)) |
+        ((new < 10) & (old >= 10)) |
+        ((new < 50) & (old >= 50)) |
+        ((new >= 50) & (old < 50)) |
+        ((new > 0) & (old <= 0))
+    )
+    return np.flatnonzero(crossed)
@@ -3,7 +3,6 @@ TON Island Map Generator
 Creates a diamond-shaped island resembling TON cryptocurrency logo
 with exactly 500 playable cells
 """
-import math
 from typing import List, Dict, Tuple
 
 # Island configuration
@@ -155,6 +154,8 @@ def generate_ton_island_map() -> Dict:
     for cell in cells:
         zone_stats[cell["zone"]] += 1
     
+    cell_index = build_cell_index(cells, width, height)
+    
     return {
         "id": ISLAND_CONFIG["id"],
         "name": ISLAND_CONFIG["name"],
@@ -166,11 +167,89 @@ def generate_ton_island_map() -> Dict:
         "zone_stats": zone_stats,
         "zones": ZONES,
         "base_price": BASE_PLOT_PRICE,
+        "cell_index": cell_index,
+        "neighbor_table": build_neighbor_table(cells, cell_index),
     }
 
 
+# ==================== CELL INDEX ====================
+
+# 4-directional, used for connection bonuses
+NEIGHBOR_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Derived lookup tables stored with the island; not part of the map payload
+INDEX_FIELDS = ("cell_index", "neighbor_table")
+
+
+def build_cell_index(cells: List[Dict], width: int, height: int) -> List[List[int]]:
+    """Dense [y][x] table of positions in `cells`, -1 for water"""
+    index = [[-1] * width for _ in range(height)]
+    for pos, cell in enumerate(cells):
+        index[cell["y"]][cell["x"]] = pos
+    return index
+
+
+def build_neighbor_table(cells: List[Dict], cell_index: List[List[int]]) -> List[List[int]]:
+    """Positions of each cell's land neighbors, aligned with `cells`"""
+    height = len(cell_index)
+    width = len(cell_index[0]) if height else 0
+    table = []
+    for cell in cells:
+        neighbors = []
+        for dx, dy in NEIGHBOR_OFFSETS:
+            nx, ny = cell["x"] + dx, cell["y"] + dy
+            if 0 <= nx < width and 0 <= ny < height and cell_index[ny][nx] >= 0:
+                neighbors.append(cell_index[ny][nx])
+        table.append(neighbors)
+    return table
+
+
+class IslandIndex:
+    """
+    Geometry of one island: (x, y) -> position in `cells` and the neighbor
+    table. Cells never move after generation, so one index per island id
+    serves every copy of the document loaded in this process.
+    """
+
+    def __init__(self, island_data: Dict):
+        cells = island_data["cells"]
+        self.size = len(cells)
+        self.width = island_data.get("width") or (max(c["x"] for c in cells) + 1 if cells else 0)
+        self.height = island_data.get("height") or (max(c["y"] for c in cells) + 1 if cells else 0)
+        self.cell_index = island_data.get("cell_index") or build_cell_index(cells, self.width, self.height)
+        self.neighbor_table = island_data.get("neighbor_table") or build_neighbor_table(cells, self.cell_index)
+
+    def position(self, x: int, y: int) -> int:
+        if 0 <= y < self.height and 0 <= x < self.width:
+            return self.cell_index[y][x]
+        return -1
+
+    def matches(self, island_data: Dict) -> bool:
+        return len(island_data["cells"]) == self.size
+
+
+_island_indexes: Dict[str, IslandIndex] = {}
+
+
+def island_index(island_data: Dict) -> IslandIndex:
+    """Process-wide index for this island, built on first use"""
+    island_id = island_data.get("id", ISLAND_CONFIG["id"])
+    index = _island_indexes.get(island_id)
+    if index is None or not index.matches(island_data):
+        index = _island_indexes[island_id] = IslandIndex(island_data)
+    return index
+
+
 def get_cell_at(island_data: Dict, x: int, y: int) -> Dict:
     """Get cell data at specific coordinates"""
+    pos = island_index(island_data).position(x, y)
+    if pos < 0:
+        return None
+    cell = island_data["cells"][pos]
+    if cell["x"] == x and cell["y"] == y:
+        return cell
+    # Document no longer matches the cached geometry
+    _island_indexes.pop(island_data.get("id", ISLAND_CONFIG["id"]), None)
     for cell in island_data["cells"]:
         if cell["x"] == x and cell["y"] == y:
             return cell
@@ -179,15 +258,12 @@ def get_cell_at(island_data: Dict, x: int, y: int) -> Dict:
 
 def get_neighbors(island_data: Dict, x: int, y: int) -> List[Dict]:
     """Get neighboring cells (for connection bonuses)"""
-    neighbors = []
-    offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]  # 4-directional
-    
-    for dx, dy in offsets:
-        cell = get_cell_at(island_data, x + dx, y + dy)
-        if cell:
-            neighbors.append(cell)
-    
-    return neighbors
+    index = island_index(island_data)
+    pos = index.position(x, y)
+    if pos < 0:
+        return [c for c in (get_cell_at(island_data, x + dx, y + dy) for dx, dy in NEIGHBOR_OFFSETS) if c]
+    cells = island_data["cells"]
+    return [cells[n] for n in index.neighbor_table[pos]]
 
 
 # Generate island on module load for testing
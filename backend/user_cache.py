@@ -0,0 +1,125 @@
+"""
+TON-City Authenticated User Cache
+Per-process cache of user documents, keyed by JWT subject.
+
+- get_current_user serves GET requests from entries younger than
+  USER_CACHE_TTL_SECONDS; other methods always read the user fresh (balance
+  checks before spending) and refresh the entry
+- Each entry keeps the resolved identity set (id, wallet, email), so
+  get_user_identifiers and /auth/me reuse it instead of querying again
+- Entries are dropped after the subject's own non-GET request, on deposits,
+  and all at once after admin writes; balance changes made by other
+  processes (the tick) show up within the TTL
+- metrics() reports hit rate and DB lookups saved per request
+"""
+import copy
+import os
+import time
+from typing import Dict, Optional
+
+USER_CACHE_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL_SECONDS', '5'))
+USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', '10000'))
+
+# Requests that may be answered from a cached user
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def identity_set(doc: dict) -> set:
+    """Identifiers ownership fields may hold for this user"""
+    ids = {doc.get("id") or str(doc.get("_id", "")), doc.get("wallet_address"), doc.get("email")}
+    ids.discard(None)
+    ids.discard("")
+    return ids
+
+
+class CachedUser:
+    __slots__ = ("subject", "doc", "ids", "expires_at")
+
+    def __init__(self, subject: str, doc: dict, ids: set, expires_at: float):
+        self.subject = subject
+        self.doc = doc
+        self.ids = ids
+        self.expires_at = expires_at
+
+    def user(self) -> dict:
+        """Copy of the document without _id; handlers are free to modify it"""
+        return copy.deepcopy({k: v for k, v in self.doc.items() if k != "_id"})
+
+
+class UserCache:
+
+    def __init__(self, ttl: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[str, CachedUser] = {}
+        self._by_identifier: Dict[str, str] = {}
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "lookups_saved": 0, "invalidations": 0}
+
+    def get(self, subject: str) -> Optional[CachedUser]:
+        entry = self._entries.get(subject)
+        if entry is None or time.monotonic() >= entry.expires_at:
+            return None
+        return entry
+
+    def lookup(self, *identifiers) -> Optional[CachedUser]:
+        """Fresh entry of the user any of the identifiers belongs to"""
+        for identifier in identifiers:
+            subject = self._by_identifier.get(identifier) if identifier else None
+            entry = self.get(subject) if subject else None
+            if entry is not None:
+                return entry
+        return None
+
+    def put(self, subject: str, doc: dict) -> CachedUser:
+        self._drop(subject)
+        while len(self._entries) >= self.max_entries:
+            self._drop(next(iter(self._entries)))
+        ids = identity_set(doc)
+        entry = CachedUser(subject, doc, ids, time.monotonic() + self.ttl)
+        self._entries[subject] = entry
+        for identifier in ids | {subject}:
+            self._by_identifier[identifier] = subject
+        return entry
+
+    def _drop(self, subject: str):
+        entry = self._entries.pop(subject, None)
+        if entry is None:
+            return
+        for identifier in entry.ids | {subject}:
+            if self._by_identifier.get(identifier) == subject:
+                del self._by_identifier[identifier]
+
+    def invalidate(self, *identifiers):
+        """Drop the entries of the users these subjects or identifiers belong to"""
+        for identifier in identifiers:
+            subject = self._by_identifier.get(identifier) if identifier else None
+            if subject is not None:
+                self._drop(subject)
+                self.stats["invalidations"] += 1
+
+    def clear(self):
+        self.stats["invalidations"] += len(self._entries)
+        self._entries.clear()
+        self._by_identifier.clear()
+
+    def record_request(self, hit: bool):
+        self.stats["requests"] += 1
+        self.stats["hits" if hit else "misses"] += 1
+        if hit:
+            self.stats["lookups_saved"] += 1
+
+    def record_saved(self, lookups: int = 1):
+        self.stats["lookups_saved"] += lookups
+
+    def metrics(self) -> dict:
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(self.stats["hits"] / requests, 4) if requests else 0.0,
+            "lookups_saved_per_request": round(self.stats["lookups_saved"] / requests, 4) if requests else 0.0,
+        }
+
+
+user_cache = UserCache()
@@ -1,4 +1,4 @@
-import { useState, useEffect, useRef } from 'react';
+import { useState, useEffect, useRef, useMemo } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { motion } from 'framer-motion';
 import { 
@@ -10,9 +10,26 @@ import { Input } from '@/components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '@/components/ui/select';
 import { useTranslation, languages } from '@/lib/translations';
 
+// Decode the run-length silhouette from GET /api/cities
+// ({w, h, rle}: alternating water/land run lengths, starting with water)
+function expandSilhouette(silhouette) {
+  if (!silhouette) return null;
+  const { w, h, rle } = silhouette;
+  const cells = [];
+  let value = 0;
+  for (const run of rle) {
+    for (let i = 0; i < run; i++) cells.push(value);
+    value ^= 1;
+  }
+  const grid = [];
+  for (let y = 0; y < h; y++) grid.push(cells.slice(y * w, (y + 1) * w));
+  return grid;
+}
+
 // City silhouette preview using Canvas
-function CitySilhouette({ grid, style, size = 120 }) {
+function CitySilhouette({ silhouette, style, size = 120 }) {
   const canvasRef = useRef(null);
+  const grid = useMemo(() => expandSilhouette(silhouette), [silhouette]);
   
   useEffect(() => {
     if (!canvasRef.current || !grid) return;
@@ -252,7 +269,7 @@ export default function MapPage({ user }) {
                 {/* City Preview */}
                 <div className="flex justify-center mb-4 h-32 items-center">
                   <CitySilhouette 
-                    grid={city.grid_preview} 
+                    silhouette={city.silhouette} 
                     style={city.style}
                     size={120}
                   />